@@ -1,32 +1,37 @@
 import logging
-from datetime import UTC, date, datetime
+from datetime import date
 from pathlib import Path
 
 import polars as pl
-from dateutil.relativedelta import relativedelta
 
-from tax_automation.currencies import ExchangeRates, ExchangeRatesCacheError
+from tax_automation.fx_repository import DEFAULT_FX_REPOSITORY_DIR, FxRepository
+from tax_automation.fx_requirements import FxRequirements
 from tax_automation.finanzonline import (
     build_finanzonline_buckets_from_summary_df,
     build_finanzonline_report,
     empty_finanzonline_bucket_df,
 )
 from tax_automation.pdf.tax_report import ReportSection, create_tax_report
-from tax_automation.providers.freedom import build_finanzonline_dividend_buckets_freedom, process_freedom_statement
+from tax_automation.providers.freedom import (
+    build_finanzonline_dividend_buckets_freedom,
+    process_freedom_statement,
+    scan_fx_requirements_freedom,
+)
 from tax_automation.providers.ibkr import (
-    AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES,
     IbkrSummarySection,
     build_finanzonline_dividend_buckets_ibkr,
     calculate_summary_ibkr,
     process_bonds_ibkr,
     process_cash_transactions_ibkr,
     process_trades_ibkr,
+    scan_fx_requirements_ibkr,
 )
-from tax_automation.providers.revolut import process_revolut_savings_statement
-from tax_automation.providers.wise import process_wise_statement
-from tax_automation.broker_history import load_ibkr_stock_like_trades
-from tax_automation.moving_average import load_position_states
-from tax_automation.utils import has_rows
+from tax_automation.providers.revolut import process_revolut_savings_statement, scan_fx_requirements_revolut
+from tax_automation.providers.wise import process_wise_statement, scan_fx_requirements_wise
+from tax_automation.ibkr_statements import DEFAULT_PARSE_CACHE_DIR, IbkrStatementSet
+from tax_automation.position_checkpoints import DEFAULT_POSITION_CHECKPOINT_DIR
+from tax_automation.trade_ledger import TradeLedger
+from tax_automation.utils import FxJoiner, has_rows
 from tax_automation.writer import ReportRunLayout
 
 logging.basicConfig(
@@ -55,6 +60,18 @@ austrian_opening_state_path: str | None = (
     "data/input/eugene/ibkr/austrian_opening_state_2024-05-01.csv" if person == "eugene" else None
 )
 authoritative_start_date: date | None = date(2024, 5, 1) if person == "eugene" else None
+# Parsed IBKR XML sections are cached here keyed by file content; set to None to always re-parse.
+ibkr_parse_cache_dir: str | None = DEFAULT_PARSE_CACHE_DIR
+# Moving-average states are checkpointed here, so a run only replays trades since the latest valid checkpoint.
+ibkr_position_checkpoint_dir: str | None = DEFAULT_POSITION_CHECKPOINT_DIR
+# Moving-average position events are appended here as Parquet partitioned by ISIN and year; None disables it.
+# Rows carry no account or person, so each person keeps their own journal.
+ibkr_position_journal_dir: str | None = f"data/output/{person}/position_journal"
+# Worker processes for parsing multi-file IBKR inputs; None parses serially.
+ibkr_parse_workers: int | None = None
+# When set, trade history is read from this ledger (see scripts/ibkr_trade_ledger/cli.py ingest)
+# instead of re-parsing every file under ibkr_trade_history_path.
+ibkr_trade_ledger_dir: str | None = None
 freedom_input_path = (
     "data/input/oryna/2025/ff_oryna_2024-12-31 23_59_59_2025-12-31 23_59_59_all.json"
     if person == "oryna"
@@ -73,33 +90,6 @@ def _existing_first_or_none(*file_paths: str) -> str | None:
     return None
 
 
-def _infer_ibkr_authoritative_rates_start_date(
-    *,
-    ibkr_trade_history_path: str | None,
-    austrian_opening_state_path: str | None,
-) -> date | None:
-    candidate_dates: list[date] = []
-
-    if austrian_opening_state_path:
-        opening_states = [
-            state
-            for state in load_position_states(austrian_opening_state_path)
-            if state.asset_class in AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES and state.snapshot_date
-        ]
-        if opening_states:
-            candidate_dates.append(min(date.fromisoformat(state.snapshot_date) for state in opening_states))
-
-    if ibkr_trade_history_path and not austrian_opening_state_path:
-        raw_trades = load_ibkr_stock_like_trades(
-            ibkr_trade_history_path,
-            allowed_asset_classes=AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES,
-        )
-        if raw_trades:
-            candidate_dates.append(min(trade.trade_date for trade in raw_trades))
-
-    return min(candidate_dates) if candidate_dates else None
-
-
 if __name__ == "__main__":
     pl.Config.set_tbl_rows(100)
     pl.Config.set_tbl_cols(100)
@@ -120,49 +110,77 @@ if __name__ == "__main__":
     run_name = f"tax_report_{person}_{reporting_start_date}_{reporting_end_date}"
     run_layout = ReportRunLayout.create(base_output_dir=f"data/output/{person}", run_name=run_name)
 
-    now = datetime.now(tz=UTC)
-    rates_start_date = date(year=now.year - 3, month=1, day=1)
-    rates_end_date = reporting_end_date + relativedelta(weeks=1)
-    if reporting_start_date < rates_start_date:
-        rates_start_date = reporting_start_date
-    ibkr_authoritative_rates_start_date = _infer_ibkr_authoritative_rates_start_date(
-        ibkr_trade_history_path=ibkr_trade_history_path,
-        austrian_opening_state_path=austrian_opening_state_path,
+    # Every IBKR consumer below reads from these, so each statement file is parsed exactly once per run.
+    ibkr_statements = IbkrStatementSet.load(
+        ibkr_input_path, cache_dir=ibkr_parse_cache_dir, max_workers=ibkr_parse_workers
+    )
+    if ibkr_trade_ledger_dir:
+        ibkr_trade_history = TradeLedger(Path(ibkr_trade_ledger_dir)).to_statement_set()
+    elif ibkr_trade_history_path:
+        ibkr_trade_history = IbkrStatementSet.load(
+            ibkr_trade_history_path, cache_dir=ibkr_parse_cache_dir, max_workers=ibkr_parse_workers
+        )
+    else:
+        ibkr_trade_history = None
+
+    revolut_statement_paths = (
+        ["data/input/oryna/2025/revolut_2025_01_01_2025_12_31_en_us_1980166307_449cac.csv"]
+        if person == "oryna"
+        else [
+            "data/input/eugene/2025/revolut_2025-01-01_2025-12-31_en_eur.csv",
+            "data/input/eugene/2025/revolut_2025-01-01_2025-12-31_en_usd.csv",
+        ]
     )
-    if ibkr_authoritative_rates_start_date and ibkr_authoritative_rates_start_date < rates_start_date:
-        rates_start_date = ibkr_authoritative_rates_start_date
-
-    logging.info(f"Exchange rate dates: {rates_start_date} - {rates_end_date}")
-    # seems like no reason to persist rates since in prod use cases every day we would have to fetch new ones anyway
-    # actually the whole process has to be smarter. Reporting period could be last fiscal year,
-    # but the stock that was sold last year could be bought 10 years ago, so we need rates for the buy date as well
-    # I like the idea of decoupling these 2 processes: rate fetching from ecb and tax calculation
-    # In prod there could be a separate db of rates and a cron that would fetch new rates daily.
-    # Or a simpler way -> infer start and end dates from brokerage statements and fetch from ecb on the fly
-    try:
-        exchange_rates = ExchangeRates(start_date=rates_start_date, end_date=rates_end_date, overwrite=False)
-    except ExchangeRatesCacheError as cache_error:
-        logging.warning("Cached exchange rates are insufficient (%s). Refreshing from ECB...", cache_error)
-        exchange_rates = ExchangeRates(start_date=rates_start_date, end_date=rates_end_date, overwrite=True)
-    rates_df = exchange_rates.get_rates()
+    wise_input_path = "data/input/oryna/2025/wise*.csv"
+
+    # Every input is scanned for the currencies and dates it converts before any of it is processed, so a
+    # missing currency fails here and the repository is asked for exactly that, in one update.
+    fx_requirements = FxRequirements.merge(
+        scan_fx_requirements_ibkr(
+            ibkr_statements,
+            reporting_start_date,
+            reporting_end_date,
+            ibkr_trade_history_path=ibkr_trade_history,
+            austrian_opening_state_path=austrian_opening_state_path,
+            authoritative_start_date=authoritative_start_date,
+        ),
+        *[
+            scan_fx_requirements_revolut(statement_path, reporting_start_date, reporting_end_date)
+            for statement_path in revolut_statement_paths
+        ],
+        scan_fx_requirements_freedom(
+            freedom_input_path, reporting_start_date, reporting_end_date, include_trades=include_freedom_trades
+        ),
+        *(
+            [scan_fx_requirements_wise(wise_input_path, reporting_start_date, reporting_end_date)]
+            if person == "oryna"
+            else []
+        ),
+    )
+    logging.info(f"Exchange rate requirements: {fx_requirements.bounds}")
+    # The repository keeps every rate fetched so far and only asks the ECB for the dates it does not hold yet.
+    rates_df = FxRepository(Path(DEFAULT_FX_REPOSITORY_DIR)).get_required_rates(fx_requirements)
+    fx_joiner = FxJoiner.from_rates_df(rates_df)
 
     report_sections: list[ReportSection] = []
     wise_summary_df: pl.DataFrame | None = None
 
     # ------- IBKR
     stock_sales_df, trades_summary_df, stock_position_state_df, stock_position_events_df = process_trades_ibkr(
-        exchange_rates_df=rates_df,
+        exchange_rates_df=fx_joiner,
         start_date=reporting_start_date,
         end_date=reporting_end_date,
         separate_trade_profit_loss=ibkr_calculate_trade_profit_loss_separately,
         excluded_trade_subcategories=ibkr_excluded_trade_subcategories,
         austrian_opening_state_path=austrian_opening_state_path,
-        ibkr_trade_history_path=ibkr_trade_history_path,
+        ibkr_trade_history_path=ibkr_trade_history,
         authoritative_start_date=authoritative_start_date,
+        position_checkpoint_dir=ibkr_position_checkpoint_dir,
+        position_journal_dir=ibkr_position_journal_dir,
     )
     dividends_country_agg_df, _, reit_dividends_country_agg_df = process_cash_transactions_ibkr(
-        xml_file_path=ibkr_input_path,
-        exchange_rates_df=rates_df,
+        xml_file_path=ibkr_statements,
+        exchange_rates_df=fx_joiner,
         start_date=reporting_start_date,
         end_date=reporting_end_date,
         extract_reit=True,
@@ -170,11 +188,11 @@ if __name__ == "__main__":
     )
 
     bonds_tax_df, bonds_tax_country_agg_df = process_bonds_ibkr(
-        xml_file_path=ibkr_input_path,
-        exchange_rates_df=rates_df,
+        xml_file_path=ibkr_statements,
+        exchange_rates_df=fx_joiner,
         start_date=reporting_start_date,
         end_date=reporting_end_date,
-        ibkr_trade_history_path=ibkr_trade_history_path,
+        ibkr_trade_history_path=ibkr_trade_history,
     )
 
     ibkr_writer = run_layout.writer("ibkr", reporting_start_date, reporting_end_date)
@@ -220,20 +238,11 @@ if __name__ == "__main__":
             logging.info("Removed stale empty IBKR summary artifact at %s", stale_ibkr_summary_path)
 
     # ------- Revolut
-    revolut_statement_paths = (
-        ["data/input/oryna/2025/revolut_2025_01_01_2025_12_31_en_us_1980166307_449cac.csv"]
-        if person == "oryna"
-        else [
-            "data/input/eugene/2025/revolut_2025-01-01_2025-12-31_en_eur.csv",
-            "data/input/eugene/2025/revolut_2025-01-01_2025-12-31_en_usd.csv",
-        ]
-    )
-
     revolut_summary_df = pl.concat(
         [
             process_revolut_savings_statement(
                 statement_path,
-                rates_df,
+                fx_joiner,
                 start_date=reporting_start_date,
                 end_date=reporting_end_date,
             )
@@ -249,8 +258,8 @@ if __name__ == "__main__":
     if person == "oryna":
         # ------- Wise
         wise_summary_df = process_wise_statement(
-            "data/input/oryna/2025/wise*.csv",
-            rates_df,
+            wise_input_path,
+            fx_joiner,
             start_date=reporting_start_date,
             end_date=reporting_end_date,
         )
@@ -269,7 +278,7 @@ if __name__ == "__main__":
     )
     freedom_summary_df = process_freedom_statement(
         freedom_input_path,
-        rates_df,
+        fx_joiner,
         start_date=reporting_start_date,
         end_date=reporting_end_date,
         exclude_corporate_action_ids_file=_existing_path_or_none(exclusion_file_path),
@@ -283,8 +292,8 @@ if __name__ == "__main__":
     report_sections.append(ReportSection("Freedom Finance", freedom_summary_df))
 
     ibkr_dividend_buckets_df = build_finanzonline_dividend_buckets_ibkr(
-        xml_file_path=ibkr_input_path,
-        exchange_rates_df=rates_df,
+        xml_file_path=ibkr_statements,
+        exchange_rates_df=fx_joiner,
         start_date=reporting_start_date,
         end_date=reporting_end_date,
         excluded_cash_transaction_subcategories={"ETF"},
@@ -300,7 +309,7 @@ if __name__ == "__main__":
 
     freedom_dividend_buckets_df = build_finanzonline_dividend_buckets_freedom(
         json_file_path=freedom_input_path,
-        exchange_rates_df=rates_df,
+        exchange_rates_df=fx_joiner,
         start_date=reporting_start_date,
         end_date=reporting_end_date,
         exclude_corporate_action_ids_file=_existing_path_or_none(exclusion_file_path),
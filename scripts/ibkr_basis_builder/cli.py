@@ -22,6 +22,11 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument("--raw-exchange-rates-path", default="data/input/currencies/raw_exchange_rates.csv")
     parser.add_argument("--output-path")
+    parser.add_argument(
+        "--replay-workers",
+        type=int,
+        help="Worker processes for replaying positions in parallel; by default positions are replayed serially.",
+    )
     return parser
 
 
@@ -41,6 +46,7 @@ def main() -> None:
         move_in_price_csv_path=args.move_in_price_csv_path,
         output_path=resolve_output_path(args.person, args.cutoff_date, args.output_path),
         move_in_price_template_path=args.move_in_price_template_path,
+        replay_workers=args.replay_workers,
     )
     print(output_path)
 
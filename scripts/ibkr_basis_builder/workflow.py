@@ -1,19 +1,18 @@
 from __future__ import annotations
 
-import glob
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date
 from pathlib import Path
 
-import lxml.etree as etree
 import polars as pl
 
 from scripts.reporting_funds.models import IbkrTrade, round_money, round_qty
-from scripts.reporting_funds.workflow import build_fx_table, get_fx_rate
-from tax_automation.moving_average import build_buy_event, build_sell_event, replay_events
-from tax_automation.broker_history import RawBrokerTrade, load_ibkr_stock_like_trades
+from scripts.reporting_funds.workflow import build_fx_table
+from tax_automation.moving_average import replay_states
+from tax_automation.broker_history import load_ibkr_stock_like_trades, load_ibkr_trade_table
+from tax_automation.fixed_point_replay import FIXED_POINT_ENGINE, iter_trade_table_events
+from tax_automation.ibkr_statements import IbkrStatementSource
 
-RAW_IBKR_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 SUPPORTED_ASSET_CLASSES = {"ETF", "COMMON", "REIT", "ADR"}
 
 
@@ -33,25 +32,7 @@ class SnapshotHolding:
     quantity: float
 
 
-def _resolve_file_paths(xml_file_path: str) -> list[str]:
-    path = Path(xml_file_path)
-    if path.exists():
-        if path.is_dir():
-            return sorted(str(candidate) for candidate in path.glob("*.xml"))
-        return [str(path)]
-    return sorted(glob.glob(xml_file_path))
-
-
-def _parse_trade_datetime(row: etree._Element) -> datetime:
-    raw_value = row.get("dateTime") or row.get("tradeDate")
-    if raw_value is None:
-        raise ValueError("IBKR trade row is missing dateTime/tradeDate")
-    if len(raw_value) == 10:
-        raw_value = f"{raw_value} 00:00:00"
-    return datetime.strptime(raw_value, RAW_IBKR_DATETIME_FORMAT)
-
-
-def load_ibkr_stock_and_etf_trades(xml_file_path: str, *, cutoff_date: date) -> list[BasisTrade]:
+def load_ibkr_stock_and_etf_trades(xml_file_path: IbkrStatementSource, *, cutoff_date: date) -> list[BasisTrade]:
     raw_trades = load_ibkr_stock_like_trades(
         xml_file_path,
         allowed_asset_classes=SUPPORTED_ASSET_CLASSES,
@@ -151,62 +132,35 @@ def build_opening_lot_snapshot(
     *,
     person: str,
     cutoff_date: date,
-    ibkr_trade_history_path: str | Path,
+    ibkr_trade_history_path: IbkrStatementSource,
     raw_exchange_rates_path: str | Path,
     move_in_price_csv_path: str | Path,
     output_path: str | Path,
     move_in_price_template_path: str | Path | None = None,
+    replay_workers: int | None = None,
 ) -> Path:
-    basis_trades = load_ibkr_stock_and_etf_trades(str(ibkr_trade_history_path), cutoff_date=cutoff_date)
-    currencies = tuple(
-        sorted({basis_trade.trade.currency for basis_trade in basis_trades if basis_trade.trade.currency != "EUR"} or {"USD"})
+    trade_table = load_ibkr_trade_table(
+        ibkr_trade_history_path,
+        allowed_asset_classes=SUPPORTED_ASSET_CLASSES,
+        cutoff_date=cutoff_date,
     )
+    if trade_table.is_empty():
+        raise ValueError("No pre-cutoff IBKR stock/ETF BUY/SELL trades were found.")
+    currencies = tuple(sorted((trade_table.currencies() - {"EUR"}) or {"USD"}))
     fx_table = build_fx_table(
-        start_date=min(basis_trade.trade.trade_date for basis_trade in basis_trades),
+        start_date=trade_table.min_trade_date(),
         end_date=cutoff_date,
         raw_exchange_rates_path=raw_exchange_rates_path,
         currencies=currencies,
     )
 
-    replayable_events = []
-    for basis_trade in basis_trades:
-        trade_fx = get_fx_rate(fx_table, basis_trade.trade.currency, basis_trade.trade.trade_date)
-        if basis_trade.trade.operation == "buy":
-            replayable_events.append(
-                build_buy_event(
-                    broker="ibkr",
-                    ticker=basis_trade.trade.ticker,
-                    isin=basis_trade.trade.isin,
-                    currency=basis_trade.trade.currency,
-                    asset_class=basis_trade.asset_class,
-                    trade_date=basis_trade.trade.trade_date,
-                    quantity=basis_trade.trade.quantity,
-                    price_ccy=basis_trade.trade.price_ccy,
-                    fx_to_eur=trade_fx,
-                    source_id=basis_trade.trade.trade_id,
-                    source_file=basis_trade.trade.source_statement_file,
-                    sequence_key=len(replayable_events),
-                )
-            )
-            continue
-        replayable_events.append(
-            build_sell_event(
-                broker="ibkr",
-                ticker=basis_trade.trade.ticker,
-                isin=basis_trade.trade.isin,
-                currency=basis_trade.trade.currency,
-                asset_class=basis_trade.asset_class,
-                trade_date=basis_trade.trade.trade_date,
-                quantity=basis_trade.trade.quantity,
-                price_ccy=basis_trade.trade.price_ccy,
-                fx_to_eur=trade_fx,
-                source_id=basis_trade.trade.trade_id,
-                source_file=basis_trade.trade.source_statement_file,
-                sequence_key=len(replayable_events),
-            )
-        )
-
-    states, _, _ = replay_events([], replayable_events)
+    fx_rates = fx_table.lookup_many(trade_table.df["currency"], trade_table.df["trade_date"])["fx_rate"]
+    states = replay_states(
+        [],
+        iter_trade_table_events(trade_table, fx_rates, broker="ibkr"),
+        max_workers=replay_workers,
+        engine=FIXED_POINT_ENGINE,
+    )
     asset_class_by_position = {(state.ticker, state.isin, state.currency): state.asset_class for state in states}
     holdings = [
         SnapshotHolding(
@@ -258,7 +212,7 @@ def build_opening_lot_snapshot(
             raise ValueError(
                 f"Move-in price currency {basis_currency} does not match position currency {state.currency} for {state.ticker} ({state.isin})"
             )
-        basis_fx = get_fx_rate(fx_table, basis_currency, cutoff_date)
+        basis_fx = fx_table.rate(basis_currency, cutoff_date)
         original_quantity = round_qty(state.quantity)
         original_cost_eur = round_money((original_quantity * basis_price_ccy) / basis_fx)
         notes = (
@@ -0,0 +1 @@
+"""Incremental ingestion of IBKR trade-history statements into a persistent trade ledger."""
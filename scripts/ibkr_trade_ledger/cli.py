@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from tax_automation.ibkr_statements import DEFAULT_PARSE_CACHE_DIR
+from tax_automation.trade_ledger import TradeLedger
+
+DEFAULT_PERSON = "eugene"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Maintain the normalized IBKR trade ledger.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser(
+        "ingest", help="Add trades from IBKR trade-history XML files that have not been ingested yet."
+    )
+    ingest_parser.add_argument("--person", default=DEFAULT_PERSON, help="Person key, for example eugene or oryna.")
+    ingest_parser.add_argument(
+        "--ibkr-trade-history-path",
+        help="XML file, wildcard, or directory. Defaults to data/input/<person>/ibkr/trades.",
+    )
+    ingest_parser.add_argument("--ledger-dir", help="Defaults to data/output/<person>/ibkr_trade_ledger.")
+    ingest_parser.add_argument("--parse-cache-dir", default=DEFAULT_PARSE_CACHE_DIR)
+    ingest_parser.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="Re-parse every IBKR XML file instead of reading previously parsed sections from --parse-cache-dir.",
+    )
+    ingest_parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="Parse multi-file IBKR XML inputs in this many worker processes.",
+    )
+    return parser
+
+
+def resolve_ledger_dir(person: str, explicit_path: str | None) -> Path:
+    return Path(explicit_path or f"data/output/{person}/ibkr_trade_ledger")
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    ledger = TradeLedger(resolve_ledger_dir(args.person, args.ledger_dir))
+    result = ledger.ingest(
+        args.ibkr_trade_history_path or f"data/input/{args.person}/ibkr/trades",
+        cache_dir=None if args.no_parse_cache else args.parse_cache_dir,
+        max_workers=args.parse_workers,
+    )
+    print(f"ledger: {ledger.root}")
+    print(f"ingested files: {len(result.ingested_files)}")
+    print(f"already ingested files: {len(result.skipped_files)}")
+    print(f"new rows: {result.added_rows}")
+    print(f"corrected rows: {result.corrected_rows}")
+    print(f"duplicate rows: {result.duplicate_rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import argparse
 from pathlib import Path
 
 from scripts.non_reporting_funds_exit.workflow import run_ibkr_reit_workflow, run_workflow
+from tax_automation.ibkr_statements import DEFAULT_PARSE_CACHE_DIR, IbkrStatementSource
+from tax_automation.trade_ledger import TradeLedger
 
 DEFAULT_PERSON = "eugene"
 
@@ -15,6 +17,10 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--statement-path", help="Freedom Finance JSON statement (freedom source).")
     parser.add_argument("--opening-state-path", help="IBKR Austrian opening state CSV (ibkr source).")
     parser.add_argument("--trade-history-path", help="IBKR trade history XML path/glob (ibkr source).")
+    parser.add_argument(
+        "--trade-ledger-dir",
+        help="Read trade history from this ledger (built by scripts/ibkr_trade_ledger/cli.py ingest) instead of XML.",
+    )
     parser.add_argument("--price-input-path")
     parser.add_argument("--sale-plan-path")
     parser.add_argument("--output-dir")
@@ -23,6 +29,17 @@ def build_parser() -> argparse.ArgumentParser:
         default="data/input/currencies/raw_exchange_rates.csv",
     )
     parser.add_argument("--tax-year", type=int, default=2025)
+    parser.add_argument("--parse-cache-dir", default=DEFAULT_PARSE_CACHE_DIR)
+    parser.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="Re-parse every IBKR XML file instead of reading previously parsed sections from --parse-cache-dir.",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="Parse multi-file IBKR XML inputs in this many worker processes.",
+    )
     return parser
 
 
@@ -73,7 +90,13 @@ def resolve_opening_state_path(person: str, tax_year: int, explicit_path: str |
     return f"data/input/{person}/ibkr/austrian_opening_state_2024-05-01.csv"
 
 
-def resolve_trade_history_path(person: str, explicit_path: str | None) -> str:
+def resolve_trade_history_path(
+    person: str,
+    explicit_path: str | None,
+    ledger_dir: str | None = None,
+) -> IbkrStatementSource:
+    if ledger_dir:
+        return TradeLedger(Path(ledger_dir)).to_statement_set()
     if explicit_path:
         return explicit_path
     return f"data/input/{person}/ibkr/trades/"
@@ -87,7 +110,7 @@ def main() -> None:
 
     if args.source == "ibkr":
         opening_state_path = resolve_opening_state_path(args.person, args.tax_year, args.opening_state_path)
-        trade_history_path = resolve_trade_history_path(args.person, args.trade_history_path)
+        trade_history_path = resolve_trade_history_path(args.person, args.trade_history_path, args.trade_ledger_dir)
         output_paths = run_ibkr_reit_workflow(
             opening_state_path=opening_state_path,
             ibkr_trade_history_path=trade_history_path,
@@ -96,6 +119,8 @@ def main() -> None:
             output_dir=output_dir,
             tax_year=args.tax_year,
             raw_exchange_rates_path=args.raw_exchange_rates_path,
+            parse_cache_dir=None if args.no_parse_cache else args.parse_cache_dir,
+            parse_workers=args.parse_workers,
         )
     else:
         statement_path = resolve_statement_path(args.person, args.tax_year, args.statement_path)
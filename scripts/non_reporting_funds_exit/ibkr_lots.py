@@ -8,6 +8,7 @@ from pathlib import Path
 from scripts.non_reporting_funds_exit.freedom_lots import NormalizedTrade
 from scripts.non_reporting_funds_exit.workflow import Lot, round_money, round_qty
 from tax_automation.broker_history import load_ibkr_stock_like_trades
+from tax_automation.ibkr_statements import IbkrStatementSource
 
 IBKR_REIT_TICKERS = ("CHCT", "CTRE", "MPW", "O")
 
@@ -128,7 +129,7 @@ def load_opening_lots(
 
 
 def load_ibkr_reit_trades(
-    xml_file_path: str | Path,
+    xml_file_path: IbkrStatementSource,
     target_tickers: tuple[str, ...] = IBKR_REIT_TICKERS,
     after_date: date | None = None,
 ) -> list[NormalizedTrade]:
@@ -139,7 +140,7 @@ def load_ibkr_reit_trades(
     optionally filters to trades strictly after after_date.
     """
     raw_trades = load_ibkr_stock_like_trades(
-        str(xml_file_path),
+        xml_file_path,
         allowed_asset_classes={"REIT"},
     )
 
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import csv
-from bisect import bisect_right
 from copy import deepcopy
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, time
@@ -10,8 +9,9 @@ from pathlib import Path
 import polars as pl
 
 from scripts.non_reporting_funds_exit.freedom_lots import TARGET_TICKERS, load_split_events, load_target_trades
-from tax_automation.const import EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
-from tax_automation.currencies import ExchangeRates, ExchangeRatesCacheError
+from tax_automation.fx_calendar import FxCalendar
+from tax_automation.fx_repository import load_exchange_rates
+from tax_automation.ibkr_statements import IbkrStatementSet, IbkrStatementSource
 
 MONEY_DIGITS = 6
 QTY_DIGITS = 8
@@ -109,55 +109,16 @@ def load_sale_rows(sale_plan_path: str | Path | None) -> list[dict[str, str]]:
         return [row for row in csv.DictReader(handle) if row.get("ticker")]
 
 
-def build_fx_table(
-    start_date: date, end_date: date, raw_exchange_rates_path: str | Path
-) -> dict[str, tuple[list[date], list[float]]]:
-    try:
-        exchange_rates = ExchangeRates(
-            start_date=start_date,
-            end_date=end_date,
-            overwrite=False,
-            raw_file_path=str(raw_exchange_rates_path),
-        )
-    except ExchangeRatesCacheError:
-        exchange_rates = ExchangeRates(
-            start_date=start_date,
-            end_date=end_date,
-            overwrite=True,
-            raw_file_path=str(raw_exchange_rates_path),
-        )
-
-    rates_df = exchange_rates.get_rates()
-    fx_table: dict[str, tuple[list[date], list[float]]] = {}
-    for currency in sorted(set(rates_df["currency"].to_list())):
-        currency_df = rates_df.filter(pl.col("currency") == currency).sort("rate_date")
-        fx_table[currency] = (currency_df["rate_date"].to_list(), currency_df["exchange_rate"].to_list())
-    return fx_table
-
+def build_fx_table(start_date: date, end_date: date, raw_exchange_rates_path: str | Path) -> FxCalendar:
+    rates_df = load_exchange_rates(start_date, end_date, raw_exchange_rates_path=raw_exchange_rates_path)
+    return FxCalendar.from_rates_df(rates_df)
 
-def get_fx_rate(fx_table: dict[str, tuple[list[date], list[float]]], currency: str, event_date: date) -> float:
-    if currency == "EUR":
-        return 1.0
-
-    if currency not in fx_table:
-        raise ValueError(f"Missing FX series for currency {currency}")
-
-    available_dates, available_rates = fx_table[currency]
-    index = bisect_right(available_dates, event_date) - 1
-    if index < 0:
-        raise ValueError(f"No FX rate available for {currency} on or before {event_date}")
-
-    matched_date = available_dates[index]
-    if (event_date - matched_date).days > EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET:
-        raise ValueError(
-            f"Closest FX rate for {currency} on {event_date} is too old: {matched_date} "
-            f"(>{EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET} days)"
-        )
 
-    return float(available_rates[index])
+def get_fx_rate(fx_table: FxCalendar, currency: str, event_date: date) -> float:
+    return float(fx_table.rate(currency, event_date))
 
 
-def build_buy_lot(trade, fx_table: dict[str, tuple[list[date], list[float]]], statement_path: str) -> Lot:
+def build_buy_lot(trade, fx_table: FxCalendar, statement_path: str) -> Lot:
     buy_fx = get_fx_rate(fx_table, trade.trade_currency, trade.trade_date)
     return Lot(
         ticker=trade.ticker,
@@ -215,7 +176,7 @@ def process_events_into_lots(
     initial_lots: list[Lot],
     trades: list,
     split_events: list,
-    fx_table: dict[str, tuple[list[date], list[float]]],
+    fx_table: FxCalendar,
     tax_year: int,
     source_label: str = "",
     *,
@@ -254,7 +215,7 @@ def process_events_into_lots(
 
 def build_lots(
     statement_path: str | Path,
-    fx_table: dict[str, tuple[list[date], list[float]]],
+    fx_table: FxCalendar,
     tax_year: int,
 ) -> tuple[list[Lot], date]:
     statement_path = str(statement_path)
@@ -267,7 +228,7 @@ def build_lots(
 def continue_lot_history(
     lots: list[Lot],
     statement_path: str | Path,
-    fx_table: dict[str, tuple[list[date], list[float]]],
+    fx_table: FxCalendar,
     tax_year: int,
 ) -> list[Lot]:
     trades = load_target_trades(statement_path)
@@ -283,7 +244,7 @@ def apply_year_end_stepup(
     price_rows: dict[str, dict[str, str]],
     tax_year: int,
     year_end_date: date,
-    fx_table: dict[str, tuple[list[date], list[float]]],
+    fx_table: FxCalendar,
 ) -> tuple[list[dict[str, object]], list[dict[str, object]]]:
     calc_rows: list[dict[str, object]] = []
     adjustment_rows: list[dict[str, object]] = []
@@ -394,7 +355,7 @@ def empty_sales_df() -> pl.DataFrame:
 def simulate_sales(
     lots: list[Lot],
     sale_rows: list[dict[str, str]],
-    fx_table: dict[str, tuple[list[date], list[float]]],
+    fx_table: FxCalendar,
 ) -> pl.DataFrame:
     if not sale_rows:
         return empty_sales_df()
@@ -574,7 +535,7 @@ def run_workflow(
 
 def run_ibkr_reit_workflow(
     opening_state_path: str | Path,
-    ibkr_trade_history_path: str | Path,
+    ibkr_trade_history_path: IbkrStatementSource,
     price_input_path: str | Path,
     output_dir: str | Path,
     tax_year: int = 2025,
@@ -582,6 +543,8 @@ def run_ibkr_reit_workflow(
     raw_exchange_rates_path: str | Path = "data/input/currencies/raw_exchange_rates.csv",
     target_tickers: tuple[str, ...] | None = None,
     include_post_year_end_trades: bool = False,
+    parse_cache_dir: str | Path | None = None,
+    parse_workers: int | None = None,
 ) -> dict[str, Path]:
     """Non-reporting funds (Nicht-Meldefonds) workflow for IBKR REITs.
 
@@ -607,7 +570,9 @@ def run_ibkr_reit_workflow(
 
     snapshot_date = opening_lots[0].buy_date
     reit_trades = load_ibkr_reit_trades(
-        ibkr_trade_history_path, target_tickers=target_tickers, after_date=snapshot_date,
+        IbkrStatementSet.coerce(ibkr_trade_history_path, cache_dir=parse_cache_dir, max_workers=parse_workers),
+        target_tickers=target_tickers,
+        after_date=snapshot_date,
     )
 
     price_rows = load_price_rows(price_input_path, tax_year, target_tickers=target_tickers)
@@ -0,0 +1 @@
+"""Synthetic benchmark of the moving-average position replay."""
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import random
+import resource
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterator
+
+from tax_automation.fixed_point_replay import FIXED_POINT_ENGINE, FixedPointEvent
+from tax_automation.moving_average import (
+    DECIMAL_ENGINE,
+    PositionEvent,
+    PositionRecordSink,
+    build_buy_event,
+    build_sell_event,
+    position_events_to_df,
+    replay_events,
+    replay_into,
+    replay_states,
+)
+
+DEFAULT_EVENT_COUNT = 1_000_000
+DEFAULT_ISIN_COUNT = 500
+ENGINES = {"decimal": DECIMAL_ENGINE, "fixed_point": FIXED_POINT_ENGINE}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Time a moving-average replay over synthetic trade events.")
+    parser.add_argument("--events", type=int, default=DEFAULT_EVENT_COUNT, help="Number of trade events to replay.")
+    parser.add_argument("--isins", type=int, default=DEFAULT_ISIN_COUNT, help="Number of positions they spread over.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--keep-rows",
+        action="store_true",
+        help="Also capture the event and sale rows into a PositionRecordSink and build their frames.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(ENGINES),
+        default="decimal",
+        help="Replay arithmetic; fixed_point events are converted to integer units before the replay is timed.",
+    )
+    return parser
+
+
+def synthetic_events(event_count: int, isin_count: int, seed: int = 0) -> Iterator[PositionEvent]:
+    """Buys and partial sells in application order; every sell leaves part of the position open."""
+    rng = random.Random(seed)
+    quantities = [Decimal("0")] * isin_count
+    trade_date = date(2000, 1, 1)
+    for index in range(event_count):
+        if index % isin_count == 0:
+            trade_date += timedelta(days=1)
+        position = rng.randrange(isin_count)
+        quantity = Decimal(rng.randint(1, 10**6)).scaleb(-4)
+        price = Decimal(rng.randint(100, 10**6)).scaleb(-2)
+        fx = Decimal(rng.randint(9000, 13000)).scaleb(-4)
+        build_event = build_buy_event
+        if quantities[position] > 0 and rng.random() < 0.4:
+            build_event = build_sell_event
+            quantity = min(quantity, quantities[position] / 2).quantize(Decimal("0.0001"))
+            if quantity <= 0:
+                build_event = build_buy_event
+                quantity = Decimal("1")
+        event = build_event(
+            broker="ibkr",
+            ticker=f"T{position}",
+            isin=f"XX{position:010d}",
+            currency="USD",
+            asset_class="COMMON",
+            trade_date=trade_date,
+            quantity=quantity,
+            price_ccy=price,
+            fx_to_eur=fx,
+            source_id=str(index),
+            source_file="synthetic.xml",
+            sequence_key=index,
+        )
+        quantities[position] += quantity if build_event is build_buy_event else -quantity
+        yield event
+
+
+def _max_rss_mib() -> float:
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    baseline_rss = _max_rss_mib()
+    started = time.perf_counter()
+    events = list(synthetic_events(args.events, args.isins, args.seed))
+    if args.engine == "fixed_point":
+        events = [FixedPointEvent.from_event(event) for event in events]
+    build_seconds = time.perf_counter() - started
+    events_rss = _max_rss_mib()
+
+    started = time.perf_counter()
+    if args.keep_rows and args.engine == "fixed_point":
+        states, event_rows, sale_rows = replay_events([], events, presorted=True, engine=FIXED_POINT_ENGINE)
+        position_events_to_df(event_rows)
+    elif args.keep_rows:
+        sink = PositionRecordSink()
+        states = replay_into([], events, sink, presorted=True)
+        sink.events_df(), sink.sales_df()
+    else:
+        states = replay_states([], events, engine=ENGINES[args.engine])
+    replay_seconds = time.perf_counter() - started
+    replay_rss = _max_rss_mib()
+
+    print(f"events: {len(events)} over {len(states)} positions")
+    print(f"event build: {build_seconds:.2f} s, resident +{events_rss - baseline_rss:.0f} MiB")
+    print(f"replay: {replay_seconds:.2f} s ({replay_seconds / len(events) * 1e6:.2f} us/event)")
+    print(f"peak resident memory: {replay_rss:.0f} MiB")
+
+if __name__ == "__main__":
+    main()
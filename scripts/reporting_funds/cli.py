@@ -5,6 +5,8 @@ from datetime import date
 from pathlib import Path
 
 from scripts.reporting_funds.workflow import run_workflow
+from tax_automation.ibkr_statements import DEFAULT_PARSE_CACHE_DIR, IbkrStatementSource
+from tax_automation.trade_ledger import TradeLedger
 
 DEFAULT_PERSON = "eugene"
 
@@ -22,6 +24,10 @@ def build_parser() -> argparse.ArgumentParser:
         ),
     )
     parser.add_argument("--ibkr-trade-history-path")
+    parser.add_argument(
+        "--trade-ledger-dir",
+        help="Read trade history from this ledger (built by scripts/ibkr_trade_ledger/cli.py ingest) instead of XML.",
+    )
     parser.add_argument("--oekb-root-dir")
     parser.add_argument("--state-dir")
     parser.add_argument("--output-dir")
@@ -52,10 +58,32 @@ def build_parser() -> argparse.ArgumentParser:
         "--negative-deemed-income-overrides-path",
         help="Optional CSV with manual decisions for annual reports that contain negative deemed distributed income.",
     )
+    parser.add_argument("--parse-cache-dir", default=DEFAULT_PARSE_CACHE_DIR)
+    parser.add_argument(
+        "--no-parse-cache",
+        action="store_true",
+        help="Re-parse every IBKR XML file instead of reading previously parsed sections from --parse-cache-dir.",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="Parse multi-file IBKR XML inputs in this many worker processes.",
+    )
+    parser.add_argument(
+        "--position-journal-dir",
+        help="Append the year's position events to the Parquet event journal (partitioned by ISIN and year) here.",
+    )
     return parser
 
 
-def resolve_ibkr_trade_history_path(person: str, tax_year: int, explicit_path: str | None) -> str:
+def resolve_ibkr_trade_history_path(
+    person: str,
+    tax_year: int,
+    explicit_path: str | None,
+    ledger_dir: str | None = None,
+) -> IbkrStatementSource:
+    if ledger_dir:
+        return TradeLedger(Path(ledger_dir)).to_statement_set()
     if explicit_path:
         return explicit_path
 
@@ -80,7 +108,9 @@ def main() -> None:
         tax_year=args.tax_year,
         ibkr_tax_xml_path=args.ibkr_tax_xml_path,
         historical_ibkr_tax_xml_path=args.historical_ibkr_tax_xml_path,
-        ibkr_trade_history_path=resolve_ibkr_trade_history_path(args.person, args.tax_year, args.ibkr_trade_history_path),
+        ibkr_trade_history_path=resolve_ibkr_trade_history_path(
+            args.person, args.tax_year, args.ibkr_trade_history_path, args.trade_ledger_dir
+        ),
         oekb_root_dir=args.oekb_root_dir,
         state_dir=args.state_dir,
         output_dir=args.output_dir,
@@ -93,6 +123,9 @@ def main() -> None:
             date.fromisoformat(args.authoritative_start_date) if args.authoritative_start_date else None
         ),
         carryforward_only=args.carryforward_only,
+        parse_cache_dir=None if args.no_parse_cache else args.parse_cache_dir,
+        parse_workers=args.parse_workers,
+        position_journal_dir=args.position_journal_dir,
     )
     for label, path in output_paths.items():
         print(f"{label}: {path}")
@@ -1,12 +1,8 @@
 from __future__ import annotations
 
-import glob
 from collections import defaultdict
 from decimal import Decimal
 from datetime import date, datetime
-from pathlib import Path
-
-import lxml.etree as etree
 
 from scripts.reporting_funds.models import (
     BrokerDividendEvent,
@@ -16,17 +12,8 @@ from scripts.reporting_funds.models import (
     round_money,
     round_qty,
 )
-
-RAW_IBKR_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
-
-
-def _parse_trade_datetime(row: etree._Element) -> datetime:
-    raw_value = row.get("dateTime") or row.get("tradeDate")
-    if raw_value is None:
-        raise ValueError("IBKR trade row is missing dateTime/tradeDate")
-    if len(raw_value) == 10:
-        raw_value = f"{raw_value} 00:00:00"
-    return datetime.strptime(raw_value, RAW_IBKR_DATETIME_FORMAT)
+from tax_automation.broker_history import ibkr_trade_index
+from tax_automation.ibkr_statements import SOURCE_FILE_COL, IbkrStatementSet, IbkrStatementSource
 
 
 def _parse_optional_date(raw_value: str | None) -> date | None:
@@ -47,101 +34,32 @@ def _parse_optional_float(raw_value: str | None) -> Decimal | None:
     return round_money(Decimal(raw_value))
 
 
-def _resolve_file_paths(xml_file_path: str) -> list[str]:
-    path = Path(xml_file_path)
-    if path.exists():
-        if path.is_dir():
-            return sorted(str(candidate) for candidate in path.glob("*.xml"))
-        return [str(path)]
-    return sorted(glob.glob(xml_file_path))
-
-
-def _iter_unique_rows(xml_file_path: str, parent_tags: tuple[str, ...], row_tags: set[str]) -> list[tuple[str, etree._Element]]:
-    file_paths = _resolve_file_paths(xml_file_path)
-    if not file_paths:
-        raise FileNotFoundError(f"No files matched the pattern: {xml_file_path}")
-
-    seen_rows: set[tuple[str, tuple[tuple[str, str], ...]]] = set()
-    unique_rows: list[tuple[str, etree._Element]] = []
-    for path in file_paths:
-        root = etree.parse(path).getroot()
-        for parent_tag in parent_tags:
-            for parent in root.findall(parent_tag):
-                for row in parent:
-                    if row.tag not in row_tags:
-                        continue
-                    row_key = (row.tag, tuple(sorted(row.items())))
-                    if row_key in seen_rows:
-                        continue
-                    seen_rows.add(row_key)
-                    unique_rows.append((path, row))
-    return unique_rows
-
-
-def load_ibkr_etf_trades(xml_file_path: str, require_raw_trades: bool) -> list[IbkrTrade]:
-    raw_trades: list[IbkrTrade] = []
-    closed_lot_rows_detected = False
-
-    for path, row in _iter_unique_rows(
-        xml_file_path,
-        parent_tags=(".//TradeConfirms", ".//Trades"),
-        row_tags={"TradeConfirm", "Trade", "Lot"},
-    ):
-        asset_category = (row.get("assetCategory") or "").strip()
-        if asset_category == "CASH":
-            continue
-
-        sub_category = (row.get("subCategory") or "").strip()
-        if sub_category != "ETF":
-            if row.tag == "Lot" and (row.get("levelOfDetail") or "") == "CLOSED_LOT":
-                closed_lot_rows_detected = True
-            continue
-
-        level_of_detail = (row.get("levelOfDetail") or "").strip()
-        if row.tag == "Lot" and level_of_detail == "CLOSED_LOT":
-            closed_lot_rows_detected = True
-            continue
-
-        buy_sell = (row.get("buySell") or "").strip().upper()
-        if buy_sell not in {"BUY", "SELL"}:
-            continue
-
-        trade_datetime = _parse_trade_datetime(row)
-        trade_price = row.get("tradePrice") or row.get("price")
-        quantity = row.get("quantity")
-        currency = row.get("currency")
-        symbol = row.get("symbol")
-        isin = row.get("isin") or row.get("securityID")
-        if not all([trade_price, quantity, currency, symbol, isin]):
-            raise ValueError("IBKR raw ETF trade row is missing required fields")
-
-        trade_id = (
-            row.get("tradeID")
-            or row.get("transactionID")
-            or row.get("ibOrderID")
-            or f"{symbol}:{trade_datetime.isoformat()}:{buy_sell}"
-        )
-
-        raw_trades.append(
-            IbkrTrade(
-                ticker=symbol.strip(),
-                isin=isin.strip(),
-                trade_date=trade_datetime.date(),
-                trade_datetime=trade_datetime,
-                operation=buy_sell.lower(),
-                quantity=round_qty(abs(Decimal(quantity))),
-                price_ccy=round_money(Decimal(trade_price)),
-                currency=currency.strip(),
-                trade_id=trade_id.strip(),
-                account_id=(row.get("accountId") or "").strip(),
-                source_statement_file=path,
-            )
+def load_ibkr_etf_trades(xml_file_path: IbkrStatementSource, require_raw_trades: bool) -> list[IbkrTrade]:
+    trade_index = ibkr_trade_index(xml_file_path)
+    trade_table = trade_index.select(
+        asset_classes={"ETF"},
+        exclude_asset_categories={"CASH"},
+        missing_fields_message="IBKR raw ETF trade row is missing required fields",
+    )
+    raw_trades = [
+        IbkrTrade(
+            ticker=trade.ticker,
+            isin=trade.isin,
+            trade_date=trade.trade_date,
+            trade_datetime=trade.trade_datetime,
+            operation=trade.operation,
+            quantity=trade.quantity,
+            price_ccy=trade.price_ccy,
+            currency=trade.currency,
+            trade_id=trade.trade_id,
+            account_id=trade.account_id,
+            source_statement_file=trade.source_statement_file,
         )
-
-    raw_trades.sort(key=lambda trade: (trade.trade_datetime, trade.trade_id, trade.operation))
+        for trade in trade_table.iter_trades()
+    ]
 
     if require_raw_trades and not raw_trades:
-        if closed_lot_rows_detected:
+        if trade_index.has_closed_lots:
             raise ValueError(
                 "IBKR file contains only closed lots for ETFs. Initial reporting-fund bootstrap requires raw BUY/SELL trade history."
             )
@@ -150,13 +68,9 @@ def load_ibkr_etf_trades(xml_file_path: str, require_raw_trades: bool) -> list[I
     return raw_trades
 
 
-def load_ibkr_etf_dividend_accrual_rows(xml_file_path: str) -> list[IbkrDividendAccrualRow]:
+def load_ibkr_etf_dividend_accrual_rows(xml_file_path: IbkrStatementSource) -> list[IbkrDividendAccrualRow]:
     rows: list[IbkrDividendAccrualRow] = []
-    for path, row in _iter_unique_rows(
-        xml_file_path,
-        parent_tags=(".//ChangeInDividendAccruals",),
-        row_tags={"ChangeInDividendAccrual"},
-    ):
+    for row in IbkrStatementSet.coerce(xml_file_path).dividend_accruals.iter_rows(named=True):
         if (row.get("subCategory") or "").strip() != "ETF":
             continue
 
@@ -187,7 +101,7 @@ def load_ibkr_etf_dividend_accrual_rows(xml_file_path: str) -> list[IbkrDividend
                 code=(row.get("code") or "").strip(),
                 action_id=(row.get("actionID") or "").strip(),
                 account_id=(row.get("accountId") or "").strip(),
-                source_statement_file=path,
+                source_statement_file=row[SOURCE_FILE_COL],
             )
         )
 
@@ -195,13 +109,9 @@ def load_ibkr_etf_dividend_accrual_rows(xml_file_path: str) -> list[IbkrDividend
     return rows
 
 
-def load_ibkr_etf_cash_dividend_rows(xml_file_path: str) -> list[IbkrCashDividendRow]:
+def load_ibkr_etf_cash_dividend_rows(xml_file_path: IbkrStatementSource) -> list[IbkrCashDividendRow]:
     rows: list[IbkrCashDividendRow] = []
-    for path, row in _iter_unique_rows(
-        xml_file_path,
-        parent_tags=(".//CashTransactions",),
-        row_tags={"CashTransaction"},
-    ):
+    for row in IbkrStatementSet.coerce(xml_file_path).cash_transactions.iter_rows(named=True):
         if (row.get("subCategory") or "").strip() != "ETF":
             continue
         if (row.get("type") or "").strip() != "Dividends":
@@ -226,7 +136,7 @@ def load_ibkr_etf_cash_dividend_rows(xml_file_path: str) -> list[IbkrCashDividen
                 action_id=(row.get("actionID") or "").strip(),
                 account_id=(row.get("accountId") or "").strip(),
                 report_date=_parse_optional_date(row.get("reportDate")),
-                source_statement_file=path,
+                source_statement_file=row[SOURCE_FILE_COL],
             )
         )
 
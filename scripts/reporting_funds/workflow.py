@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from bisect import bisect_right
 from collections import defaultdict
 from copy import deepcopy
+from dataclasses import replace
 from decimal import Decimal
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from itertools import combinations
 from pathlib import Path
+from typing import Iterable
 
 import polars as pl
 
@@ -25,10 +26,13 @@ from scripts.reporting_funds.models import (
     round_qty,
 )
 from scripts.reporting_funds.oekb_csv import load_matching_oekb_reports, load_required_oekb_reports
-from tax_automation.const import EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
-from tax_automation.currencies import ExchangeRates
+from tax_automation.fx_calendar import FxCalendar
+from tax_automation.fx_repository import load_exchange_rates
+from tax_automation.ibkr_statements import IbkrStatementSet, IbkrStatementSource
 from tax_automation.moving_average import (
     EVENT_TYPE_AUSTRIAN_BASIS_RESET,
+    HoldingsIndex,
+    PositionEvent,
     PositionState,
     aggregate_state_rows,
     apply_event,
@@ -42,7 +46,8 @@ from tax_automation.moving_average import (
     position_states_to_df,
     replay_events,
 )
-from tax_automation.precision import cast_decimal_columns_to_float, quantize_fx, quantize_money, quantize_qty, to_decimal, to_output_float
+from tax_automation.position_journal import PositionEventJournal
+from tax_automation.precision import cast_decimal_columns_to_float, quantize_money, quantize_qty, to_decimal, to_output_float
 
 NEGATIVE_DEEMED_DISTRIBUTION_IGNORE = "ignore"
 NEGATIVE_DEEMED_DISTRIBUTION_APPLY_FULL = "apply_full"
@@ -60,48 +65,9 @@ def build_fx_table(
     end_date: date,
     raw_exchange_rates_path: str | Path,
     currencies: tuple[str, ...],
-) -> dict[str, tuple[list[date], list[Decimal]]]:
-    raw_exchange_rates_path = Path(raw_exchange_rates_path)
-    overwrite_rates_cache = raw_exchange_rates_path == Path("data/input/currencies/raw_exchange_rates.csv")
-    exchange_rates = ExchangeRates(
-        start_date=start_date,
-        end_date=end_date,
-        currencies=currencies,
-        overwrite=overwrite_rates_cache,
-        raw_file_path=str(raw_exchange_rates_path),
-    )
-
-    rates_df = exchange_rates.get_rates()
-    fx_table: dict[str, tuple[list[date], list[Decimal]]] = {}
-    for currency in sorted(set(rates_df["currency"].to_list())):
-        currency_df = rates_df.filter(pl.col("currency") == currency).sort("rate_date")
-        fx_table[currency] = (
-            currency_df["rate_date"].to_list(),
-            [quantize_fx(value) for value in currency_df["exchange_rate"].to_list()],
-        )
-    return fx_table
-
-
-def get_fx_rate(fx_table: dict[str, tuple[list[date], list[Decimal]]], currency: str, event_date: date) -> Decimal:
-    if currency == "EUR":
-        return Decimal("1")
-
-    if currency not in fx_table:
-        raise ValueError(f"Missing FX series for currency {currency}")
-
-    available_dates, available_rates = fx_table[currency]
-    index = bisect_right(available_dates, event_date) - 1
-    if index < 0:
-        raise ValueError(f"No FX rate available for {currency} on or before {event_date}")
-
-    matched_date = available_dates[index]
-    if (event_date - matched_date).days > EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET:
-        raise ValueError(
-            f"Closest FX rate for {currency} on {event_date} is too old: {matched_date} "
-            f"(>{EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET} days)"
-        )
-
-    return quantize_fx(available_rates[index])
+) -> FxCalendar:
+    rates_df = load_exchange_rates(start_date, end_date, currencies, raw_exchange_rates_path)
+    return FxCalendar.from_rates_df(rates_df)
 
 
 def load_state(path: str | Path) -> list[PositionState]:
@@ -195,20 +161,23 @@ def payout_state_to_df(rows: list[PayoutStateRow]) -> pl.DataFrame:
     return cast_decimal_columns_to_float(pl.DataFrame([row.to_record() for row in rows])).sort(["ticker", "pay_date", "payout_key"])
 
 
-def prepare_positions_for_new_year(positions: list[PositionState]) -> list[PositionState]:
-    return list(clone_states(positions).values())
+def prepare_positions_for_new_year(positions: list[PositionState]) -> dict[str, PositionState]:
+    """Working states keyed by `position_key`; the workflow mutates them in place event by event."""
+    return clone_states(positions)
+
+
+def _sorted_positions(positions: Iterable[PositionState]) -> list[PositionState]:
+    return sorted(positions, key=lambda item: (item.asset_class, item.ticker, item.isin))
 
 
 def _apply_position_event(
-    positions: list[PositionState],
+    positions: dict[str, PositionState],
     event,
     *,
     event_rows: list[dict[str, object]] | None = None,
     sale_rows: list[dict[str, object]] | None = None,
 ) -> None:
-    state_map = clone_states(positions)
-    result = apply_event(state_map, event)
-    positions[:] = sorted(state_map.values(), key=lambda item: (item.asset_class, item.ticker, item.isin))
+    result = apply_event(positions, event)
     if event_rows is not None:
         event_rows.append(result.event_record)
     if sale_rows is not None and result.sale_record is not None:
@@ -216,32 +185,23 @@ def _apply_position_event(
 
 
 def apply_trade(
-    positions: list[PositionState],
+    positions: dict[str, PositionState],
     trade: IbkrTrade,
-    fx_table: dict[str, tuple[list[date], list[Decimal]]],
+    fx_table: FxCalendar,
     sale_rows: list[dict[str, object]] | None = None,
     *,
     event_rows: list[dict[str, object]] | None = None,
     sequence_key: int = 0,
+    fx_to_eur: Decimal | None = None,
 ) -> None:
-    trade_fx = get_fx_rate(fx_table, trade.currency, trade.trade_date)
+    trade_fx = fx_to_eur if fx_to_eur is not None else fx_table.rate(trade.currency, trade.trade_date)
+    event = _trade_event(trade, trade_fx, sequence_key)
+    _apply_position_event(positions, event, event_rows=event_rows, sale_rows=sale_rows)
+
+
+def _trade_event(trade: IbkrTrade, fx_to_eur: Decimal, sequence_key: int) -> PositionEvent:
     if trade.operation == "buy":
-        event = build_buy_event(
-            broker="ibkr",
-            ticker=trade.ticker,
-            isin=trade.isin,
-            currency=trade.currency,
-            asset_class="ETF",
-            trade_date=trade.trade_date,
-            quantity=trade.quantity,
-            price_ccy=trade.price_ccy,
-            fx_to_eur=trade_fx,
-            source_id=trade.trade_id,
-            source_file=trade.source_statement_file,
-            sequence_key=sequence_key,
-        )
-    else:
-        event = build_sell_event(
+        return build_buy_event(
             broker="ibkr",
             ticker=trade.ticker,
             isin=trade.isin,
@@ -250,18 +210,66 @@ def apply_trade(
             trade_date=trade.trade_date,
             quantity=trade.quantity,
             price_ccy=trade.price_ccy,
-            fx_to_eur=trade_fx,
+            fx_to_eur=fx_to_eur,
             source_id=trade.trade_id,
             source_file=trade.source_statement_file,
-            notes="Moving-average ETF sale result uses Austrian EUR basis plus cumulative OeKB acquisition-cost corrections.",
             sequence_key=sequence_key,
         )
-    _apply_position_event(positions, event, event_rows=event_rows, sale_rows=sale_rows)
+    return build_sell_event(
+        broker="ibkr",
+        ticker=trade.ticker,
+        isin=trade.isin,
+        currency=trade.currency,
+        asset_class="ETF",
+        trade_date=trade.trade_date,
+        quantity=trade.quantity,
+        price_ccy=trade.price_ccy,
+        fx_to_eur=fx_to_eur,
+        source_id=trade.trade_id,
+        source_file=trade.source_statement_file,
+        notes="Moving-average ETF sale result uses Austrian EUR basis plus cumulative OeKB acquisition-cost corrections.",
+        sequence_key=sequence_key,
+    )
 
 
-def _eligible_positions(positions: list[PositionState], isin: str, eligibility_date: date) -> list[PositionState]:
-    del eligibility_date
-    return [position for position in positions if position.isin == isin and position.quantity > 0]
+def _trade_holdings_index(
+    opening_states: Iterable[PositionState],
+    opening_as_of: date,
+    trades: list[IbkrTrade],
+    trade_fx: dict[tuple[str, date], Decimal],
+) -> HoldingsIndex:
+    """
+    Point-in-time quantities of the whole trade replay, built before any report is processed.
+
+    OeKB reports change basis, never quantity, so eligibility queries for any date of the year, including dates
+    after the report being processed, read the quantity actually held on that date.
+    """
+    opening_states = list(opening_states)
+    holdings = HoldingsIndex.from_states(opening_states, opening_as_of)
+    events = (
+        _trade_event(trade, trade_fx[(trade.currency, trade.trade_date)], index) for index, trade in enumerate(trades)
+    )
+    replay_events(opening_states, events, holdings_index=holdings)
+    return holdings
+
+
+def _eligible_positions(
+    positions: dict[str, PositionState],
+    isin: str,
+    eligibility_date: date,
+    holdings: HoldingsIndex | None = None,
+) -> list[PositionState]:
+    """Positions in `isin` with the quantity held at the start of `eligibility_date` (current quantity without index)."""
+    isin_positions = _sorted_positions(position for position in positions.values() if position.isin == isin)
+    if holdings is None:
+        return [position for position in isin_positions if position.quantity > 0]
+    day_before = eligibility_date - timedelta(days=1)
+    eligible: list[PositionState] = []
+    for position in isin_positions:
+        held = holdings.holdings_as_of(isin, day_before, broker=position.broker).quantity
+        if held > 0:
+            eligible.append(position if held == position.quantity else replace(position, quantity=held))
+    return eligible
 
 
 def _sum_shares(positions: list[PositionState]) -> Decimal:
@@ -278,26 +286,27 @@ def _ensure_position_compatibility(positions: list[PositionState], report: OekbR
 
 
 def apply_basis_correction(
-    positions: list[PositionState],
+    positions: dict[str, PositionState],
     report: OekbReport,
     tax_year: int,
-    fx_table: dict[str, tuple[list[date], list[Decimal]]],
+    fx_table: FxCalendar,
     *,
     quantity_override: Decimal | None = None,
     note_prefix: str = "",
     event_rows: list[dict[str, object]] | None = None,
     sequence_key_start: int = 0,
+    holdings: HoldingsIndex | None = None,
 ) -> dict[str, object]:
     if report.is_ausschuettungsmeldung and not (report.ex_tag or report.ausschuettungstag):
         raise ValueError(f"OeKB distribution report for {report.ticker} is missing both Ex-Tag and Ausschüttungstag")
 
     eligibility_date = report.eligibility_date
     effective_date = report.ausschuettungstag or report.meldedatum
-    eligible_positions = _eligible_positions(positions, report.isin, eligibility_date)
+    eligible_positions = _eligible_positions(positions, report.isin, eligibility_date, holdings)
     _ensure_position_compatibility(eligible_positions, report)
 
     shares_held = _sum_shares(eligible_positions) if quantity_override is None else round_qty(quantity_override)
-    fx_to_eur = get_fx_rate(fx_table, report.currency, effective_date)
+    fx_to_eur = fx_table.rate(report.currency, effective_date)
     basis_stepup_total_ccy = round_money(report.acquisition_cost_correction_per_share_ccy * shares_held)
     basis_stepup_total_eur = round_money(basis_stepup_total_ccy / fx_to_eur)
 
@@ -526,8 +535,8 @@ def _resolve_annual_10595_reports(
     annual_reports: list[OekbReport],
     *,
     target_tax_year: int,
-    positions_for_quantity: list[PositionState],
-    fx_table: dict[str, tuple[list[date], list[Decimal]]],
+    positions_for_quantity: dict[str, PositionState],
+    fx_table: FxCalendar,
 ) -> tuple[list[dict[str, object]], list[dict[str, object]]]:
     del positions_for_quantity
     income_rows: list[dict[str, object]] = []
@@ -630,7 +639,7 @@ def _resolve_annual_10595_reports(
                     )) if payout.quantity else 0.0,
                     "amount_total_ccy": to_output_float(round_money(payout.broker_gross_amount_ccy)),
                     "amount_total_eur": to_output_float(round_money(
-                        payout.broker_gross_amount_ccy / get_fx_rate(fx_table, payout.currency, payout.pay_date)
+                        payout.broker_gross_amount_ccy / fx_table.rate(payout.currency, payout.pay_date)
                     )),
                     "creditable_foreign_tax_total_ccy": 0.0,
                     "creditable_foreign_tax_total_eur": 0.0,
@@ -708,8 +717,19 @@ def _resolve_broker_cash_payouts_outside_annual_periods(
     return resolution_rows
 
 
-def _build_broker_dividend_row(event: BrokerDividendEvent, fx_table: dict[str, tuple[list[date], list[Decimal]]]) -> dict[str, object]:
-    fx_to_eur = get_fx_rate(fx_table, event.currency, event.pay_date)
+def _build_broker_dividend_rows(events: list[BrokerDividendEvent], fx_table: FxCalendar) -> list[dict[str, object]]:
+    fx_df = fx_table.lookup_many(
+        [event.currency for event in events],
+        [event.pay_date for event in events],
+        [round_money(event.gross_amount or 0) for event in events],
+    )
+    return [
+        _build_broker_dividend_row(event, amount_total_eur)
+        for event, amount_total_eur in zip(events, fx_df["amount_eur"].to_list())
+    ]
+
+
+def _build_broker_dividend_row(event: BrokerDividendEvent, amount_total_eur: Decimal) -> dict[str, object]:
     gross_amount_ccy = round_money(event.gross_amount or 0)
     net_amount_ccy = round_money(event.net_amount or 0)
     tax_ccy = round_money(event.tax or 0)
@@ -730,7 +750,7 @@ def _build_broker_dividend_row(event: BrokerDividendEvent, fx_table: dict[str, t
         "quantity": to_output_float(round_qty(event.quantity)),
         "amount_per_share_ccy": to_output_float(round_money(event.gross_rate or 0)),
         "amount_total_ccy": to_output_float(gross_amount_ccy),
-        "amount_total_eur": to_output_float(round_money(gross_amount_ccy / fx_to_eur)),
+        "amount_total_eur": to_output_float(amount_total_eur),
         "creditable_foreign_tax_total_ccy": 0.0,
         "creditable_foreign_tax_total_eur": 0.0,
         "domestic_dividend_kest_total_ccy": 0.0,
@@ -794,14 +814,15 @@ def _has_confirmed_distribution_match(report: OekbReport, broker_events: list[Br
         for event in broker_events
     )
 def build_income_rows_for_report(
-    positions: list[PositionState],
+    positions: dict[str, PositionState],
     report: OekbReport,
     tax_year: int,
-    fx_table: dict[str, tuple[list[date], list[Decimal]]],
+    fx_table: FxCalendar,
     broker_events: list[BrokerDividendEvent],
     *,
     quantity_override: Decimal | None = None,
     note_prefix: str = "",
+    holdings: HoldingsIndex | None = None,
 ) -> list[dict[str, object]]:
     rows: list[dict[str, object]] = []
     matched_distribution_event: BrokerDividendEvent | None = None
@@ -820,7 +841,7 @@ def build_income_rows_for_report(
         matched_broker_event_id: str = "",
         notes: str = "",
     ) -> None:
-        fx_to_eur = get_fx_rate(fx_table, report.currency, event_date)
+        fx_to_eur = fx_table.rate(report.currency, event_date)
         rows.append(
             {
                 "event_type": event_type,
@@ -860,7 +881,7 @@ def build_income_rows_for_report(
 
     if report.reported_distribution_per_share_ccy != 0:
         event_date, eligibility_date, matched_broker_event_id = resolve_report_event_timing()
-        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date)
+        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date, holdings)
         _ensure_position_compatibility(eligible_positions, report)
         quantity = _sum_shares(eligible_positions)
         add_row(
@@ -876,7 +897,7 @@ def build_income_rows_for_report(
 
     if report.age_per_share_ccy != 0:
         event_date, eligibility_date, matched_broker_event_id = resolve_report_event_timing()
-        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date)
+        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date, holdings)
         _ensure_position_compatibility(eligible_positions, report)
         quantity = _sum_shares(eligible_positions) if quantity_override is None else round_qty(quantity_override)
         add_row(
@@ -896,7 +917,7 @@ def build_income_rows_for_report(
 
     if report.creditable_foreign_tax_per_share_ccy != 0:
         event_date, eligibility_date, matched_broker_event_id = resolve_report_event_timing()
-        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date)
+        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date, holdings)
         _ensure_position_compatibility(eligible_positions, report)
         quantity = _sum_shares(eligible_positions) if quantity_override is None else round_qty(quantity_override)
         credit_total_ccy = round_money(report.creditable_foreign_tax_per_share_ccy * quantity)
@@ -919,7 +940,7 @@ def build_income_rows_for_report(
 
     if report.domestic_dividends_loss_offset_per_share_ccy != 0:
         event_date, eligibility_date, matched_broker_event_id = resolve_report_event_timing()
-        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date)
+        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date, holdings)
         _ensure_position_compatibility(eligible_positions, report)
         quantity = _sum_shares(eligible_positions) if quantity_override is None else round_qty(quantity_override)
         add_row(
@@ -939,7 +960,7 @@ def build_income_rows_for_report(
 
     if report.domestic_dividend_kest_per_share_ccy != 0:
         event_date, eligibility_date, matched_broker_event_id = resolve_report_event_timing()
-        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date)
+        eligible_positions = _eligible_positions(positions, report.isin, eligibility_date, holdings)
         _ensure_position_compatibility(eligible_positions, report)
         quantity = _sum_shares(eligible_positions) if quantity_override is None else round_qty(quantity_override)
         domestic_kest_total_ccy = round_money(report.domestic_dividend_kest_per_share_ccy * quantity)
@@ -962,8 +983,8 @@ def build_income_rows_for_report(
     return rows
 
 
-def positions_to_df(positions: list[PositionState]) -> pl.DataFrame:
-    return position_states_to_df(positions)
+def positions_to_df(positions: dict[str, PositionState]) -> pl.DataFrame:
+    return position_states_to_df(_sorted_positions(positions.values()))
 
 
 def basis_adjustments_to_df(rows: list[dict[str, object]]) -> pl.DataFrame:
@@ -1574,12 +1595,13 @@ def _parse_override_quantity(raw_value: str, report_key: str) -> Decimal | None:
 
 def _resolve_negative_deemed_distribution_review(
     report: OekbReport,
-    positions: list[PositionState],
+    positions: dict[str, PositionState],
     broker_events: list[BrokerDividendEvent],
     overrides: dict[str, dict[str, str]],
+    holdings: HoldingsIndex | None = None,
 ) -> dict[str, object]:
     report_key = _negative_report_key(report)
-    eligible_positions = _eligible_positions(positions, report.isin, report.meldedatum)
+    eligible_positions = _eligible_positions(positions, report.isin, report.meldedatum, holdings)
     _ensure_position_compatibility(eligible_positions, report)
     quantity_held_on_report_date = _sum_shares(eligible_positions)
     candidate_payouts = _candidate_negative_report_payouts(report, broker_events)
@@ -1716,7 +1738,7 @@ def run_workflow(
     tax_year: int,
     ibkr_tax_xml_path: str | Path,
     historical_ibkr_tax_xml_path: str | Path | None = None,
-    ibkr_trade_history_path: str | Path,
+    ibkr_trade_history_path: IbkrStatementSource,
     raw_exchange_rates_path: str | Path = "data/input/currencies/raw_exchange_rates.csv",
     oekb_root_dir: str | Path | None = None,
     state_dir: str | Path | None = None,
@@ -1727,6 +1749,9 @@ def run_workflow(
     opening_state_path: str | Path | None = None,
     authoritative_start_date: date | None = None,
     carryforward_only: bool = False,
+    parse_cache_dir: str | Path | None = None,
+    parse_workers: int | None = None,
+    position_journal_dir: str | Path | None = None,
 ) -> dict[str, Path]:
     reporting_funds_root = Path(f"data/output/{person}/reporting_funds")
     output_dir_path = Path(output_dir or reporting_funds_root / str(tax_year))
@@ -1749,9 +1774,15 @@ def run_workflow(
     else:
         resolution_cutoff = datetime.strptime(str(resolution_cutoff_date), "%Y-%m-%d").date()
 
-    tax_xml_path = str(ibkr_tax_xml_path)
-    historical_tax_xml_path = str(historical_ibkr_tax_xml_path) if historical_ibkr_tax_xml_path else None
-    trade_history_path = str(ibkr_trade_history_path)
+    tax_statements = IbkrStatementSet.load(ibkr_tax_xml_path, cache_dir=parse_cache_dir, max_workers=parse_workers)
+    historical_tax_statements = (
+        IbkrStatementSet.load(historical_ibkr_tax_xml_path, cache_dir=parse_cache_dir, max_workers=parse_workers)
+        if historical_ibkr_tax_xml_path
+        else None
+    )
+    trade_history_statements = IbkrStatementSet.coerce(
+        ibkr_trade_history_path, cache_dir=parse_cache_dir, max_workers=parse_workers
+    )
 
     if has_previous_state:
         previous_positions = load_state(previous_state_path)
@@ -1766,18 +1797,18 @@ def run_workflow(
         opening_snapshot_date = None
     previous_payout_state = load_payout_state(payout_state_path)
     negative_deemed_overrides = _load_negative_deemed_distribution_overrides(negative_review_override_path)
-    accrual_rows = load_ibkr_etf_dividend_accrual_rows(tax_xml_path)
-    cash_rows = load_ibkr_etf_cash_dividend_rows(tax_xml_path)
+    accrual_rows = load_ibkr_etf_dividend_accrual_rows(tax_statements)
+    cash_rows = load_ibkr_etf_cash_dividend_rows(tax_statements)
     all_broker_events = build_broker_dividend_events(accrual_rows, cash_rows)
     historical_lookup_broker_events: list[BrokerDividendEvent] = []
-    if historical_tax_xml_path:
+    if historical_tax_statements is not None:
         historical_lookup_broker_events = build_broker_dividend_events(
-            load_ibkr_etf_dividend_accrual_rows(historical_tax_xml_path),
-            load_ibkr_etf_cash_dividend_rows(historical_tax_xml_path),
+            load_ibkr_etf_dividend_accrual_rows(historical_tax_statements),
+            load_ibkr_etf_cash_dividend_rows(historical_tax_statements),
         )
     broker_events_for_lookup = _merge_lookup_broker_events(all_broker_events, historical_lookup_broker_events)
     all_trades = load_ibkr_etf_trades(
-        trade_history_path,
+        trade_history_statements,
         require_raw_trades=not (has_previous_state or has_opening_state_snapshot),
     )
     ticker_by_isin = _build_ticker_by_isin(previous_positions, all_trades, broker_events_for_lookup)
@@ -1857,7 +1888,7 @@ def run_workflow(
     )
 
     has_seeded_opening_state = has_previous_state or has_opening_state_snapshot
-    working_positions = prepare_positions_for_new_year(previous_positions) if has_seeded_opening_state else []
+    working_positions = prepare_positions_for_new_year(previous_positions) if has_seeded_opening_state else {}
     position_event_rows: list[dict[str, object]] = []
     if has_opening_state_snapshot and not has_previous_state and opening_snapshot_date is not None:
         reset_events = [
@@ -1879,9 +1910,21 @@ def run_workflow(
             for index, state in enumerate(previous_positions)
         ]
         _, position_event_rows, _ = replay_events([], reset_events)
+    replayed_trades = current_year_trades if has_previous_state else [*opening_trades, *current_year_trades]
+    trade_fx = fx_table.rates_for((trade.currency, trade.trade_date) for trade in replayed_trades)
+    # Carried-in states are the holdings at the close of the day before the year (or the snapshot) starts.
+    opening_as_of = (year_start if has_previous_state else opening_snapshot_date or year_start) - timedelta(days=1)
+    holdings = _trade_holdings_index(working_positions.values(), opening_as_of, replayed_trades, trade_fx)
     if not has_previous_state:
         for index, trade in enumerate(opening_trades):
-            apply_trade(working_positions, trade, fx_table=fx_table, sale_rows=None, sequence_key=index)
+            apply_trade(
+                working_positions,
+                trade,
+                fx_table=fx_table,
+                sale_rows=None,
+                sequence_key=index,
+                fx_to_eur=trade_fx[(trade.currency, trade.trade_date)],
+            )
 
     payout_state = previous_payout_state
     payout_state_source_events = all_broker_events
@@ -1901,7 +1944,7 @@ def run_workflow(
 
     sale_rows: list[dict[str, object]] = []
     basis_adjustment_rows: list[dict[str, object]] = []
-    income_rows: list[dict[str, object]] = [_build_broker_dividend_row(event, fx_table) for event in current_year_confirmed_broker_events]
+    income_rows: list[dict[str, object]] = _build_broker_dividend_rows(current_year_confirmed_broker_events, fx_table)
     negative_review_rows: list[dict[str, object]] = []
     events: list[tuple[date, int, int, object]] = []
     events.extend((trade.trade_date, 1, index, trade) for index, trade in enumerate(current_year_trades))
@@ -1919,6 +1962,7 @@ def run_workflow(
                     working_positions,
                     broker_events_for_lookup,
                     negative_deemed_overrides,
+                    holdings,
                 )
                 negative_review_rows.append(review_row)
                 report_key = str(review_row["report_key"])
@@ -1950,6 +1994,7 @@ def run_workflow(
                             broker_events=current_year_confirmed_broker_events,
                             quantity_override=eligible_quantity_used,
                             note_prefix=note_prefix,
+                            holdings=holdings,
                         )
                     )
                 basis_adjustment_rows.append(
@@ -1962,6 +2007,7 @@ def run_workflow(
                         note_prefix=note_prefix,
                         event_rows=position_event_rows,
                         sequence_key_start=len(position_event_rows) + event_index,
+                        holdings=holdings,
                     )
                 )
                 continue
@@ -1973,6 +2019,7 @@ def run_workflow(
                         tax_year=tax_year,
                         fx_table=fx_table,
                         broker_events=current_year_confirmed_broker_events,
+                        holdings=holdings,
                     )
                 )
             basis_adjustment_rows.append(
@@ -1983,6 +2030,7 @@ def run_workflow(
                     fx_table=fx_table,
                     event_rows=position_event_rows,
                     sequence_key_start=len(position_event_rows) + event_index,
+                    holdings=holdings,
                 )
             )
         else:
@@ -1993,6 +2041,7 @@ def run_workflow(
                 sale_rows=sale_rows,
                 event_rows=position_event_rows,
                 sequence_key=len(position_event_rows) + event_index,
+                fx_to_eur=trade_fx[(payload.currency, payload.trade_date)],
             )
 
     annual_reports_for_resolution = [
@@ -2029,6 +2078,8 @@ def run_workflow(
 
     state_df = positions_to_df(working_positions)
     position_events_df = position_event_log_to_df(position_event_rows)
+    if position_journal_dir is not None:
+        PositionEventJournal(Path(position_journal_dir)).append(position_events_df)
     income_events_df = income_events_to_df(income_rows)
     basis_adjustments_df = basis_adjustments_to_df(basis_adjustment_rows)
     sales_df = sales_to_df(sale_rows)
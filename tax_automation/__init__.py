@@ -1,21 +1,54 @@
 """Public package exports."""
 
-from tax_automation.broker_history import RawBrokerTrade, build_fx_table_from_rates_df, get_fx_rate, load_ibkr_stock_like_trades
+from tax_automation.broker_history import (
+    IbkrTradeIndex,
+    RawBrokerTrade,
+    TradeTable,
+    build_fx_table_from_rates_df,
+    get_fx_rate,
+    ibkr_trade_index,
+    load_ibkr_stock_like_trades,
+    load_ibkr_trade_table,
+)
 from tax_automation.currencies import ExchangeRates, ExchangeRatesCacheError
+from tax_automation.fx_calendar import FxCalendar
+from tax_automation.fx_repository import FxRepository, load_exchange_rates
+from tax_automation.fx_requirements import FxRequirements
+from tax_automation.ibkr_statements import IbkrStatementSet
 from tax_automation.providers.ibkr import apply_pivot, handle_dividend_adjustments
-from tax_automation.utils import convert_to_euro, extract_elements, join_exchange_rates, read_xml_to_df
+from tax_automation.utils import (
+    FxJoiner,
+    convert_to_euro,
+    extract_elements,
+    iter_xml_section_rows,
+    join_exchange_rates,
+    read_xml_sections_to_df,
+    read_xml_to_df,
+)
 
 __all__ = [
     "ExchangeRates",
     "ExchangeRatesCacheError",
+    "FxCalendar",
+    "FxJoiner",
+    "FxRepository",
+    "FxRequirements",
+    "IbkrStatementSet",
+    "IbkrTradeIndex",
     "RawBrokerTrade",
+    "TradeTable",
     "apply_pivot",
     "build_fx_table_from_rates_df",
     "convert_to_euro",
     "extract_elements",
     "get_fx_rate",
     "handle_dividend_adjustments",
+    "ibkr_trade_index",
+    "iter_xml_section_rows",
     "join_exchange_rates",
+    "load_exchange_rates",
     "load_ibkr_stock_like_trades",
+    "load_ibkr_trade_table",
+    "read_xml_sections_to_df",
     "read_xml_to_df",
 ]
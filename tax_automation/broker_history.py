@@ -1,17 +1,23 @@
 from __future__ import annotations
 
-from bisect import bisect_right
 from dataclasses import dataclass
 from decimal import Decimal
 from datetime import date, datetime
-from typing import Iterable
+from typing import Collection, Iterable, Iterator
+from weakref import WeakKeyDictionary
 
-import lxml.etree as etree
 import polars as pl
 
-from tax_automation.const import EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
-from tax_automation.precision import quantize_fx, quantize_money, quantize_qty, to_decimal
-from tax_automation.utils import resolve_input_file_paths
+from tax_automation.fx_calendar import FxCalendar
+from tax_automation.ibkr_statements import (
+    IBKR_LOT_ROW_TAG,
+    IBKR_TRADE_ROW_TAGS,
+    ROW_TAG_COL,
+    SOURCE_FILE_COL,
+    IbkrStatementSet,
+    IbkrStatementSource,
+)
+from tax_automation.precision import PL_MONEY_DTYPE, PL_QTY_DTYPE, quantize_money, quantize_qty, round_half_up
 
 MONEY_DIGITS = 6
 QTY_DIGITS = 8
@@ -44,155 +50,364 @@ class RawBrokerTrade:
     fee_ccy: Decimal = Decimal("0")
 
 
-def _resolve_file_paths(file_path: str) -> list[str]:
-    return resolve_input_file_paths(file_path, suffix=".xml")
+# Raw IBKR numeric attributes are parsed at a scale wide enough that quantity * price stays exact.
+RAW_DECIMAL_DTYPE = pl.Decimal(scale=12)
+RAW_PRODUCT_DTYPE = pl.Decimal(scale=24)
 
+TRADE_TABLE_SCHEMA: dict[str, pl.DataType] = {
+    "ticker": pl.String(),
+    "isin": pl.String(),
+    "trade_date": pl.Date(),
+    "trade_datetime": pl.Datetime(),
+    "operation": pl.String(),
+    "quantity": PL_QTY_DTYPE,
+    "price_ccy": PL_MONEY_DTYPE,
+    "currency": pl.String(),
+    "trade_id": pl.String(),
+    "account_id": pl.String(),
+    "source_statement_file": pl.String(),
+    "asset_class": pl.String(),
+    "net_cash_ccy": PL_MONEY_DTYPE,
+    "fee_ccy": PL_MONEY_DTYPE,
+}
+
+
+@dataclass(frozen=True, eq=False)
+class TradeTable:
+    """
+    Columnar store of normalized IBKR stock-like trades, one row per `RawBrokerTrade`.
+
+    Filters run on the Polars frame; `RawBrokerTrade` rows are only built when iterated.
+    """
+
+    df: pl.DataFrame
+
+    @classmethod
+    def empty(cls) -> TradeTable:
+        return cls(pl.DataFrame(schema=TRADE_TABLE_SCHEMA))
+
+    def __len__(self) -> int:
+        return self.df.height
+
+    def is_empty(self) -> bool:
+        return self.df.is_empty()
+
+    def filter(self, *predicates: pl.Expr) -> TradeTable:
+        return TradeTable(self.df.filter(*predicates)) if predicates else self
+
+    def in_date_range(
+        self,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        *,
+        include_end: bool = True,
+    ) -> TradeTable:
+        predicates = []
+        if start_date is not None:
+            predicates.append(pl.col("trade_date") >= start_date)
+        if end_date is not None:
+            predicates.append(pl.col("trade_date") <= end_date if include_end else pl.col("trade_date") < end_date)
+        return self.filter(*predicates)
+
+    def with_asset_classes(self, asset_classes: Iterable[str]) -> TradeTable:
+        return self.filter(pl.col("asset_class").is_in(sorted(asset_classes)))
+
+    def without_asset_classes(self, asset_classes: Iterable[str] | None) -> TradeTable:
+        return self.filter(~pl.col("asset_class").is_in(sorted(asset_classes))) if asset_classes else self
+
+    def with_isins(self, isins: Iterable[str]) -> TradeTable:
+        return self.filter(pl.col("isin").is_in(sorted(isins)))
+
+    def currencies(self) -> set[str]:
+        return set(self.df["currency"].unique().to_list())
+
+    def min_trade_date(self) -> date | None:
+        return self.df["trade_date"].min()
+
+    def iter_trades(self) -> Iterator[RawBrokerTrade]:
+        for row in self.df.iter_rows(named=True):
+            yield RawBrokerTrade(**row)
+
+    def to_raw_trades(self) -> list[RawBrokerTrade]:
+        return list(self.iter_trades())
+
+
+def _raw_str(columns: Collection[str], name: str) -> pl.Expr:
+    """Stripped raw attribute with empty values as nulls, so `coalesce` mirrors `a or b` on the raw rows."""
+    if name not in columns:
+        return pl.lit(None, dtype=pl.String)
+    value = pl.col(name).cast(pl.String).str.strip_chars()
+    return pl.when(value == "").then(None).otherwise(value)
+
+
+def _raw_decimal(columns: Collection[str], name: str) -> pl.Expr:
+    return _raw_str(columns, name).cast(RAW_DECIMAL_DTYPE)
+
+
+IBKR_CLOSED_LOT_DETAIL = "CLOSED_LOT"
+IBKR_STOCK_LIKE_MISSING_FIELDS_MESSAGE = "IBKR raw stock-like trade row is missing required fields"
+REQUIRED_TRADE_COLS = ("price_ccy", "quantity", "currency", "ticker", "isin")
+
+
+def _normalize_ibkr_trade_rows(rows_df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Every BUY/SELL row of the `trades` section except closed lots, in `TRADE_TABLE_SCHEMA` form plus
+    the `asset_category`, `row_tag` and `raw_datetime` columns. Nothing is validated here; required
+    fields are checked per slice by `IbkrTradeIndex.select`, so rows nobody asks for cannot fail a run.
+    """
+    columns = set(rows_df.columns)
+    buy_sell = pl.col("buy_sell")
+    rows_df = rows_df.with_columns(
+        _raw_str(columns, "assetCategory").fill_null("").alias("asset_category"),
+        _raw_str(columns, "subCategory").fill_null("").alias("asset_class"),
+        _raw_str(columns, "buySell").str.to_uppercase().alias("buy_sell"),
+        _raw_str(columns, "levelOfDetail").fill_null("").alias("level_of_detail"),
+        pl.coalesce(_raw_str(columns, "dateTime"), _raw_str(columns, "tradeDate")).alias("raw_datetime"),
+    ).filter(
+        buy_sell.is_in(["BUY", "SELL"])
+        & ~((pl.col(ROW_TAG_COL) == IBKR_LOT_ROW_TAG) & (pl.col("level_of_detail") == IBKR_CLOSED_LOT_DETAIL))
+    )
+
+    rows_df = rows_df.with_columns(
+        pl.when(pl.col("raw_datetime").str.len_chars() == 10)
+        .then(pl.col("raw_datetime") + " 00:00:00")
+        .otherwise(pl.col("raw_datetime"))
+        .str.strptime(pl.Datetime, RAW_IBKR_DATETIME_FORMAT, strict=False)
+        .alias("trade_datetime"),
+        pl.coalesce(_raw_str(columns, "tradePrice"), _raw_str(columns, "price")).alias("raw_price"),
+        _raw_str(columns, "quantity").alias("raw_quantity"),
+        _raw_str(columns, "currency").alias("currency"),
+        _raw_str(columns, "symbol").alias("ticker"),
+        pl.coalesce(_raw_str(columns, "isin"), _raw_str(columns, "securityID")).alias("isin"),
+    )
+
+    quantity = pl.col("raw_quantity").cast(RAW_DECIMAL_DTYPE, strict=False).abs()
+    price = pl.col("raw_price").cast(RAW_DECIMAL_DTYPE, strict=False)
+    net_cash = _raw_str(columns, "netCash").cast(RAW_DECIMAL_DTYPE, strict=False).abs()
+    commission = _raw_str(columns, "commission")
+    gross = quantity.cast(RAW_PRODUCT_DTYPE) * price
+    net_or_gross = pl.coalesce(net_cash.cast(RAW_PRODUCT_DTYPE), gross)
+    fee_from_net_cash = pl.when(buy_sell == "BUY").then(net_or_gross - gross).otherwise(gross - net_or_gross)
+    trades_df = rows_df.select(
+        "ticker",
+        "isin",
+        pl.col("trade_datetime").dt.date().alias("trade_date"),
+        "trade_datetime",
+        buy_sell.str.to_lowercase().alias("operation"),
+        round_half_up(quantity, QTY_DIGITS).alias("quantity"),
+        round_half_up(price, MONEY_DIGITS).alias("price_ccy"),
+        "currency",
+        pl.coalesce(
+            _raw_str(columns, "tradeID"),
+            _raw_str(columns, "transactionID"),
+            _raw_str(columns, "ibOrderID"),
+            pl.concat_str(
+                [pl.col("ticker"), pl.col("trade_datetime").dt.strftime("%Y-%m-%dT%H:%M:%S"), buy_sell],
+                separator=":",
+            ),
+        ).alias("trade_id"),
+        _raw_str(columns, "accountId").fill_null("").alias("account_id"),
+        pl.col(SOURCE_FILE_COL).alias("source_statement_file"),
+        "asset_class",
+        round_half_up(net_cash, MONEY_DIGITS).alias("net_cash_ccy"),
+        pl.when(commission.is_not_null())
+        .then(round_half_up(commission.cast(RAW_DECIMAL_DTYPE, strict=False).abs(), MONEY_DIGITS))
+        .otherwise(
+            round_half_up(pl.max_horizontal(fee_from_net_cash, pl.lit(0, dtype=RAW_PRODUCT_DTYPE)), MONEY_DIGITS)
+        )
+        .alias("fee_ccy"),
+        "asset_category",
+        ROW_TAG_COL,
+        "raw_datetime",
+    )
+    return trades_df.cast(TRADE_TABLE_SCHEMA)
+
+
+@dataclass(frozen=True, eq=False)
+class IbkrTradeIndex:
+    """
+    Normalized BUY/SELL rows of one `IbkrStatementSet`, built once and sliced by every trade consumer.
+
+    Rows are sorted by (trade_datetime, trade_id, operation), so a date range is a binary search, and
+    `asset_class`, `asset_category`, `isin` and `row_tag` each map to the sorted row positions holding
+    a value. A slice therefore costs its own size rather than a scan of the whole history.
+    """
+
+    df: pl.DataFrame
+    undated_df: pl.DataFrame
+    positions: dict[str, dict[str, pl.Series]]
+    has_closed_lots: bool
+
+    @classmethod
+    def build(cls, statements: IbkrStatementSet) -> IbkrTradeIndex:
+        trades = statements.trades
+        if trades.is_empty():
+            empty_df = pl.DataFrame(schema=_INDEX_SCHEMA)
+            return cls(
+                df=empty_df,
+                undated_df=empty_df,
+                positions={col: {} for col in INDEXED_TRADE_COLS},
+                has_closed_lots=False,
+            )
+
+        has_closed_lots = (
+            "levelOfDetail" in trades.columns
+            and not trades.filter(
+                (pl.col(ROW_TAG_COL) == IBKR_LOT_ROW_TAG)
+                & (pl.col("levelOfDetail") == IBKR_CLOSED_LOT_DETAIL)
+                & (pl.col("assetCategory").fill_null("").str.strip_chars() != "CASH")
+            ).is_empty()
+        )
+        normalized_df = _normalize_ibkr_trade_rows(trades)
+        dated_df = normalized_df.filter(pl.col("trade_datetime").is_not_null()).sort(
+            ["trade_datetime", "trade_id", "operation"], maintain_order=True
+        )
+        indexed_df = dated_df.with_row_index("_position")
+        positions: dict[str, dict[str, pl.Series]] = {}
+        for col in INDEXED_TRADE_COLS:
+            grouped = indexed_df.group_by(col, maintain_order=True).agg("_position")
+            positions[col] = dict(zip(grouped[col], grouped["_position"]))
+        return cls(
+            df=dated_df,
+            undated_df=normalized_df.filter(pl.col("trade_datetime").is_null()),
+            positions=positions,
+            has_closed_lots=has_closed_lots,
+        )
 
-def _parse_trade_datetime(row: etree._Element) -> datetime:
-    raw_value = row.get("dateTime") or row.get("tradeDate")
-    if raw_value is None:
-        raise ValueError("IBKR trade row is missing dateTime/tradeDate")
-    if len(raw_value) == 10:
-        raw_value = f"{raw_value} 00:00:00"
-    return datetime.strptime(raw_value, RAW_IBKR_DATETIME_FORMAT)
+    def __len__(self) -> int:
+        return self.df.height
+
+    def select(
+        self,
+        *,
+        asset_classes: Collection[str] | None = None,
+        asset_categories: Collection[str] | None = None,
+        exclude_asset_categories: Collection[str] | None = None,
+        row_tags: Collection[str] | None = None,
+        isins: Collection[str] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        include_end: bool = True,
+        missing_fields_message: str = IBKR_STOCK_LIKE_MISSING_FIELDS_MESSAGE,
+    ) -> TradeTable:
+        """
+        Trades matching every given filter, as a `TradeTable` in chronological order.
+
+        Raises ValueError when a matching row has no parseable trade date or lacks a required field.
+        """
+        lookups = {
+            "asset_class": asset_classes,
+            "asset_category": asset_categories,
+            ROW_TAG_COL: row_tags,
+            "isin": isins,
+        }
+        self._check_undated(lookups, exclude_asset_categories)
+
+        trade_dates = self.df["trade_date"]
+        lower = trade_dates.search_sorted(start_date, "left") if start_date is not None else 0
+        upper = self.df.height
+        if end_date is not None:
+            upper = trade_dates.search_sorted(end_date, "right" if include_end else "left")
+
+        selected: pl.Series | None = None
+        for col, values in lookups.items():
+            if values is None:
+                continue
+            matched = [self.positions[col][value] for value in values if value in self.positions[col]]
+            matched_positions = pl.concat(matched) if matched else pl.Series("_position", [], dtype=pl.UInt32)
+            if selected is None:
+                selected = matched_positions
+            else:
+                selected = selected.filter(selected.is_in(matched_positions.implode()))
+
+        if selected is None:
+            slice_df = self.df.slice(lower, max(upper - lower, 0))
+        else:
+            slice_df = self.df[selected.filter((selected >= lower) & (selected < upper)).sort()]
+        if exclude_asset_categories:
+            slice_df = slice_df.filter(~pl.col("asset_category").is_in(sorted(exclude_asset_categories)))
+
+        if slice_df.select(pl.any_horizontal(pl.col(REQUIRED_TRADE_COLS).is_null()).any()).item():
+            raise ValueError(missing_fields_message)
+        return TradeTable(slice_df.select(list(TRADE_TABLE_SCHEMA)))
+
+    def _check_undated(
+        self,
+        lookups: dict[str, Collection[str] | None],
+        exclude_asset_categories: Collection[str] | None,
+    ) -> None:
+        if self.undated_df.is_empty():
+            return
+        predicates = [pl.col(col).is_in(sorted(values)) for col, values in lookups.items() if values is not None]
+        if exclude_asset_categories:
+            predicates.append(~pl.col("asset_category").is_in(sorted(exclude_asset_categories)))
+        undated_df = self.undated_df.filter(*predicates) if predicates else self.undated_df
+        if undated_df.is_empty():
+            return
+        raw_datetime = undated_df["raw_datetime"][0]
+        if raw_datetime is None:
+            raise ValueError("IBKR trade row is missing dateTime/tradeDate")
+        raise ValueError(f"Unsupported IBKR trade dateTime: {raw_datetime!r}")
+
+
+INDEXED_TRADE_COLS = ("asset_class", "asset_category", "isin", ROW_TAG_COL)
+_INDEX_SCHEMA: dict[str, pl.DataType] = {
+    **TRADE_TABLE_SCHEMA,
+    "asset_category": pl.String(),
+    ROW_TAG_COL: pl.String(),
+    "raw_datetime": pl.String(),
+}
+_TRADE_INDEXES: WeakKeyDictionary[IbkrStatementSet, IbkrTradeIndex] = WeakKeyDictionary()
+
+
+def ibkr_trade_index(xml_file_path: IbkrStatementSource, *, max_workers: int | None = None) -> IbkrTradeIndex:
+    """Trade index of a statement source; built once per `IbkrStatementSet` and shared by all of its consumers."""
+    statements = IbkrStatementSet.coerce(xml_file_path, max_workers=max_workers)
+    trade_index = _TRADE_INDEXES.get(statements)
+    if trade_index is None:
+        trade_index = IbkrTradeIndex.build(statements)
+        _TRADE_INDEXES[statements] = trade_index
+    return trade_index
+
+
+def load_ibkr_trade_table(
+    xml_file_path: IbkrStatementSource,
+    *,
+    allowed_asset_classes: set[str],
+    cutoff_date: date | None = None,
+    max_workers: int | None = None,
+) -> TradeTable:
+    return ibkr_trade_index(xml_file_path, max_workers=max_workers).select(
+        asset_classes=allowed_asset_classes,
+        asset_categories={"STK"},
+        row_tags=IBKR_TRADE_ROW_TAGS,
+        end_date=cutoff_date,
+        include_end=False,
+    )
 
 
 def load_ibkr_stock_like_trades(
-    xml_file_path: str,
+    xml_file_path: IbkrStatementSource,
     *,
     allowed_asset_classes: set[str],
     cutoff_date: date | None = None,
+    max_workers: int | None = None,
 ) -> list[RawBrokerTrade]:
-    file_paths = _resolve_file_paths(xml_file_path)
-    if not file_paths:
-        raise FileNotFoundError(f"No files matched the pattern: {xml_file_path}")
-
-    seen_rows: set[tuple[str, tuple[tuple[str, str], ...]]] = set()
-    trades: list[RawBrokerTrade] = []
-
-    for path in file_paths:
-        root = etree.parse(path).getroot()
-        for parent_tag in (".//TradeConfirms", ".//Trades"):
-            for parent in root.findall(parent_tag):
-                for row in parent:
-                    if row.tag not in {"TradeConfirm", "Trade"}:
-                        continue
-                    row_key = (row.tag, tuple(sorted(row.items())))
-                    if row_key in seen_rows:
-                        continue
-                    seen_rows.add(row_key)
-
-                    if (row.get("assetCategory") or "").strip() != "STK":
-                        continue
-                    asset_class = (row.get("subCategory") or "").strip()
-                    if asset_class not in allowed_asset_classes:
-                        continue
-
-                    buy_sell = (row.get("buySell") or "").strip().upper()
-                    if buy_sell not in {"BUY", "SELL"}:
-                        continue
-
-                    trade_datetime = _parse_trade_datetime(row)
-                    if cutoff_date is not None and trade_datetime.date() >= cutoff_date:
-                        continue
-
-                    trade_price = row.get("tradePrice") or row.get("price")
-                    quantity = row.get("quantity")
-                    currency = row.get("currency")
-                    symbol = row.get("symbol")
-                    isin = row.get("isin") or row.get("securityID")
-                    if not all([trade_price, quantity, currency, symbol, isin]):
-                        raise ValueError("IBKR raw stock-like trade row is missing required fields")
-
-                    trade_id = (
-                        row.get("tradeID")
-                        or row.get("transactionID")
-                        or row.get("ibOrderID")
-                        or f"{symbol}:{trade_datetime.isoformat()}:{buy_sell}"
-                    )
-
-                    trades.append(
-                        RawBrokerTrade(
-                            ticker=symbol.strip(),
-                            isin=isin.strip(),
-                            trade_date=trade_datetime.date(),
-                            trade_datetime=trade_datetime,
-                            operation=buy_sell.lower(),
-                            quantity=round_qty(abs(to_decimal(quantity))),
-                            price_ccy=round_money(to_decimal(trade_price)),
-                            currency=currency.strip(),
-                            trade_id=trade_id.strip(),
-                            account_id=(row.get("accountId") or "").strip(),
-                            source_statement_file=path,
-                            asset_class=asset_class,
-                            net_cash_ccy=(
-                                round_money(abs(to_decimal(row.get("netCash"))))
-                                if row.get("netCash") not in (None, "")
-                                else None
-                            ),
-                            fee_ccy=(
-                                round_money(abs(to_decimal(row.get("commission"))))
-                                if row.get("commission") not in (None, "")
-                                else round_money(
-                                    max(
-                                        Decimal("0"),
-                                        (
-                                            abs(to_decimal(row.get("netCash")))
-                                            if row.get("netCash") not in (None, "")
-                                            else abs(to_decimal(quantity)) * to_decimal(trade_price)
-                                        )
-                                        - (abs(to_decimal(quantity)) * to_decimal(trade_price))
-                                        if buy_sell == "BUY"
-                                        else (abs(to_decimal(quantity)) * to_decimal(trade_price))
-                                        - (
-                                            abs(to_decimal(row.get("netCash")))
-                                            if row.get("netCash") not in (None, "")
-                                            else abs(to_decimal(quantity)) * to_decimal(trade_price)
-                                        ),
-                                    )
-                                )
-                            ),
-                        )
-                    )
-
-    trades.sort(key=lambda item: (item.trade_datetime, item.trade_id, item.operation))
-    return trades
+    return load_ibkr_trade_table(
+        xml_file_path,
+        allowed_asset_classes=allowed_asset_classes,
+        cutoff_date=cutoff_date,
+        max_workers=max_workers,
+    ).to_raw_trades()
 
 
 def build_fx_table_from_rates_df(
     rates_df: pl.DataFrame,
     *,
     currencies: Iterable[str],
-) -> dict[str, tuple[list[date], list[Decimal]]]:
-    fx_table: dict[str, tuple[list[date], list[Decimal]]] = {}
-    for currency in sorted({currency for currency in currencies if currency != "EUR"}):
-        currency_df = rates_df.filter(pl.col("currency") == currency).sort("rate_date")
-        if currency_df.is_empty():
-            raise ValueError(f"Missing FX series for currency {currency}")
-        fx_table[currency] = (
-            currency_df["rate_date"].to_list(),
-            [quantize_fx(value) for value in currency_df["exchange_rate"].to_list()],
-        )
-    return fx_table
-
-
-def get_fx_rate(fx_table: dict[str, tuple[list[date], list[Decimal]]], currency: str, event_date: date) -> Decimal:
-    if currency == "EUR":
-        return Decimal("1")
+) -> FxCalendar:
+    return FxCalendar.from_rates_df(rates_df, currencies=currencies)
 
-    if currency not in fx_table:
-        raise ValueError(f"Missing FX series for currency {currency}")
-
-    available_dates, available_rates = fx_table[currency]
-    index = bisect_right(available_dates, event_date) - 1
-    if index < 0:
-        raise ValueError(f"No FX rate available for {currency} on or before {event_date}")
-
-    matched_date = available_dates[index]
-    if (event_date - matched_date).days > EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET:
-        raise ValueError(
-            f"Closest FX rate for {currency} on {event_date} is too old: {matched_date} "
-            f"(>{EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET} days)"
-        )
 
-    return quantize_fx(available_rates[index])
+def get_fx_rate(fx_table: FxCalendar, currency: str, event_date: date) -> Decimal:
+    return fx_table.rate(currency, event_date)
@@ -2,21 +2,58 @@
 # https://www.oenb.at/isawebstat/stabfrage/createReport?lang=EN&original=false&report=2.14.9
 import logging
 import os
-from decimal import Decimal
+import tempfile
 from datetime import date, timedelta
+from pathlib import Path
 from typing import Sequence
 
 import polars as pl
-import requests
 
 from tax_automation.const import EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
-from tax_automation.precision import PL_FX_DTYPE, quantize_fx
+from tax_automation.ecb_client import EcbFetchClient, parse_ecb_csv
+
+DEFAULT_RAW_EXCHANGE_RATES_PATH = "data/input/currencies/raw_exchange_rates.csv"
+ECB_SIDECAR_SUFFIX = ".parquet"
+ECB_SIDECAR_VERSION = 1
+# Conditional-request cache of raw ECB responses, kept next to the exported CSV
+ECB_HTTP_CACHE_DIR = ".ecb_http_cache"
 
 
 class ExchangeRatesCacheError(ValueError):
     pass
 
 
+def load_ecb_csv(file_path: str | Path) -> pl.DataFrame:
+    """
+    `parse_ecb_csv` for a file on disk, reusing the Parquet sidecar next to it while the CSV is unchanged.
+
+    The sidecar records the size and mtime of the CSV it was built from; failing to write it only costs speed.
+    """
+    csv_path = Path(file_path)
+    sidecar_path = csv_path.with_suffix(ECB_SIDECAR_SUFFIX)
+    stat = csv_path.stat()
+    fingerprint = {
+        "source_size": str(stat.st_size),
+        "source_mtime_ns": str(stat.st_mtime_ns),
+        "sidecar_version": str(ECB_SIDECAR_VERSION),
+    }
+    if sidecar_path.exists():
+        metadata = pl.read_parquet_metadata(sidecar_path)
+        if all(metadata.get(key) == value for key, value in fingerprint.items()):
+            return pl.read_parquet(sidecar_path)
+
+    df = parse_ecb_csv(str(csv_path))
+    fd, tmp_path = tempfile.mkstemp(dir=sidecar_path.parent, prefix=".tmp-", suffix=ECB_SIDECAR_SUFFIX)
+    os.close(fd)
+    try:
+        df.write_parquet(tmp_path, metadata=fingerprint)
+        os.replace(tmp_path, sidecar_path)
+    except OSError as error:
+        logging.warning("Could not write exchange rates sidecar %s: %s", sidecar_path, error)
+        Path(tmp_path).unlink(missing_ok=True)
+    return df
+
+
 class ExchangeRates:
     def __init__(
         self,
@@ -24,7 +61,7 @@ class ExchangeRates:
         end_date: str | date,
         currencies: Sequence[str] = ("USD", "GBP"),
         overwrite: bool = False,
-        raw_file_path: str = "data/input/currencies/raw_exchange_rates.csv",
+        raw_file_path: str = DEFAULT_RAW_EXCHANGE_RATES_PATH,
     ):
         self.start_date = self._normalize_date(start_date)
         self.end_date = self._normalize_date(end_date)
@@ -51,47 +88,31 @@ class ExchangeRates:
         return date.fromisoformat(value)
 
     def _fetch_and_store_exchange_rates(self):
-        url = f"https://data-api.ecb.europa.eu/service/data/EXR/D.{self.currency_str}.EUR.SP00.A"
         offset = timedelta(days=EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET)
-        params = {
-            "startPeriod": (self.start_date - offset).isoformat(),
-            "endPeriod": (self.end_date + offset).isoformat(),
-            "format": "csvdata",
-        }
-        logging.info(f"Fetching exchange rates from {url}")
-        # Fetch data from API
-        response = requests.get(url, params=params, timeout=30)
-
-        if response.status_code == 200:
-            # Write raw data to disk
-            os.makedirs(os.path.dirname(self.raw_file_path), exist_ok=True)
-            with open(self.raw_file_path, "wb") as file:
-                file.write(response.content)
-
-            # Load into memory and filter
-            self.df = self._load_and_filter(self.raw_file_path)
-            self._validate_coverage()
-            logging.info("Exchange rates loaded.")
-        else:
-            raise Exception(f"Failed to fetch data. HTTP Status Code: {response.status_code}")
+        raw_dir = os.path.dirname(self.raw_file_path)
+        with EcbFetchClient(cache_dir=os.path.join(raw_dir, ECB_HTTP_CACHE_DIR)) as client:
+            rates_df = client.fetch(self.currencies, self.start_date - offset, self.end_date + offset)
+
+        # Write the rates to disk in the ECB export layout, so the file can be reloaded like a manual download
+        os.makedirs(raw_dir or ".", exist_ok=True)
+        rates_df.select(
+            pl.col("rate_date").dt.strftime("%Y-%m-%d").alias("TIME_PERIOD"),
+            pl.col("currency").alias("CURRENCY"),
+            pl.col("currency_denom").alias("CURRENCY_DENOM"),
+            pl.col("exchange_rate").cast(pl.String).alias("OBS_VALUE"),
+        ).write_csv(self.raw_file_path)
+
+        # Load into memory and filter
+        self.df = self._load_and_filter(self.raw_file_path)
+        self._validate_coverage()
+        logging.info("Exchange rates loaded.")
 
     def _load_from_file(self):
         # Load the raw file and filter it into memory
         self.df = self._load_and_filter(self.raw_file_path)
 
     def _load_and_filter(self, file_path: str) -> pl.DataFrame:
-        # Load and filter the CSV data using Polars
-        df = pl.read_csv(file_path)
-        filtered_df = df.select(
-            [
-                pl.col("TIME_PERIOD").str.strptime(pl.Date, "%Y-%m-%d").alias("rate_date"),
-                pl.col("CURRENCY").alias("currency"),
-                pl.col("CURRENCY_DENOM").alias("currency_denom"),
-                pl.col("OBS_VALUE").cast(pl.String).map_elements(lambda value: quantize_fx(Decimal(value)), return_dtype=PL_FX_DTYPE).alias("exchange_rate"),
-                # pl.col("TITLE").alias("description"),
-            ]
-        )
-        return filtered_df
+        return load_ecb_csv(file_path)
 
     def _validate_coverage(self):
         if self.df is None or self.df.is_empty():
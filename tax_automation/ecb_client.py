@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Sequence
+
+import polars as pl
+import requests
+from requests.adapters import HTTPAdapter
+
+from tax_automation.precision import FX_SCALE, PL_FX_DTYPE, round_half_up
+
+ECB_EXR_BASE_URL = "https://data-api.ecb.europa.eu/service/data/EXR"
+ECB_CSV_COLUMNS = ("TIME_PERIOD", "CURRENCY", "CURRENCY_DENOM", "OBS_VALUE")
+FX_RATES_SCHEMA = {
+    "rate_date": pl.Date,
+    "currency": pl.String,
+    "currency_denom": pl.String,
+    "exchange_rate": PL_FX_DTYPE,
+}
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Parse scale for OBS_VALUE before the half-up rounding to the FX scale.
+_OBS_VALUE_DTYPE = pl.Decimal(precision=38, scale=18)
+
+
+def parse_ecb_csv(source: str | bytes) -> pl.DataFrame:
+    """Parses an ECB `csvdata` export (a file path or the raw response body) into the rates frame."""
+    schema_overrides = {column: pl.String for column in ECB_CSV_COLUMNS}
+    if isinstance(source, bytes):
+        frame = pl.read_csv(io.BytesIO(source), columns=list(ECB_CSV_COLUMNS), schema_overrides=schema_overrides).lazy()
+    else:
+        frame = pl.scan_csv(source, schema_overrides=schema_overrides)
+    return frame.select(
+        [
+            pl.col("TIME_PERIOD").str.strptime(pl.Date, "%Y-%m-%d").alias("rate_date"),
+            pl.col("CURRENCY").alias("currency"),
+            pl.col("CURRENCY_DENOM").alias("currency_denom"),
+            round_half_up(pl.col("OBS_VALUE").str.strip_chars().cast(_OBS_VALUE_DTYPE), FX_SCALE).alias("exchange_rate"),
+        ]
+    ).collect()
+
+
+@dataclass(frozen=True)
+class EcbFetchRequest:
+    currencies: tuple[str, ...]
+    start_date: date
+    end_date: date
+
+
+class EcbFetchClient:
+    """
+    Fetches ECB daily reference rates over one pooled HTTP session.
+
+    Large periods and currency sets are split into chunks that are fetched concurrently. Transient failures
+    (connection errors, 429 and 5xx) are retried with exponential backoff. With `cache_dir`, each chunk's
+    response is kept together with its `ETag`/`Last-Modified` validators and later requests for the same
+    chunk are conditional, so an unchanged chunk costs one `304 Not Modified` round trip.
+    """
+
+    def __init__(
+        self,
+        base_url: str = ECB_EXR_BASE_URL,
+        *,
+        timeout: float = 30,
+        max_workers: int = 4,
+        chunk_days: int = 366,
+        currencies_per_request: int = 5,
+        retries: int = 3,
+        backoff_seconds: float = 0.5,
+        cache_dir: str | Path | None = None,
+    ):
+        if chunk_days < 1 or currencies_per_request < 1:
+            raise ValueError("chunk_days and currencies_per_request must be positive.")
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.chunk_days = chunk_days
+        self.currencies_per_request = currencies_per_request
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cache_lock = threading.Lock()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> EcbFetchClient:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def split(self, request: EcbFetchRequest) -> list[EcbFetchRequest]:
+        """Chunks of at most `chunk_days` days and `currencies_per_request` currencies covering `request`."""
+        currencies = tuple(dict.fromkeys(request.currencies))
+        currency_chunks = [
+            currencies[index : index + self.currencies_per_request]
+            for index in range(0, len(currencies), self.currencies_per_request)
+        ]
+        chunks = []
+        chunk_start = request.start_date
+        while chunk_start <= request.end_date:
+            chunk_end = min(chunk_start + timedelta(days=self.chunk_days - 1), request.end_date)
+            chunks.extend(EcbFetchRequest(chunk, chunk_start, chunk_end) for chunk in currency_chunks)
+            chunk_start = chunk_end + timedelta(days=1)
+        return chunks
+
+    def fetch(self, currencies: Sequence[str], start_date: date, end_date: date) -> pl.DataFrame:
+        return self.fetch_many([EcbFetchRequest(tuple(currencies), start_date, end_date)])
+
+    def fetch_many(self, fetch_requests: Sequence[EcbFetchRequest]) -> pl.DataFrame:
+        """Rates for all requests in the `ExchangeRates.get_rates()` layout, sorted by currency and date."""
+        chunks = [chunk for request in fetch_requests for chunk in self.split(request)]
+        if not chunks:
+            return pl.DataFrame(schema=FX_RATES_SCHEMA)
+        if len(chunks) == 1 or self.max_workers <= 1:
+            frames = [self._fetch_chunk(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                frames = list(executor.map(self._fetch_chunk, chunks))
+        return (
+            pl.concat([pl.DataFrame(schema=FX_RATES_SCHEMA), *frames], how="vertical_relaxed")
+            .unique(subset=["currency", "rate_date"], keep="last", maintain_order=True)
+            .sort(["currency", "rate_date"])
+        )
+
+    def _fetch_chunk(self, chunk: EcbFetchRequest) -> pl.DataFrame:
+        url = f"{self.base_url}/D.{'+'.join(chunk.currencies)}.EUR.SP00.A"
+        params = {
+            "startPeriod": chunk.start_date.isoformat(),
+            "endPeriod": chunk.end_date.isoformat(),
+            "format": "csvdata",
+        }
+        cache_key = hashlib.sha256(json.dumps([url, params], sort_keys=True).encode()).hexdigest()
+        cached = self._read_cache(cache_key)
+        headers = {}
+        if cached is not None:
+            validators, _ = cached
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        logging.info(
+            "Fetching %s exchange rates for %s..%s from %s",
+            "+".join(chunk.currencies),
+            chunk.start_date,
+            chunk.end_date,
+            url,
+        )
+        response = self._get_with_retries(url, params, headers)
+        if response.status_code == 304 and cached is not None:
+            body = cached[1]
+        # The ECB answers 404 when the period holds no observations, e.g. a holiday-only gap.
+        elif response.status_code == 404:
+            return pl.DataFrame(schema=FX_RATES_SCHEMA)
+        elif response.status_code != 200:
+            raise ValueError(f"Failed to fetch exchange rates from {url}. HTTP Status Code: {response.status_code}")
+        else:
+            body = response.content
+            self._write_cache(cache_key, response)
+        if not body.strip():
+            return pl.DataFrame(schema=FX_RATES_SCHEMA)
+        return parse_ecb_csv(body).cast(FX_RATES_SCHEMA)
+
+    def _get_with_retries(self, url: str, params: dict[str, str], headers: dict[str, str]) -> requests.Response:
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt >= self.retries:
+                    raise
+                reason = str(error)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.retries:
+                    return response
+                reason = f"HTTP Status Code: {response.status_code}"
+            logging.warning("Exchange rate request to %s failed (%s); retrying", url, reason)
+            time.sleep(self.backoff_seconds * 2**attempt)
+            attempt += 1
+
+    def _read_cache(self, cache_key: str) -> tuple[dict[str, str], bytes] | None:
+        if self.cache_dir is None:
+            return None
+        meta_path = self.cache_dir / f"{cache_key}.json"
+        body_path = self.cache_dir / f"{cache_key}.csv"
+        with self._cache_lock:
+            if not meta_path.exists() or not body_path.exists():
+                return None
+            with open(meta_path, "r") as f:
+                validators = json.load(f)
+            return validators, body_path.read_bytes()
+
+    def _write_cache(self, cache_key: str, response: requests.Response) -> None:
+        validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        if self.cache_dir is None or not any(validators.values()):
+            return
+        with self._cache_lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            (self.cache_dir / f"{cache_key}.csv").write_bytes(response.content)
+            with open(self.cache_dir / f"{cache_key}.json", "w") as f:
+                json.dump(validators, f)
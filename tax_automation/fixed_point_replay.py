@@ -0,0 +1,569 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+import polars as pl
+
+from tax_automation.broker_history import TradeTable
+from tax_automation.moving_average import (
+    EVENT_TYPE_AUSTRIAN_BASIS_RESET,
+    EVENT_TYPE_BUY,
+    EVENT_TYPE_MANUAL_CORRECTION,
+    EVENT_TYPE_OEKB_BASIS_ADJUSTMENT,
+    EVENT_TYPE_REVERSE_SPLIT,
+    EVENT_TYPE_SELL,
+    EVENT_TYPE_SPLIT,
+    EventApplicationResult,
+    PositionEvent,
+    PositionState,
+    RealizedAmounts,
+    ReplayEngine,
+    add_state_note,
+    position_key,
+)
+from tax_automation.precision import (
+    FX_SCALE,
+    MONEY_SCALE,
+    PL_FX_DTYPE,
+    PL_MONEY_DTYPE,
+    PL_QTY_DTYPE,
+    QTY_SCALE,
+    REPLAY_DECIMAL_CONTEXT,
+    to_decimal,
+    to_output_float,
+)
+
+MONEY_UNIT = 10**MONEY_SCALE
+QTY_UNIT = 10**QTY_SCALE
+# Intermediate quotients and products are rounded half-even to this many digits, like the Decimal replay.
+PRECISION = REPLAY_DECIMAL_CONTEXT.prec
+MONEY_FIELDS = (
+    "base_cost_delta_eur",
+    "basis_adjustment_delta_eur",
+    "proceeds_eur",
+    "realized_basis_eur",
+    "realized_gain_loss_eur",
+    "realized_base_cost_eur",
+    "realized_oekb_adjustment_eur",
+)
+NO_NEGATIVE_ZEROS: frozenset[str] = frozenset()
+# Rounding the sale ratio and then the product to PRECISION digits moves a realized share by less than
+# |amount| / TIE_MARGIN units; further from a rounding tie than that, rounding the exact share gives the same result.
+TIE_MARGIN = 10 ** (PRECISION - 2)
+POWERS_OF_TEN = tuple(10**exponent for exponent in range(4 * PRECISION))
+
+
+@dataclass
+class FixedPointPositionState:
+    """`PositionState` with the quantity in 1e-8 units and the EUR totals in 1e-6 units."""
+
+    broker: str
+    ticker: str
+    isin: str
+    currency: str
+    asset_class: str = ""
+    quantity: int = 0
+    base_cost_total: int = 0
+    basis_adjustment_total: int = 0
+    last_event_date: str = ""
+    basis_method: str = ""
+    snapshot_date: str = ""
+    source_file: str = ""
+    notes: str = ""
+
+    @classmethod
+    def from_state(cls, state: PositionState) -> FixedPointPositionState:
+        return cls(
+            broker=state.broker,
+            ticker=state.ticker,
+            isin=state.isin,
+            currency=state.currency,
+            asset_class=state.asset_class,
+            quantity=_to_units(state.quantity, QTY_UNIT),
+            base_cost_total=_to_units(state.base_cost_total_eur, MONEY_UNIT),
+            basis_adjustment_total=_to_units(state.basis_adjustment_total_eur, MONEY_UNIT),
+            last_event_date=state.last_event_date,
+            basis_method=state.basis_method,
+            snapshot_date=state.snapshot_date,
+            source_file=state.source_file,
+            notes=state.notes,
+        )
+
+    def to_state(self) -> PositionState:
+        return PositionState(
+            broker=self.broker,
+            ticker=self.ticker,
+            isin=self.isin,
+            currency=self.currency,
+            asset_class=self.asset_class,
+            quantity=Decimal(self.quantity).scaleb(-QTY_SCALE),
+            base_cost_total_eur=Decimal(self.base_cost_total).scaleb(-MONEY_SCALE),
+            basis_adjustment_total_eur=Decimal(self.basis_adjustment_total).scaleb(-MONEY_SCALE),
+            last_event_date=self.last_event_date,
+            basis_method=self.basis_method,
+            snapshot_date=self.snapshot_date,
+            source_file=self.source_file,
+            notes=self.notes,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FixedPointEvent:
+    """
+    `PositionEvent` with the quantities in 1e-8 units and the prices, FX rates and EUR amounts in 1e-6 units.
+
+    `negative_zeros` names the `MONEY_FIELDS` that hold a Decimal -0, which the Decimal replay writes out as -0.0.
+    """
+
+    event_type: str
+    broker: str
+    ticker: str
+    isin: str
+    currency: str
+    event_date: date
+    effective_date: date
+    eligibility_date: date | None = None
+    asset_class: str = ""
+    quantity: int = 0
+    quantity_delta: int = 0
+    price_ccy: int | None = None
+    fx_to_eur: int | None = None
+    base_cost_delta_eur: int = 0
+    basis_adjustment_delta_eur: int = 0
+    proceeds_eur: int = 0
+    realized_basis_eur: int = 0
+    realized_gain_loss_eur: int = 0
+    realized_base_cost_eur: int = 0
+    realized_oekb_adjustment_eur: int = 0
+    split_ratio: Decimal | None = None
+    basis_method: str = ""
+    source_id: str = ""
+    source_file: str = ""
+    notes: str = ""
+    sequence_key: int = 0
+    negative_zeros: frozenset[str] = NO_NEGATIVE_ZEROS
+
+    @classmethod
+    def from_event(cls, event: PositionEvent) -> FixedPointEvent:
+        amounts = {name: to_decimal(getattr(event, name)) for name in MONEY_FIELDS}
+        units = {name: _to_units(value, MONEY_UNIT) for name, value in amounts.items()}
+        return cls(
+            event_type=event.event_type,
+            broker=event.broker,
+            ticker=event.ticker,
+            isin=event.isin,
+            currency=event.currency,
+            event_date=event.event_date,
+            effective_date=event.effective_date,
+            eligibility_date=event.eligibility_date,
+            asset_class=event.asset_class,
+            quantity=_to_units(event.quantity, QTY_UNIT),
+            quantity_delta=_to_units(event.quantity_delta, QTY_UNIT),
+            price_ccy=None if event.price_ccy is None else _to_units(event.price_ccy, MONEY_UNIT),
+            fx_to_eur=None if event.fx_to_eur is None else _to_units(event.fx_to_eur, MONEY_UNIT),
+            split_ratio=None if event.split_ratio is None else to_decimal(event.split_ratio),
+            basis_method=event.basis_method,
+            source_id=event.source_id,
+            source_file=event.source_file,
+            notes=event.notes,
+            sequence_key=event.sequence_key,
+            negative_zeros=frozenset(name for name, value in amounts.items() if units[name] == 0 and value.is_signed()),
+            **units,
+        )
+
+    def signed(self, name: str) -> tuple[int, bool]:
+        """The units of money field `name` and whether the Decimal amount is negative, including a negative zero."""
+        units = getattr(self, name)
+        return units, units < 0 or name in self.negative_zeros
+
+
+def build_fixed_point_trade_event(
+    *,
+    event_type: str,
+    broker: str,
+    ticker: str,
+    isin: str,
+    currency: str,
+    asset_class: str,
+    trade_date: date,
+    quantity: int,
+    price_ccy: int,
+    fx_to_eur: int,
+    source_id: str,
+    source_file: str,
+    notes: str = "",
+    sequence_key: int = 0,
+) -> FixedPointEvent:
+    """
+    `build_buy_event` or `build_sell_event` on integer units: `quantity` in 1e-8, `price_ccy` and `fx_to_eur` in
+    1e-6, as held by the fixed-scale Decimal columns of a `TradeTable`.
+    """
+    if event_type not in {EVENT_TYPE_BUY, EVENT_TYPE_SELL}:
+        raise ValueError(f"Unsupported trade event type: {event_type}")
+    if fx_to_eur <= 0:
+        raise ValueError(f"FX rate of trade {source_id} must be positive")
+    # round_money((quantity * price_ccy) / fx_to_eur), rounding the product and the quotient like Decimal does.
+    coefficient, exponent = _round(quantity * price_ccy, 1, -(QTY_SCALE + MONEY_SCALE))
+    amount = _quantize_half_up(*_round(coefficient, fx_to_eur, exponent + FX_SCALE), MONEY_SCALE)
+    amount_field = "base_cost_delta_eur" if event_type == EVENT_TYPE_BUY else "proceeds_eur"
+    negative_zero = amount == 0 and (quantity < 0) != (price_ccy < 0)
+    return FixedPointEvent(
+        event_type=event_type,
+        broker=broker,
+        ticker=ticker,
+        isin=isin,
+        currency=currency,
+        asset_class=asset_class,
+        event_date=trade_date,
+        effective_date=trade_date,
+        quantity=quantity,
+        quantity_delta=quantity if event_type == EVENT_TYPE_BUY else -quantity,
+        price_ccy=price_ccy,
+        fx_to_eur=fx_to_eur,
+        source_id=source_id,
+        source_file=source_file,
+        notes=notes,
+        sequence_key=sequence_key,
+        negative_zeros=frozenset({amount_field}) if negative_zero else NO_NEGATIVE_ZEROS,
+        **{amount_field: amount},
+    )
+
+
+def iter_trade_table_events(
+    trades: TradeTable,
+    fx_rates: pl.Series,
+    *,
+    broker: str,
+    sequence_offset: int = 0,
+    sell_notes: str = "",
+) -> Iterator[FixedPointEvent]:
+    """
+    One fixed-point buy or sell event per trade, in table order, with `fx_rates` aligned to the rows of `trades`.
+
+    Quantities, prices and rates are read as the integer units of their fixed-scale Decimal columns, so no
+    Decimal is built per trade.
+    """
+    units = trades.df.select(
+        "operation",
+        "ticker",
+        "isin",
+        "currency",
+        "asset_class",
+        "trade_date",
+        "trade_id",
+        "source_statement_file",
+        pl.col("quantity").cast(PL_QTY_DTYPE).to_physical(),
+        pl.col("price_ccy").cast(PL_MONEY_DTYPE).to_physical(),
+        fx_rates.cast(PL_FX_DTYPE).to_physical().alias("fx_to_eur"),
+    )
+    for sequence_key, row in enumerate(units.iter_rows(), start=sequence_offset):
+        operation, ticker, isin, currency, asset_class, trade_date, trade_id, source_file, quantity, price, fx = row
+        is_buy = operation == "buy"
+        yield build_fixed_point_trade_event(
+            event_type=EVENT_TYPE_BUY if is_buy else EVENT_TYPE_SELL,
+            broker=broker,
+            ticker=ticker,
+            isin=isin,
+            currency=currency,
+            asset_class=asset_class,
+            trade_date=trade_date,
+            quantity=quantity,
+            price_ccy=price,
+            fx_to_eur=fx,
+            source_id=trade_id,
+            source_file=source_file,
+            notes="" if is_buy else sell_notes,
+            sequence_key=sequence_key,
+        )
+
+
+class FixedPointEngine(ReplayEngine):
+    """
+    Integer implementation of `moving_average.apply_event`, selected with `replay_events(..., engine=...)`.
+
+    Events are applied as `FixedPointEvent`s; a `PositionEvent` is converted on the way in, so callers that can
+    build integer events upstream (see `build_fixed_point_trade_event`) skip that per-event conversion. Sums of
+    on-grid values are exact in both engines. The inexact steps (the realized-basis split of a sale, the average
+    basis and splits) round the intermediate quotient or product half-even to `REPLAY_DECIMAL_CONTEXT` precision
+    and the result half-up to its scale, so states, event records and sale records are identical to the Decimal
+    replay, down to the sign of a zero output.
+    """
+
+    def clone_states(self, states: Iterable[PositionState]) -> dict[str, FixedPointPositionState]:
+        return {
+            position_key(broker=state.broker, isin=state.isin): FixedPointPositionState.from_state(state)
+            for state in states
+        }
+
+    def to_position_state(self, state: FixedPointPositionState) -> PositionState:
+        return state.to_state()
+
+    def apply_event_to_state(
+        self, states: dict[str, FixedPointPositionState], event: FixedPointEvent | PositionEvent
+    ) -> None:
+        self._apply(states, _fixed_point_event(event))
+
+    def apply_event(
+        self, states: dict[str, FixedPointPositionState], event: FixedPointEvent | PositionEvent
+    ) -> EventApplicationResult:
+        event = _fixed_point_event(event)
+        state, realized = self._apply(states, event)
+        if realized is None:
+            sale_record = None
+            event_amounts = {name: _money_float(*event.signed(name)) for name in MONEY_FIELDS if name != "proceeds_eur"}
+        else:
+            realized_base, realized_adjustment, realized_basis, gain = realized
+            sale_record = {
+                "sale_date": event.event_date.isoformat(),
+                "ticker": event.ticker,
+                "isin": event.isin,
+                "quantity_sold": event.quantity / QTY_UNIT,
+                "sale_price_ccy": (event.price_ccy or 0) / MONEY_UNIT,
+                "sale_fx": (event.fx_to_eur or 0) / MONEY_UNIT,
+                "taxable_proceeds_eur": _money_float(*event.signed("proceeds_eur")),
+                "realized_base_cost_eur": _money_float(*realized_base),
+                "taxable_original_basis_eur": _money_float(*realized_base),
+                "realized_oekb_adjustment_eur": _money_float(*realized_adjustment),
+                "taxable_stepup_basis_eur": _money_float(*realized_adjustment),
+                "taxable_total_basis_eur": _money_float(*realized_basis),
+                "taxable_gain_loss_eur": _money_float(*gain),
+                "notes": event.notes,
+                "sale_trade_id": event.source_id,
+            }
+            # Negating a Decimal zero gives +0, so the deltas carry no sign of zero.
+            event_amounts = {
+                "base_cost_delta_eur": -realized_base[0] / MONEY_UNIT,
+                "basis_adjustment_delta_eur": -realized_adjustment[0] / MONEY_UNIT,
+                "realized_basis_eur": _money_float(*realized_basis),
+                "realized_gain_loss_eur": _money_float(*gain),
+                "realized_base_cost_eur": _money_float(*realized_base),
+                "realized_oekb_adjustment_eur": _money_float(*realized_adjustment),
+            }
+        total_basis = state.base_cost_total + state.basis_adjustment_total
+        event_record = {
+            "broker": event.broker,
+            "ticker": event.ticker,
+            "isin": event.isin,
+            "currency": event.currency,
+            "asset_class": event.asset_class,
+            "event_type": event.event_type,
+            "event_date": event.event_date.isoformat(),
+            "effective_date": event.effective_date.isoformat(),
+            "eligibility_date": event.eligibility_date.isoformat() if event.eligibility_date else "",
+            "source_id": event.source_id,
+            "source_file": event.source_file,
+            "sequence_key": event.sequence_key,
+            "quantity": event.quantity / QTY_UNIT,
+            "quantity_delta": event.quantity_delta / QTY_UNIT,
+            "price_ccy": event.price_ccy / MONEY_UNIT if event.price_ccy is not None else None,
+            "fx_to_eur": event.fx_to_eur / MONEY_UNIT if event.fx_to_eur is not None else None,
+            "proceeds_eur": _money_float(*event.signed("proceeds_eur")),
+            "base_cost_delta_eur": event_amounts["base_cost_delta_eur"],
+            "basis_adjustment_delta_eur": event_amounts["basis_adjustment_delta_eur"],
+            "realized_basis_eur": event_amounts["realized_basis_eur"],
+            "realized_gain_loss_eur": event_amounts["realized_gain_loss_eur"],
+            "realized_base_cost_eur": event_amounts["realized_base_cost_eur"],
+            "realized_oekb_adjustment_eur": event_amounts["realized_oekb_adjustment_eur"],
+            "split_ratio": to_output_float(event.split_ratio) if event.split_ratio is not None else None,
+            "quantity_after": state.quantity / QTY_UNIT,
+            "base_cost_total_eur_after": state.base_cost_total / MONEY_UNIT,
+            "basis_adjustment_total_eur_after": state.basis_adjustment_total / MONEY_UNIT,
+            "total_basis_eur_after": total_basis / MONEY_UNIT,
+            "average_basis_eur_after": _average_basis(total_basis, state.quantity),
+            "notes": event.notes,
+        }
+        return EventApplicationResult(
+            event_record=event_record,
+            sale_record=sale_record,
+            realized=None if realized is None else RealizedAmounts(*(_money_decimal(*amount) for amount in realized)),
+        )
+
+    def _apply(
+        self, states: dict[str, FixedPointPositionState], event: FixedPointEvent
+    ) -> tuple[FixedPointPositionState, tuple[tuple[int, bool], ...] | None]:
+        key = position_key(broker=event.broker, isin=event.isin)
+        state = states.get(key)
+        if state is None:
+            state = states[key] = FixedPointPositionState(
+                broker=event.broker,
+                ticker=event.ticker,
+                isin=event.isin,
+                currency=event.currency,
+                asset_class=event.asset_class,
+                basis_method=event.basis_method,
+                source_file=event.source_file,
+            )
+        realized = None
+
+        if event.event_type == EVENT_TYPE_BUY:
+            state.quantity += event.quantity
+            state.base_cost_total += event.base_cost_delta_eur
+        elif event.event_type == EVENT_TYPE_SELL:
+            quantity = event.quantity
+            if quantity <= 0:
+                raise ValueError("Sell quantity must be positive")
+            quantity_before = state.quantity
+            if quantity_before <= 0 or quantity_before < quantity:
+                raise ValueError(f"Sell of {event.ticker} on {event.event_date} exceeds available quantity")
+            realized_base = _realized_share(state.base_cost_total, quantity, quantity_before)
+            realized_adjustment = _realized_share(state.basis_adjustment_total, quantity, quantity_before)
+            realized_basis = _add_signed(realized_base, realized_adjustment)
+            gain = _sub_signed(event.signed("proceeds_eur"), realized_basis)
+            state.quantity -= quantity
+            state.base_cost_total -= realized_base[0]
+            state.basis_adjustment_total -= realized_adjustment[0]
+            if state.quantity == 0:
+                state.base_cost_total = 0
+                state.basis_adjustment_total = 0
+            realized = (realized_base, realized_adjustment, realized_basis, gain)
+        elif event.event_type == EVENT_TYPE_AUSTRIAN_BASIS_RESET:
+            if state.quantity != 0 or state.base_cost_total + state.basis_adjustment_total != 0:
+                raise ValueError(
+                    f"Cannot apply austrian basis reset to non-empty position {state.ticker} ({state.isin})"
+                )
+            state.quantity = event.quantity
+            state.base_cost_total = event.base_cost_delta_eur
+            state.basis_adjustment_total = event.basis_adjustment_delta_eur
+            state.basis_method = event.basis_method
+            state.snapshot_date = event.event_date.isoformat()
+        elif event.event_type == EVENT_TYPE_OEKB_BASIS_ADJUSTMENT:
+            state.basis_adjustment_total += event.basis_adjustment_delta_eur
+        elif event.event_type in {EVENT_TYPE_SPLIT, EVENT_TYPE_REVERSE_SPLIT}:
+            if event.split_ratio in (None, 0):
+                raise ValueError("Split event requires non-zero split_ratio")
+            numerator, denominator = event.split_ratio.as_integer_ratio()
+            state.quantity = _quantize_half_up(*_round(state.quantity * numerator, denominator, -QTY_SCALE), QTY_SCALE)
+        elif event.event_type == EVENT_TYPE_MANUAL_CORRECTION:
+            state.quantity += event.quantity_delta
+            state.base_cost_total += event.base_cost_delta_eur
+            state.basis_adjustment_total += event.basis_adjustment_delta_eur
+        else:
+            raise ValueError(f"Unsupported position event type: {event.event_type}")
+
+        state.last_event_date = event.effective_date.isoformat()
+        state.asset_class = state.asset_class or event.asset_class
+        state.source_file = state.source_file or event.source_file
+        add_state_note(state, event.notes)
+        return state, realized
+
+
+FIXED_POINT_ENGINE = FixedPointEngine()
+
+
+def _fixed_point_event(event: FixedPointEvent | PositionEvent) -> FixedPointEvent:
+    return event if isinstance(event, FixedPointEvent) else FixedPointEvent.from_event(event)
+
+
+def _round(numerator: int, denominator: int, exponent: int) -> tuple[int, int]:
+    """`numerator / denominator * 10**exponent` rounded half-even to `PRECISION` digits, as (coefficient, exponent)."""
+    if exponent >= 0:
+        numerator *= _pow10(exponent)
+    else:
+        denominator *= _pow10(-exponent)
+    if numerator == 0:
+        return 0, 0
+    magnitude = abs(numerator)
+    digits = _floor_log10(magnitude, denominator)
+    result_exponent = digits - PRECISION + 1
+    if result_exponent <= 0:
+        coefficient = _div_half_even(magnitude * _pow10(-result_exponent), denominator)
+    else:
+        coefficient = _div_half_even(magnitude, denominator * _pow10(result_exponent))
+    return (coefficient if numerator > 0 else -coefficient), result_exponent
+
+
+def _realized_share(amount: int, quantity: int, quantity_before: int) -> tuple[int, bool]:
+    """
+    `round_money(amount * (quantity / quantity_before))` and whether the Decimal result is negative, including a
+    negative zero.
+    """
+    if amount == 0:
+        return 0, False
+    magnitude = abs(amount)
+    units, remainder = divmod(magnitude * quantity, quantity_before)
+    if abs(2 * remainder - quantity_before) * TIE_MARGIN > 2 * magnitude * quantity_before:
+        if 2 * remainder > quantity_before:
+            units += 1
+        return (units if amount > 0 else -units), amount < 0
+    # Next to a tie the two roundings of the Decimal arithmetic decide, so they are reproduced step by step.
+    coefficient, exponent = _round(quantity, quantity_before, 0)
+    units = _quantize_half_up(*_round(amount * coefficient, 1, exponent - MONEY_SCALE), MONEY_SCALE)
+    return units, amount < 0
+
+
+def _average_basis(total_basis: int, quantity: int) -> float:
+    if quantity <= 0:
+        return 0.0
+    # (total / 1e6) / (quantity / 1e8) == total * 100 / quantity
+    units = _quantize_half_up(*_round(total_basis, quantity, QTY_SCALE - MONEY_SCALE), MONEY_SCALE)
+    return _money_float(units, total_basis < 0)
+
+
+def _to_units(value: Decimal | int, unit: int) -> int:
+    """`value` rounded half-up to `1 / unit`, as an integer count of units."""
+    numerator, denominator = to_decimal(value).as_integer_ratio()
+    return _div_half_up(numerator * unit, denominator)
+
+
+def _floor_log10(numerator: int, denominator: int) -> int:
+    """floor(log10(numerator / denominator)) for positive integers."""
+    # The bit lengths pin log2 of the quotient to within 1, so this estimate is off by at most one either way.
+    digits = ((numerator.bit_length() - denominator.bit_length()) * 1233) >> 12
+    if _below(numerator, denominator, digits):
+        return digits - 1
+    return digits if _below(numerator, denominator, digits + 1) else digits + 1
+
+
+def _below(numerator: int, denominator: int, exponent: int) -> bool:
+    """numerator / denominator < 10**exponent"""
+    if exponent >= 0:
+        return numerator < denominator * _pow10(exponent)
+    return numerator * _pow10(-exponent) < denominator
+
+
+def _pow10(exponent: int) -> int:
+    return POWERS_OF_TEN[exponent] if exponent < len(POWERS_OF_TEN) else 10**exponent
+
+
+def _div_half_even(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(numerator, denominator)
+    if 2 * remainder > denominator or (2 * remainder == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def _div_half_up(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def _quantize_half_up(coefficient: int, exponent: int, scale: int) -> int:
+    shift = exponent + scale
+    if shift >= 0:
+        return coefficient * _pow10(shift)
+    return _div_half_up(coefficient, _pow10(-shift))
+
+
+def _add_signed(left: tuple[int, bool], right: tuple[int, bool]) -> tuple[int, bool]:
+    units = left[0] + right[0]
+    # An exact zero sum is +0 unless both operands are negative zeros.
+    return units, units < 0 or (units == 0 and left == (0, True) and right == (0, True))
+
+
+def _sub_signed(left: tuple[int, bool], right: tuple[int, bool]) -> tuple[int, bool]:
+    units = left[0] - right[0]
+    return units, units < 0 or (units == 0 and left == (0, True) and right[0] == 0 and not right[1])
+
+
+def _money_float(units: int, negative: bool = False) -> float:
+    return -0.0 if units == 0 and negative else units / MONEY_UNIT
+
+
+def _money_decimal(units: int, negative: bool = False) -> Decimal:
+    value = Decimal(units).scaleb(-MONEY_SCALE)
+    return value.copy_negate() if units == 0 and negative else value
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import cached_property
+from typing import Iterable, Sequence
+
+import polars as pl
+
+from tax_automation.const import EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
+from tax_automation.precision import MONEY_SCALE, PL_FX_DTYPE, quantize_fx, round_half_up
+
+# Division operand scale for EUR conversion; far below the money scale so half-up rounding sees the true quotient.
+_DIVISION_DTYPE = pl.Decimal(precision=38, scale=18)
+
+
+@dataclass(frozen=True)
+class FxSeries:
+    """
+    One currency's rates on a dense day axis starting at `first_day` (a `date.toordinal()`).
+
+    Slot `i` holds the latest published rate on or before `first_day + i` and the age in days of that
+    observation, so a lookup is a single index instead of a search.
+    """
+
+    first_day: int
+    rates: tuple[Decimal, ...]
+    ages: tuple[int, ...]
+
+    @property
+    def last_day(self) -> int:
+        return self.first_day + len(self.rates) - 1
+
+
+@dataclass(frozen=True, eq=False)
+class FxCalendar:
+    """Forward-filled daily EUR reference rates per currency with the staleness rule applied on lookup."""
+
+    series: dict[str, FxSeries]
+    max_age_days: int = EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
+
+    @classmethod
+    def from_rates_df(
+        cls,
+        rates_df: pl.DataFrame,
+        *,
+        currencies: Iterable[str] | None = None,
+        max_age_days: int = EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET,
+    ) -> FxCalendar:
+        """
+        Builds the calendar from an `ExchangeRates.get_rates()` frame.
+
+        With `currencies`, only those series are kept and a currency without any rate is an error;
+        otherwise every currency in the frame is kept and a missing one only fails on lookup.
+        """
+        if currencies is not None:
+            wanted = sorted({currency for currency in currencies if currency != "EUR"})
+        else:
+            wanted = sorted(set(rates_df["currency"].to_list()) - {"EUR"})
+        rates_df = (
+            rates_df.filter(pl.col("currency").is_in(wanted), pl.col("exchange_rate").is_not_null())
+            .select("currency", "rate_date", "exchange_rate")
+            .unique(subset=["currency", "rate_date"], keep="last", maintain_order=True)
+        )
+
+        series: dict[str, FxSeries] = {}
+        for (currency,), currency_df in rates_df.partition_by("currency", as_dict=True).items():
+            series[currency] = _build_series(currency_df.sort("rate_date"))
+        if currencies is not None:
+            for currency in wanted:
+                if currency not in series:
+                    raise ValueError(f"Missing FX series for currency {currency}")
+        return cls(series=series, max_age_days=max_age_days)
+
+    def lookup(self, currency: str, event_date: date) -> tuple[Decimal, date]:
+        """The rate for `currency` on `event_date` and the date of the observation it came from."""
+        if currency == "EUR":
+            return Decimal("1"), event_date
+
+        series = self.series.get(currency)
+        if series is None:
+            raise ValueError(f"Missing FX series for currency {currency}")
+
+        day = event_date.toordinal()
+        if day < series.first_day:
+            raise ValueError(f"No FX rate available for {currency} on or before {event_date}")
+        if day <= series.last_day:
+            index = day - series.first_day
+            rate, age = series.rates[index], series.ages[index]
+        else:
+            rate, age = series.rates[-1], series.ages[-1] + day - series.last_day
+
+        matched_date = event_date - timedelta(days=age)
+        if age > self.max_age_days:
+            raise ValueError(
+                f"Closest FX rate for {currency} on {event_date} is too old: {matched_date} "
+                f"(>{self.max_age_days} days)"
+            )
+        return rate, matched_date
+
+    def rate(self, currency: str, event_date: date) -> Decimal:
+        return self.lookup(currency, event_date)[0]
+
+    def lookup_many(
+        self,
+        currencies: Sequence[str] | pl.Series,
+        event_dates: Sequence[date] | pl.Series,
+        amounts_ccy: Sequence[Decimal] | pl.Series | None = None,
+        *,
+        strict: bool = True,
+    ) -> pl.DataFrame:
+        """
+        Bulk `lookup`: one output row per input position with `fx_rate`, `fx_date` and `fx_stale`.
+
+        With `amounts_ccy`, `amount_eur` holds each amount divided by its rate at the money scale (half-up).
+        A strict lookup raises the single-lookup error of the first unresolvable row; otherwise rows without
+        a series or without an earlier observation have null rates and stale rates are only flagged.
+        """
+        query_df = pl.DataFrame(
+            {"currency": currencies, "event_date": event_dates},
+            schema={"currency": pl.String, "event_date": pl.Date},
+        )
+        age = pl.col("fx_age") + (pl.col("event_date") - pl.col("fx_day")).dt.total_days()
+        is_eur = pl.col("currency") == "EUR"
+        result_df = (
+            query_df.join(self._bounds_df, on="currency", how="left", maintain_order="left")
+            .with_columns(
+                pl.when(pl.col("event_date") >= pl.col("first_day")).then(pl.min_horizontal("event_date", "last_day"))
+                .alias("fx_day")
+            )
+            .join(self._dense_df, on=["currency", "fx_day"], how="left", maintain_order="left")
+            .with_columns(
+                pl.when(is_eur).then(pl.lit(Decimal("1"), dtype=PL_FX_DTYPE)).otherwise(pl.col("fx_rate")).alias("fx_rate"),
+                pl.when(is_eur).then(pl.lit(0, dtype=pl.Int64)).otherwise(age).alias("fx_age"),
+            )
+            .select(
+                "fx_rate",
+                (pl.col("event_date") - pl.duration(days=pl.col("fx_age"))).alias("fx_date"),
+                (pl.col("fx_age") > self.max_age_days).alias("fx_stale"),
+            )
+        )
+        if strict:
+            invalid = result_df["fx_rate"].is_null() | result_df["fx_stale"].fill_null(True)
+            if invalid.any():
+                index = invalid.arg_true()[0]
+                self.lookup(query_df["currency"][index], query_df["event_date"][index])
+        if amounts_ccy is not None:
+            amounts = pl.Series("amount_ccy", amounts_ccy, dtype=_DIVISION_DTYPE)
+            result_df = result_df.with_columns(
+                round_half_up(pl.lit(amounts) / pl.col("fx_rate"), MONEY_SCALE).alias("amount_eur")
+            )
+        return result_df
+
+    def rates_for(self, keys: Iterable[tuple[str, date]]) -> dict[tuple[str, date], Decimal]:
+        """Strict bulk lookup of distinct `(currency, date)` pairs, for callers that resolve rates one item at a time."""
+        unique_keys = sorted(set(keys))
+        if not unique_keys:
+            return {}
+        currencies, event_dates = zip(*unique_keys)
+        rates = self.lookup_many(list(currencies), list(event_dates))["fx_rate"].to_list()
+        return dict(zip(unique_keys, rates))
+
+    @cached_property
+    def _bounds_df(self) -> pl.DataFrame:
+        return pl.DataFrame(
+            {
+                "currency": list(self.series),
+                "first_day": [date.fromordinal(series.first_day) for series in self.series.values()],
+                "last_day": [date.fromordinal(series.last_day) for series in self.series.values()],
+            },
+            schema={"currency": pl.String, "first_day": pl.Date, "last_day": pl.Date},
+        )
+
+    @cached_property
+    def _dense_df(self) -> pl.DataFrame:
+        schema = {"currency": pl.String, "fx_day": pl.Date, "fx_rate": PL_FX_DTYPE, "fx_age": pl.Int64}
+        frames = [
+            pl.DataFrame(
+                {
+                    "currency": [currency] * len(series.rates),
+                    "fx_day": pl.date_range(
+                        date.fromordinal(series.first_day), date.fromordinal(series.last_day), interval="1d", eager=True
+                    ),
+                    "fx_rate": series.rates,
+                    "fx_age": series.ages,
+                },
+                schema=schema,
+            )
+            for currency, series in self.series.items()
+        ]
+        return pl.concat(frames) if frames else pl.DataFrame(schema=schema)
+
+
+def _build_series(currency_df: pl.DataFrame) -> FxSeries:
+    first_date = currency_df["rate_date"][0]
+    last_date = currency_df["rate_date"][-1]
+    dense_df = (
+        pl.DataFrame({"rate_date": pl.date_range(first_date, last_date, interval="1d", eager=True)})
+        .join(
+            currency_df.select("rate_date", "exchange_rate", pl.col("rate_date").alias("matched_date")),
+            on="rate_date",
+            how="left",
+        )
+        .sort("rate_date")
+        .with_columns(pl.col("exchange_rate", "matched_date").forward_fill())
+        .select("exchange_rate", (pl.col("rate_date") - pl.col("matched_date")).dt.total_days().alias("age"))
+    )
+    observed = {value: quantize_fx(value) for value in currency_df["exchange_rate"].to_list()}
+    return FxSeries(
+        first_day=first_date.toordinal(),
+        rates=tuple(observed[value] for value in dense_df["exchange_rate"].to_list()),
+        ages=tuple(dense_df["age"].to_list()),
+    )
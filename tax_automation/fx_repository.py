@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Sequence
+
+import polars as pl
+
+from tax_automation.const import EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
+from tax_automation.currencies import DEFAULT_RAW_EXCHANGE_RATES_PATH, ExchangeRates
+from tax_automation.ecb_client import ECB_EXR_BASE_URL, FX_RATES_SCHEMA, EcbFetchClient, EcbFetchRequest
+from tax_automation.fx_requirements import FxRequirements
+
+DEFAULT_FX_REPOSITORY_DIR = "data/input/currencies/ecb"
+FX_CURRENT_FILE = "CURRENT"
+FX_SNAPSHOT_PREFIX = "observations-"
+FX_SNAPSHOT_SUFFIX = ".arrow"
+
+DateInterval = tuple[date, date]
+
+
+@dataclass(frozen=True)
+class FxSnapshot:
+    """One published repository version: an immutable Arrow IPC file of observations plus its coverage."""
+
+    version: int
+    observations_file: str | None
+    coverage: dict[str, list[DateInterval]]
+
+
+@dataclass(frozen=True, eq=False)
+class FxRepository:
+    """
+    Local store of ECB daily reference rates that only downloads what it does not hold yet.
+
+    Each update publishes a new immutable Arrow IPC snapshot of all observations and then atomically replaces
+    the `CURRENT` pointer, which names that file and records, per currency, the closed date intervals already
+    requested from the ECB (holidays and weekends inside an interval are covered even though they have no
+    observation). Readers memory-map the snapshot `CURRENT` points at and never wait on a writer; concurrent
+    writers do not corrupt each other, the last pointer swap wins and the loser's rates are fetched again later.
+    A request for a period fetches only the uncovered gaps, never later than yesterday since today's fixing
+    may not be published yet.
+    """
+
+    root: Path
+    base_url: str = ECB_EXR_BASE_URL
+    timeout: float = 30
+    client: EcbFetchClient | None = None
+
+    @property
+    def current_path(self) -> Path:
+        return self.root / FX_CURRENT_FILE
+
+    def read_snapshot(self) -> FxSnapshot:
+        if not self.current_path.exists():
+            return FxSnapshot(version=0, observations_file=None, coverage={})
+        with open(self.current_path, "r") as f:
+            payload = json.load(f)
+        return FxSnapshot(
+            version=payload["version"],
+            observations_file=payload["observations_file"],
+            coverage={
+                currency: [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in intervals]
+                for currency, intervals in payload["coverage"].items()
+            },
+        )
+
+    def read_observations(self, snapshot: FxSnapshot | None = None) -> pl.DataFrame:
+        """Observations of `snapshot` (the current one by default), memory-mapped from its Arrow IPC file."""
+        current = snapshot or self.read_snapshot()
+        if current.observations_file is None:
+            return pl.DataFrame(schema=FX_RATES_SCHEMA)
+        try:
+            return pl.read_ipc(self.root / current.observations_file, memory_map=True)
+        except FileNotFoundError:
+            if snapshot is not None:
+                raise
+            # A writer pruned this snapshot after we read the pointer, so the pointer has moved on since.
+            return self.read_observations(self.read_snapshot())
+
+    def read_coverage(self) -> dict[str, list[DateInterval]]:
+        return self.read_snapshot().coverage
+
+    def missing_intervals(
+        self, currencies: Sequence[str], start_date: date, end_date: date, snapshot: FxSnapshot | None = None
+    ) -> dict[str, list[DateInterval]]:
+        """Date intervals per currency that have to be fetched to cover `start_date`..`end_date`."""
+        coverage = (snapshot or self.read_snapshot()).coverage
+        return {
+            currency: gaps
+            for currency in currencies
+            if (gaps := _subtract_intervals((start_date, end_date), coverage.get(currency, [])))
+        }
+
+    def get_rates(
+        self,
+        start_date: date,
+        end_date: date,
+        currencies: Sequence[str] = ("USD", "GBP"),
+        *,
+        today: date | None = None,
+    ) -> pl.DataFrame:
+        """
+        Rates for `currencies` around `start_date`..`end_date`, in the `ExchangeRates.get_rates()` layout.
+
+        Like `ExchangeRates`, the period is widened by the acceptable lookup offset on both sides.
+        """
+        if end_date < start_date:
+            raise ValueError("end_date must be greater than or equal to start_date.")
+        today = today or date.today()
+        offset = timedelta(days=EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET)
+        fetch_start = start_date - offset
+        fetch_end = min(end_date + offset, today - timedelta(days=1))
+        if fetch_start <= fetch_end:
+            self.update(currencies, fetch_start, fetch_end)
+
+        rates_df = self.read_observations().filter(
+            pl.col("currency").is_in(list(currencies)),
+            pl.col("rate_date").is_between(start_date - offset, end_date + offset),
+        )
+        missing_currencies = set(currencies) - set(rates_df["currency"].unique().to_list())
+        if missing_currencies:
+            raise ValueError(
+                f"ECB returned no exchange rates for {sorted(missing_currencies)} in {start_date}..{end_date}."
+            )
+        return rates_df.sort(["currency", "rate_date"])
+
+    def get_required_rates(self, requirements: FxRequirements, *, today: date | None = None) -> pl.DataFrame:
+        """
+        Rates for exactly the currencies and periods in `requirements`, fetched in one update.
+
+        Each currency's bounds are widened by the acceptable lookup offset, as in `get_rates`.
+        """
+        today = today or date.today()
+        offset = timedelta(days=EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET)
+        windows = {
+            currency: (first_date - offset, last_date + offset)
+            for currency, (first_date, last_date) in requirements.bounds.items()
+        }
+        fetch_windows = {
+            currency: (window_start, min(window_end, today - timedelta(days=1)))
+            for currency, (window_start, window_end) in windows.items()
+        }
+        self.update_windows(
+            {currency: window for currency, window in fetch_windows.items() if window[0] <= window[1]}
+        )
+
+        observations_df = self.read_observations()
+        frames = [pl.DataFrame(schema=FX_RATES_SCHEMA)]
+        for currency, (window_start, window_end) in windows.items():
+            currency_df = observations_df.filter(
+                pl.col("currency") == currency, pl.col("rate_date").is_between(window_start, window_end)
+            )
+            if currency_df.is_empty():
+                first_date, last_date = requirements.bounds[currency]
+                raise ValueError(f"ECB returned no exchange rates for {currency} in {first_date}..{last_date}.")
+            frames.append(currency_df)
+        return pl.concat(frames, how="vertical_relaxed").sort(["currency", "rate_date"])
+
+    def update(self, currencies: Sequence[str], start_date: date, end_date: date) -> int:
+        """Fetches the uncovered parts of `start_date`..`end_date` and publishes them; returns the number of gaps fetched."""
+        return self.update_windows({currency: (start_date, end_date) for currency in currencies})
+
+    def update_windows(self, windows: dict[str, DateInterval]) -> int:
+        """`update` with a separate period per currency; all gaps are fetched together and published once."""
+        snapshot = self.read_snapshot()
+        gaps = {
+            currency: currency_gaps
+            for currency, (start_date, end_date) in windows.items()
+            if (currency_gaps := self.missing_intervals([currency], start_date, end_date, snapshot).get(currency))
+        }
+        if not gaps:
+            return 0
+
+        currencies_by_gap: dict[DateInterval, list[str]] = {}
+        for currency, intervals in gaps.items():
+            for interval in intervals:
+                currencies_by_gap.setdefault(interval, []).append(currency)
+
+        fetch_requests = [
+            EcbFetchRequest(tuple(gap_currencies), gap_start, gap_end)
+            for (gap_start, gap_end), gap_currencies in sorted(currencies_by_gap.items())
+        ]
+        if self.client is not None:
+            fetched_df = self.client.fetch_many(fetch_requests)
+        else:
+            with EcbFetchClient(self.base_url, timeout=self.timeout) as client:
+                fetched_df = client.fetch_many(fetch_requests)
+
+        observations_df = (
+            pl.concat([self.read_observations(snapshot), fetched_df], how="vertical_relaxed")
+            .unique(subset=["currency", "rate_date"], keep="last", maintain_order=True)
+            .sort(["currency", "rate_date"])
+        )
+        coverage = dict(snapshot.coverage)
+        for currency, intervals in gaps.items():
+            coverage[currency] = _merge_intervals(coverage.get(currency, []) + intervals)
+        self._publish(observations_df, coverage, snapshot)
+        return len(currencies_by_gap)
+
+    def _publish(
+        self, observations_df: pl.DataFrame, coverage: dict[str, list[DateInterval]], previous: FxSnapshot
+    ) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        version = previous.version + 1
+        # The snapshot file gets a unique name and is complete before any pointer names it.
+        fd, snapshot_path = tempfile.mkstemp(
+            dir=self.root, prefix=f"{FX_SNAPSHOT_PREFIX}{version:06d}-", suffix=FX_SNAPSHOT_SUFFIX
+        )
+        os.close(fd)
+        try:
+            observations_df.write_ipc(snapshot_path)
+            payload = {
+                "version": version,
+                "observations_file": Path(snapshot_path).name,
+                "coverage": {
+                    currency: [[start.isoformat(), end.isoformat()] for start, end in intervals]
+                    for currency, intervals in sorted(coverage.items())
+                },
+            }
+            _write_atomic(self.current_path, lambda tmp_path: _dump_json(payload, tmp_path))
+        except BaseException:
+            Path(snapshot_path).unlink(missing_ok=True)
+            raise
+        self._prune(older_than=previous.version)
+
+    def _prune(self, older_than: int) -> None:
+        """
+        Removes snapshots of versions before `older_than`.
+
+        Readers of the previous version can still finish, and a concurrent writer's snapshot of the
+        same version is never removed from under its pointer.
+        """
+        for path in self.root.glob(f"{FX_SNAPSHOT_PREFIX}*{FX_SNAPSHOT_SUFFIX}"):
+            if int(path.name[len(FX_SNAPSHOT_PREFIX) :].split("-", 1)[0]) < older_than:
+                path.unlink(missing_ok=True)
+
+
+def _subtract_intervals(interval: DateInterval, covered: list[DateInterval]) -> list[DateInterval]:
+    gaps = []
+    cursor, end = interval
+    for covered_start, covered_end in sorted(covered):
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - timedelta(days=1)))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            return gaps
+    gaps.append((cursor, end))
+    return gaps
+
+
+def _merge_intervals(intervals: list[DateInterval]) -> list[DateInterval]:
+    merged: list[DateInterval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _dump_json(payload: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def _write_atomic(path: Path, write: Callable[[str], None]) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=path.suffix)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def load_exchange_rates(
+    start_date: date,
+    end_date: date,
+    currencies: Sequence[str] = ("USD", "GBP"),
+    raw_exchange_rates_path: str | Path | None = None,
+    repository_dir: str | Path = DEFAULT_FX_REPOSITORY_DIR,
+) -> pl.DataFrame:
+    """
+    Rates from the local repository, or from an explicitly supplied ECB CSV export.
+
+    The default CSV path (or no path) means "use the repository", which tops itself up from the ECB.
+    Any other path is treated as a fixed input and is only fetched when the file does not exist yet.
+    """
+    if raw_exchange_rates_path is None or Path(raw_exchange_rates_path) == Path(DEFAULT_RAW_EXCHANGE_RATES_PATH):
+        return FxRepository(Path(repository_dir)).get_rates(start_date, end_date, currencies)
+    return ExchangeRates(
+        start_date=start_date,
+        end_date=end_date,
+        currencies=currencies,
+        overwrite=False,
+        raw_file_path=str(raw_exchange_rates_path),
+    ).get_rates()
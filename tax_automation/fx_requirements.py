@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+
+import polars as pl
+
+from tax_automation.const import CurrencyCode
+
+
+@dataclass(frozen=True)
+class FxRequirements:
+    """
+    The first and last date each foreign currency needs an EUR rate for, collected from the inputs before any
+    of them is processed.
+
+    EUR and rows without a currency or date are ignored, so an all-EUR input yields no requirement at all.
+    """
+
+    bounds: dict[str, tuple[date, date]] = field(default_factory=dict)
+
+    @classmethod
+    def from_df(cls, df: pl.DataFrame, currency_col: str, date_col: str) -> FxRequirements:
+        if df.is_empty():
+            return cls()
+        bounds_df = (
+            df.select(pl.col(currency_col).cast(pl.String).alias("currency"), pl.col(date_col).alias("date"))
+            .drop_nulls()
+            .filter(pl.col("currency") != CurrencyCode.euro.value)
+            .group_by("currency")
+            .agg(pl.col("date").min().alias("first_date"), pl.col("date").max().alias("last_date"))
+        )
+        return cls(
+            {
+                currency: (first_date, last_date)
+                for currency, first_date, last_date in bounds_df.iter_rows()
+            }
+        )
+
+    @classmethod
+    def merge(cls, *requirements: FxRequirements) -> FxRequirements:
+        bounds: dict[str, tuple[date, date]] = {}
+        for requirement in requirements:
+            for currency, (first_date, last_date) in requirement.bounds.items():
+                if currency in bounds:
+                    first_date = min(first_date, bounds[currency][0])
+                    last_date = max(last_date, bounds[currency][1])
+                bounds[currency] = (first_date, last_date)
+        return cls(dict(sorted(bounds.items())))
+
+    @property
+    def currencies(self) -> tuple[str, ...]:
+        return tuple(sorted(self.bounds))
+
+    def span(self) -> tuple[date, date] | None:
+        """The smallest period covering every currency's bounds, or None without requirements."""
+        if not self.bounds:
+            return None
+        return min(first for first, _ in self.bounds.values()), max(last for _, last in self.bounds.values())
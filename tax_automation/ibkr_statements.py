@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Sequence, Union
+
+import polars as pl
+
+from tax_automation.utils import columns_to_df, iter_xml_section_elements, resolve_input_file_paths
+
+IBKR_TRADE_SECTION_TAGS = ("TradeConfirms", "Trades")
+IBKR_TRADE_ROW_TAGS = ("TradeConfirm", "Trade")
+IBKR_LOT_ROW_TAG = "Lot"
+
+ROW_TAG_COL = "row_tag"
+# Digest of every attribute of the XML row, taken before projection: the identity used by the cross-file dedupe.
+ROW_DIGEST_COL = "row_digest"
+SOURCE_FILE_COL = "source_statement_file"
+
+# Flex section name -> (section tags, row tags) read in the single pass over each file.
+IBKR_STATEMENT_SECTIONS: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "cash_transactions": (("CashTransactions",), ("CashTransaction",)),
+    "corporate_actions": (("CorporateActions",), ("CorporateAction",)),
+    "trades": (IBKR_TRADE_SECTION_TAGS, IBKR_TRADE_ROW_TAGS + (IBKR_LOT_ROW_TAG,)),
+    "dividend_accruals": (("ChangeInDividendAccruals",), ("ChangeInDividendAccrual",)),
+}
+
+# Attributes shared by every section.
+_IBKR_COMMON_COLUMNS = (
+    "accountId",
+    "actionID",
+    "transactionID",
+    "assetCategory",
+    "subCategory",
+    "symbol",
+    "isin",
+    "securityID",
+    "currency",
+    "description",
+    "dateTime",
+    "reportDate",
+    "levelOfDetail",
+)
+
+# Flex section name -> attributes read from its rows; every other attribute of a wide export is skipped.
+IBKR_STATEMENT_COLUMNS: dict[str, tuple[str, ...]] = {
+    "cash_transactions": _IBKR_COMMON_COLUMNS + ("type", "amount", "settleDate", "exDate", "issuerCountryCode"),
+    "corporate_actions": _IBKR_COMMON_COLUMNS
+    + ("type", "amount", "quantity", "proceeds", "fifoPnlRealized", "issuerCountryCode"),
+    "trades": _IBKR_COMMON_COLUMNS
+    + (
+        "tradeID",
+        "ibOrderID",
+        "tradeDate",
+        "buySell",
+        "quantity",
+        "tradePrice",
+        "price",
+        "amount",
+        "netCash",
+        "commission",
+        "accruedInt",
+    ),
+    "dividend_accruals": _IBKR_COMMON_COLUMNS
+    + ("date", "exDate", "payDate", "quantity", "tax", "grossRate", "grossAmount", "netAmount", "code"),
+}
+
+# Bump whenever the normalized per-file section frames change shape, so stale cache entries are ignored.
+PARSER_VERSION = 3
+DEFAULT_PARSE_CACHE_DIR = "data/cache/ibkr_statements"
+
+IbkrStatementSource = Union["IbkrStatementSet", str, Path, Sequence[str]]
+
+
+@dataclass(frozen=True, eq=False)
+class IbkrStatementSet:
+    """
+    IBKR Flex statements parsed once and shared by every consumer of the same files.
+
+    Each section frame holds the raw row attributes listed in `IBKR_STATEMENT_COLUMNS` as String
+    columns (null when a row lacks the attribute) plus `row_tag`, `row_digest` and `source_statement_file`.
+    Rows repeated across overlapping statements (same tag and all attributes, projected or not) are kept once,
+    from the first file (in resolved path order) that contained them.
+    """
+
+    file_paths: tuple[str, ...]
+    cash_transactions: pl.DataFrame
+    corporate_actions: pl.DataFrame
+    trades: pl.DataFrame
+    dividend_accruals: pl.DataFrame
+
+    @classmethod
+    def load(
+        cls,
+        file_path: Union[str, Path, Sequence[str]],
+        *,
+        cache_dir: str | Path | None = None,
+        max_workers: int | None = None,
+    ) -> IbkrStatementSet:
+        """
+        Loads every matched statement file, reading parsed sections from `cache_dir` when the file
+        content was parsed before. `cache_dir=None` always parses the XML.
+
+        With `max_workers` above 1, files are parsed in a process pool; each worker returns plain
+        section frames and the cross-file dedupe still happens here, in path order, so the result
+        is identical to the serial path.
+        """
+        if isinstance(file_path, Path):
+            file_path = str(file_path)
+        file_paths = resolve_input_file_paths(file_path, suffix=".xml")
+        if not file_paths:
+            raise FileNotFoundError(f"No files matched the pattern: {file_path}")
+
+        load_file = partial(_load_statement_file, cache_dir=Path(cache_dir) if cache_dir is not None else None)
+        if max_workers is not None and max_workers > 1 and len(file_paths) > 1:
+            # Polars is multi-threaded and not fork-safe, so workers are spawned fresh.
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(file_paths)), mp_context=get_context("spawn")
+            ) as executor:
+                loaded_files = list(executor.map(load_file, file_paths))
+        else:
+            loaded_files = [load_file(path) for path in file_paths]
+
+        frames_by_section: dict[str, list[pl.DataFrame]] = {name: [] for name in IBKR_STATEMENT_SECTIONS}
+        for path, file_sections in zip(file_paths, loaded_files):
+            for name, df in file_sections.items():
+                if not df.is_empty():
+                    frames_by_section[name].append(df.with_columns(pl.lit(path).alias(SOURCE_FILE_COL)))
+
+        sections = {name: _merge_section_frames(frames) for name, frames in frames_by_section.items()}
+        logging.debug(
+            "Loaded %d IBKR statement file(s): %s",
+            len(file_paths),
+            {name: df.height for name, df in sections.items()},
+        )
+        return cls(file_paths=tuple(file_paths), **sections)
+
+    @classmethod
+    def coerce(
+        cls,
+        source: IbkrStatementSource,
+        *,
+        cache_dir: str | Path | None = None,
+        max_workers: int | None = None,
+    ) -> IbkrStatementSet:
+        return source if isinstance(source, cls) else cls.load(source, cache_dir=cache_dir, max_workers=max_workers)
+
+    def trade_rows(self, row_tags: Sequence[str] = IBKR_TRADE_ROW_TAGS) -> pl.DataFrame:
+        if self.trades.is_empty():
+            return self.trades
+        return self.trades.filter(pl.col(ROW_TAG_COL).is_in(list(row_tags)))
+
+
+def _parse_statement_file(path: str) -> dict[str, pl.DataFrame]:
+    section_by_row_tag = {
+        row_tag: section_name for section_name, (_, row_tags) in IBKR_STATEMENT_SECTIONS.items() for row_tag in row_tags
+    }
+    section_tags = {tag for tags, _ in IBKR_STATEMENT_SECTIONS.values() for tag in tags}
+    builders_by_section: dict[str, dict[str, list[str | None]]] = {
+        name: {column: [] for column in IBKR_STATEMENT_COLUMNS[name] + (ROW_TAG_COL, ROW_DIGEST_COL)}
+        for name in IBKR_STATEMENT_SECTIONS
+    }
+    try:
+        for element in iter_xml_section_elements(path, section_tags, section_by_row_tag):
+            builders = builders_by_section[section_by_row_tag[element.tag]]
+            for column, values in builders.items():
+                if column == ROW_TAG_COL:
+                    values.append(element.tag)
+                elif column == ROW_DIGEST_COL:
+                    values.append(_row_digest(element.items()))
+                else:
+                    values.append(element.get(column))
+    except Exception as e:
+        raise ValueError(f"Failed to read XML file at {path}: {e}")
+
+    return {
+        name: columns_to_df(builders) if builders[ROW_TAG_COL] else pl.DataFrame()
+        for name, builders in builders_by_section.items()
+    }
+
+
+def _row_digest(attributes: list[tuple[str, str]]) -> str:
+    content = "\x1f".join(f"{name}={value}" for name, value in sorted(attributes))
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def _load_statement_file(path: str, cache_dir: Path | None) -> dict[str, pl.DataFrame]:
+    return _load_statement_file_cached(path, cache_dir) if cache_dir is not None else _parse_statement_file(path)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_statement_file_cached(path: str, cache_dir: Path) -> dict[str, pl.DataFrame]:
+    entry_dir = cache_dir / f"{file_digest(path)}.v{PARSER_VERSION}"
+    if entry_dir.is_dir():
+        logging.info("IBKR parse cache hit for %s", path)
+        section_paths = {name: entry_dir / f"{name}.parquet" for name in IBKR_STATEMENT_SECTIONS}
+        return {
+            name: pl.read_parquet(section_path) if section_path.exists() else pl.DataFrame()
+            for name, section_path in section_paths.items()
+        }
+
+    logging.info("IBKR parse cache miss for %s", path)
+    sections = _parse_statement_file(path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write into a scratch directory and rename it into place so readers never see a partial entry.
+    tmp_dir = Path(tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-"))
+    try:
+        for name, df in sections.items():
+            if not df.is_empty():
+                df.write_parquet(tmp_dir / f"{name}.parquet")
+        os.replace(tmp_dir, entry_dir)
+    except OSError as error:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Another run publishing the same entry first is fine, its content is identical; any other failure
+        # (disk full, permissions) leaves the cache unusable and must not pass silently.
+        if not entry_dir.is_dir():
+            logging.warning("Could not write IBKR parse cache for %s: %s", path, error)
+    return sections
+
+
+def _merge_section_frames(frames: list[pl.DataFrame]) -> pl.DataFrame:
+    if not frames:
+        return pl.DataFrame()
+    df = pl.concat(frames, how="diagonal")
+    return df.unique(subset=[ROW_TAG_COL, ROW_DIGEST_COL], keep="first", maintain_order=True)
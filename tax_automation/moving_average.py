@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from decimal import Decimal
+from decimal import Decimal, localcontext
 from datetime import date, datetime
+from functools import partial
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable, Iterator
 
 import polars as pl
 
 from tax_automation.broker_history import round_money, round_qty
-from tax_automation.precision import to_decimal, to_output_float
+from tax_automation.position_journal import PositionEventJournal
+from tax_automation.precision import REPLAY_DECIMAL_CONTEXT, to_decimal, to_output_float
 
 EVENT_TYPE_AUSTRIAN_BASIS_RESET = "austrian_basis_reset"
 EVENT_TYPE_BUY = "buy"
@@ -19,8 +24,60 @@ EVENT_TYPE_SPLIT = "split"
 EVENT_TYPE_REVERSE_SPLIT = "reverse_split"
 EVENT_TYPE_MANUAL_CORRECTION = "manual_correction"
 
-
-@dataclass
+POSITION_EVENT_SCHEMA = {
+    "broker": pl.String,
+    "ticker": pl.String,
+    "isin": pl.String,
+    "currency": pl.String,
+    "asset_class": pl.String,
+    "event_type": pl.String,
+    "event_date": pl.String,
+    "effective_date": pl.String,
+    "eligibility_date": pl.String,
+    "source_id": pl.String,
+    "source_file": pl.String,
+    "sequence_key": pl.Int64,
+    "quantity": pl.Float64,
+    "quantity_delta": pl.Float64,
+    "price_ccy": pl.Float64,
+    "fx_to_eur": pl.Float64,
+    "proceeds_eur": pl.Float64,
+    "base_cost_delta_eur": pl.Float64,
+    "basis_adjustment_delta_eur": pl.Float64,
+    "realized_basis_eur": pl.Float64,
+    "realized_gain_loss_eur": pl.Float64,
+    "realized_base_cost_eur": pl.Float64,
+    "realized_oekb_adjustment_eur": pl.Float64,
+    "split_ratio": pl.Float64,
+    "quantity_after": pl.Float64,
+    "base_cost_total_eur_after": pl.Float64,
+    "basis_adjustment_total_eur_after": pl.Float64,
+    "total_basis_eur_after": pl.Float64,
+    "average_basis_eur_after": pl.Float64,
+    "notes": pl.String,
+}
+POSITION_EVENT_SORT_COLUMNS = ["isin", "effective_date", "sequence_key", "event_type"]
+RECORD_BATCH_ROWS = 16384
+POSITION_SALE_SCHEMA = {
+    "sale_date": pl.String,
+    "ticker": pl.String,
+    "isin": pl.String,
+    "quantity_sold": pl.Float64,
+    "sale_price_ccy": pl.Float64,
+    "sale_fx": pl.Float64,
+    "taxable_proceeds_eur": pl.Float64,
+    "realized_base_cost_eur": pl.Float64,
+    "taxable_original_basis_eur": pl.Float64,
+    "realized_oekb_adjustment_eur": pl.Float64,
+    "taxable_stepup_basis_eur": pl.Float64,
+    "taxable_total_basis_eur": pl.Float64,
+    "taxable_gain_loss_eur": pl.Float64,
+    "notes": pl.String,
+    "sale_trade_id": pl.String,
+}
+
+
+@dataclass(slots=True)
 class PositionState:
     broker: str
     ticker: str
@@ -70,7 +127,7 @@ class PositionState:
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PositionEvent:
     event_type: str
     broker: str
@@ -100,10 +157,90 @@ class PositionEvent:
     sequence_key: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
+class RealizedAmounts:
+    """What a sale realized; the sell event itself only carries its quantity and proceeds."""
+
+    base_cost_eur: Decimal = Decimal("0")
+    oekb_adjustment_eur: Decimal = Decimal("0")
+    basis_eur: Decimal = Decimal("0")
+    gain_loss_eur: Decimal = Decimal("0")
+
+
+@dataclass(slots=True)
 class EventApplicationResult:
     event_record: dict[str, object]
     sale_record: dict[str, object] | None = None
+    realized: RealizedAmounts | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class Holding:
+    quantity: Decimal = Decimal("0")
+    base_cost_total_eur: Decimal = Decimal("0")
+    basis_adjustment_total_eur: Decimal = Decimal("0")
+
+    @property
+    def total_basis_eur(self) -> Decimal:
+        return round_money(self.base_cost_total_eur + self.basis_adjustment_total_eur)
+
+
+NO_HOLDING = Holding()
+
+
+class HoldingsIndex:
+    """
+    Quantity and basis of each position after every applied event, for point-in-time holdings lookups.
+
+    Entries are recorded in application order together with the date they count from; `holdings_as_of`
+    binary-searches the last entry dated on or before a date, so "what was held on D" needs no replay.
+    States seeded with `from_states` count as held from the date they describe, and nothing is held before it.
+    """
+
+    def __init__(self) -> None:
+        self._dates: dict[str, list[date]] = {}
+        self._holdings: dict[str, list[Holding]] = {}
+        self._keys_by_isin: dict[str, list[str]] = {}
+
+    @classmethod
+    def from_states(cls, states: Iterable[PositionState], as_of: date) -> HoldingsIndex:
+        index = cls()
+        for state in states:
+            index.record(as_of, state)
+        return index
+
+    def record(self, as_of: date, state: PositionState) -> None:
+        key = position_key(broker=state.broker, isin=state.isin)
+        dates = self._dates.get(key)
+        if dates is None:
+            dates = self._dates[key] = []
+            self._holdings[key] = []
+            self._keys_by_isin.setdefault(state.isin, []).append(key)
+        elif as_of < dates[-1]:
+            raise ValueError(
+                f"Holdings of {state.ticker} ({state.isin}) recorded out of order: {as_of} after {dates[-1]}"
+            )
+        dates.append(as_of)
+        self._holdings[key].append(Holding(state.quantity, state.base_cost_total_eur, state.basis_adjustment_total_eur))
+
+    def holdings_as_of(self, isin: str, as_of: date, *, broker: str | None = None) -> Holding:
+        """Holding after every recorded event dated on or before `as_of`, summed over brokers unless one is given."""
+        keys = self._keys_by_isin.get(isin, []) if broker is None else [position_key(broker=broker, isin=isin)]
+        found = [self._holding_as_of(key, as_of) for key in keys]
+        if len(found) == 1:
+            return found[0]
+        return Holding(
+            round_qty(sum((holding.quantity for holding in found), Decimal("0"))),
+            round_money(sum((holding.base_cost_total_eur for holding in found), Decimal("0"))),
+            round_money(sum((holding.basis_adjustment_total_eur for holding in found), Decimal("0"))),
+        )
+
+    def _holding_as_of(self, key: str, as_of: date) -> Holding:
+        dates = self._dates.get(key)
+        if not dates:
+            return NO_HOLDING
+        position = bisect_right(dates, as_of)
+        return self._holdings[key][position - 1] if position else NO_HOLDING
 
 
 def position_key(*, broker: str, isin: str) -> str:
@@ -408,42 +545,7 @@ def position_states_to_df(states: Iterable[PositionState]) -> pl.DataFrame:
 
 
 def position_events_to_df(rows: list[dict[str, object]]) -> pl.DataFrame:
-    if not rows:
-        return pl.DataFrame(
-            schema={
-                "broker": pl.String,
-                "ticker": pl.String,
-                "isin": pl.String,
-                "currency": pl.String,
-                "asset_class": pl.String,
-                "event_type": pl.String,
-                "event_date": pl.String,
-                "effective_date": pl.String,
-                "eligibility_date": pl.String,
-                "source_id": pl.String,
-                "source_file": pl.String,
-                "sequence_key": pl.Int64,
-                "quantity": pl.Float64,
-                "quantity_delta": pl.Float64,
-                "price_ccy": pl.Float64,
-                "fx_to_eur": pl.Float64,
-                "proceeds_eur": pl.Float64,
-                "base_cost_delta_eur": pl.Float64,
-                "basis_adjustment_delta_eur": pl.Float64,
-                "realized_basis_eur": pl.Float64,
-                "realized_gain_loss_eur": pl.Float64,
-                "realized_base_cost_eur": pl.Float64,
-                "realized_oekb_adjustment_eur": pl.Float64,
-                "split_ratio": pl.Float64,
-                "quantity_after": pl.Float64,
-                "base_cost_total_eur_after": pl.Float64,
-                "basis_adjustment_total_eur_after": pl.Float64,
-                "total_basis_eur_after": pl.Float64,
-                "average_basis_eur_after": pl.Float64,
-                "notes": pl.String,
-            }
-        )
-    return pl.DataFrame(rows).sort(["isin", "effective_date", "sequence_key", "event_type"])
+    return pl.DataFrame(rows, schema=POSITION_EVENT_SCHEMA).sort(POSITION_EVENT_SORT_COLUMNS)
 
 
 def clone_states(states: Iterable[PositionState]) -> dict[str, PositionState]:
@@ -497,8 +599,22 @@ def _ensure_state_for_event(states: dict[str, PositionState], event: PositionEve
 
 
 def apply_event(states: dict[str, PositionState], event: PositionEvent) -> EventApplicationResult:
+    state, realized = apply_event_to_state(states, event)
+    return EventApplicationResult(
+        event_record=dict(zip(POSITION_EVENT_SCHEMA, _event_record_values(event, state, realized))),
+        sale_record=(
+            None if realized is None else dict(zip(POSITION_SALE_SCHEMA, _sale_record_values(event, realized)))
+        ),
+        realized=realized,
+    )
+
+
+def apply_event_to_state(
+    states: dict[str, PositionState], event: PositionEvent
+) -> tuple[PositionState, RealizedAmounts | None]:
+    """`apply_event` without building the event and sale rows; returns the updated state and any sale result."""
     state = _ensure_state_for_event(states, event)
-    sale_record: dict[str, object] | None = None
+    realized: RealizedAmounts | None = None
 
     if event.event_type == EVENT_TYPE_AUSTRIAN_BASIS_RESET:
         if state.quantity != 0 or state.total_basis_eur != 0:
@@ -517,8 +633,9 @@ def apply_event(states: dict[str, PositionState], event: PositionEvent) -> Event
         quantity_before = state.quantity
         if quantity_before <= 0 or quantity_before < event.quantity:
             raise ValueError(f"Sell of {event.ticker} on {event.event_date} exceeds available quantity")
-        realized_base = round_money(state.base_cost_total_eur * (event.quantity / quantity_before))
-        realized_adjustment = round_money(state.basis_adjustment_total_eur * (event.quantity / quantity_before))
+        ratio = event.quantity / quantity_before
+        realized_base = round_money(state.base_cost_total_eur * ratio)
+        realized_adjustment = round_money(state.basis_adjustment_total_eur * ratio)
         realized_basis = round_money(realized_base + realized_adjustment)
         state.quantity = round_qty(state.quantity - event.quantity)
         state.base_cost_total_eur = round_money(state.base_cost_total_eur - realized_base)
@@ -526,32 +643,11 @@ def apply_event(states: dict[str, PositionState], event: PositionEvent) -> Event
         if state.quantity == 0:
             state.base_cost_total_eur = Decimal("0")
             state.basis_adjustment_total_eur = Decimal("0")
-
-        sale_record = {
-            "sale_date": event.event_date.isoformat(),
-            "ticker": event.ticker,
-            "isin": event.isin,
-            "quantity_sold": to_output_float(round_qty(event.quantity)),
-            "sale_price_ccy": to_output_float(round_money(event.price_ccy or 0)),
-            "sale_fx": to_output_float(round_money(event.fx_to_eur or 0)),
-            "taxable_proceeds_eur": to_output_float(round_money(event.proceeds_eur)),
-            "realized_base_cost_eur": to_output_float(realized_base),
-            "taxable_original_basis_eur": to_output_float(realized_base),
-            "realized_oekb_adjustment_eur": to_output_float(realized_adjustment),
-            "taxable_stepup_basis_eur": to_output_float(realized_adjustment),
-            "taxable_total_basis_eur": to_output_float(realized_basis),
-            "taxable_gain_loss_eur": to_output_float(round_money(event.proceeds_eur - realized_basis)),
-            "notes": event.notes,
-            "sale_trade_id": event.source_id,
-        }
-        event = PositionEvent(
-            **{**event.__dict__,
-               "base_cost_delta_eur": round_money(-realized_base),
-               "basis_adjustment_delta_eur": round_money(-realized_adjustment),
-               "realized_basis_eur": realized_basis,
-               "realized_gain_loss_eur": round_money(event.proceeds_eur - realized_basis),
-               "realized_base_cost_eur": realized_base,
-               "realized_oekb_adjustment_eur": realized_adjustment}
+        realized = RealizedAmounts(
+            base_cost_eur=realized_base,
+            oekb_adjustment_eur=realized_adjustment,
+            basis_eur=realized_basis,
+            gain_loss_eur=round_money(event.proceeds_eur - realized_basis),
         )
     elif event.event_type == EVENT_TYPE_OEKB_BASIS_ADJUSTMENT:
         state.basis_adjustment_total_eur = round_money(
@@ -574,53 +670,334 @@ def apply_event(states: dict[str, PositionState], event: PositionEvent) -> Event
     state.asset_class = state.asset_class or event.asset_class
     state.source_file = state.source_file or event.source_file
     add_state_note(state, event.notes)
+    return state, realized
+
+
+def _event_record_values(event: PositionEvent, state: PositionState, realized: RealizedAmounts | None) -> tuple:
+    """One event row in `POSITION_EVENT_SCHEMA` column order."""
+    if realized is None:
+        base_cost_delta_eur = event.base_cost_delta_eur
+        basis_adjustment_delta_eur = event.basis_adjustment_delta_eur
+        realized_basis_eur = event.realized_basis_eur
+        realized_gain_loss_eur = event.realized_gain_loss_eur
+        realized_base_cost_eur = event.realized_base_cost_eur
+        realized_oekb_adjustment_eur = event.realized_oekb_adjustment_eur
+    else:
+        base_cost_delta_eur = -realized.base_cost_eur
+        basis_adjustment_delta_eur = -realized.oekb_adjustment_eur
+        realized_basis_eur = realized.basis_eur
+        realized_gain_loss_eur = realized.gain_loss_eur
+        realized_base_cost_eur = realized.base_cost_eur
+        realized_oekb_adjustment_eur = realized.oekb_adjustment_eur
+    return (
+        event.broker,
+        event.ticker,
+        event.isin,
+        event.currency,
+        event.asset_class,
+        event.event_type,
+        event.event_date.isoformat(),
+        event.effective_date.isoformat(),
+        event.eligibility_date.isoformat() if event.eligibility_date else "",
+        event.source_id,
+        event.source_file,
+        event.sequence_key,
+        to_output_float(round_qty(event.quantity)),
+        to_output_float(round_qty(event.quantity_delta)),
+        to_output_float(round_money(event.price_ccy or 0)) if event.price_ccy is not None else None,
+        to_output_float(round_money(event.fx_to_eur or 0)) if event.fx_to_eur is not None else None,
+        to_output_float(round_money(event.proceeds_eur)),
+        to_output_float(round_money(base_cost_delta_eur)),
+        to_output_float(round_money(basis_adjustment_delta_eur)),
+        to_output_float(round_money(realized_basis_eur)),
+        to_output_float(round_money(realized_gain_loss_eur)),
+        to_output_float(round_money(realized_base_cost_eur)),
+        to_output_float(round_money(realized_oekb_adjustment_eur)),
+        to_output_float(event.split_ratio) if event.split_ratio is not None else None,
+        to_output_float(round_qty(state.quantity)),
+        to_output_float(round_money(state.base_cost_total_eur)),
+        to_output_float(round_money(state.basis_adjustment_total_eur)),
+        to_output_float(state.total_basis_eur),
+        to_output_float(state.average_basis_eur),
+        event.notes,
+    )
+
+
+def _sale_record_values(event: PositionEvent, realized: RealizedAmounts) -> tuple:
+    """One sale row in `POSITION_SALE_SCHEMA` column order."""
+    return (
+        event.event_date.isoformat(),
+        event.ticker,
+        event.isin,
+        to_output_float(round_qty(event.quantity)),
+        to_output_float(round_money(event.price_ccy or 0)),
+        to_output_float(round_money(event.fx_to_eur or 0)),
+        to_output_float(round_money(event.proceeds_eur)),
+        to_output_float(realized.base_cost_eur),
+        to_output_float(realized.base_cost_eur),
+        to_output_float(realized.oekb_adjustment_eur),
+        to_output_float(realized.oekb_adjustment_eur),
+        to_output_float(realized.basis_eur),
+        to_output_float(realized.gain_loss_eur),
+        event.notes,
+        event.source_id,
+    )
+
+
+class PositionRecordSink:
+    """
+    Event and sale rows of a replay, collected as typed Polars chunks instead of one dict per row.
+
+    Rows are buffered as plain tuples and every `RECORD_BATCH_ROWS` rows become one chunk with the fixed
+    schema, so no schema is inferred and memory holds Arrow buffers rather than Python objects. The frames
+    returned at the end stitch the chunks together without copying them. With `capture_events=False` only
+    sales are kept, for callers that do not need the event audit log.
+    """
+
+    def __init__(self, *, capture_events: bool = True):
+        self.capture_events = capture_events
+        self._event_rows: list[tuple] = []
+        self._sale_rows: list[tuple] = []
+        self._event_chunks: list[pl.DataFrame] = []
+        self._sale_chunks: list[pl.DataFrame] = []
+
+    def add(self, event: PositionEvent, state: PositionState, realized: RealizedAmounts | None) -> None:
+        if self.capture_events:
+            self._event_rows.append(_event_record_values(event, state, realized))
+            if len(self._event_rows) >= RECORD_BATCH_ROWS:
+                self._event_chunks.append(_rows_to_chunk(self._event_rows, POSITION_EVENT_SCHEMA))
+                self._event_rows = []
+        if realized is not None:
+            self._sale_rows.append(_sale_record_values(event, realized))
+            if len(self._sale_rows) >= RECORD_BATCH_ROWS:
+                self._sale_chunks.append(_rows_to_chunk(self._sale_rows, POSITION_SALE_SCHEMA))
+                self._sale_rows = []
+
+    def events_df(self) -> pl.DataFrame:
+        """Captured event rows, sorted like `position_events_to_df`."""
+        chunks = [*self._event_chunks, _rows_to_chunk(self._event_rows, POSITION_EVENT_SCHEMA)]
+        return pl.concat(chunks, rechunk=False).sort(POSITION_EVENT_SORT_COLUMNS)
+
+    def sales_df(self) -> pl.DataFrame:
+        """Sale rows in application order."""
+        return pl.concat([*self._sale_chunks, _rows_to_chunk(self._sale_rows, POSITION_SALE_SCHEMA)], rechunk=False)
+
+
+def _rows_to_chunk(rows: list[tuple], schema: dict[str, pl.DataType]) -> pl.DataFrame:
+    return pl.DataFrame(rows, schema=schema, orient="row")
+
+
+class ReplayEngine:
+    """
+    Arithmetic behind `replay_events` and `replay_states`: this engine applies events to `PositionState`s with
+    `apply_event`. `fixed_point_replay.FixedPointEngine` implements the same methods on scaled integers.
+    """
+
+    def clone_states(self, states: Iterable[PositionState]) -> dict[str, Any]:
+        return clone_states(states)
+
+    def apply_event(self, states: dict[str, Any], event: Any) -> EventApplicationResult:
+        return apply_event(states, event)
+
+    def apply_event_to_state(self, states: dict[str, Any], event: Any) -> None:
+        apply_event_to_state(states, event)
+
+    def to_position_state(self, state: Any) -> PositionState:
+        return state
+
+    def final_states(self, states: dict[str, Any]) -> list[PositionState]:
+        return _sorted_states(self.to_position_state(state) for state in states.values())
 
-    event_record = {
-        "broker": event.broker,
-        "ticker": event.ticker,
-        "isin": event.isin,
-        "currency": event.currency,
-        "asset_class": event.asset_class,
-        "event_type": event.event_type,
-        "event_date": event.event_date.isoformat(),
-        "effective_date": event.effective_date.isoformat(),
-        "eligibility_date": event.eligibility_date.isoformat() if event.eligibility_date else "",
-        "source_id": event.source_id,
-        "source_file": event.source_file,
-        "sequence_key": event.sequence_key,
-        "quantity": to_output_float(round_qty(event.quantity)),
-        "quantity_delta": to_output_float(round_qty(event.quantity_delta)),
-        "price_ccy": to_output_float(round_money(event.price_ccy or 0)) if event.price_ccy is not None else None,
-        "fx_to_eur": to_output_float(round_money(event.fx_to_eur or 0)) if event.fx_to_eur is not None else None,
-        "proceeds_eur": to_output_float(round_money(event.proceeds_eur)),
-        "base_cost_delta_eur": to_output_float(round_money(event.base_cost_delta_eur)),
-        "basis_adjustment_delta_eur": to_output_float(round_money(event.basis_adjustment_delta_eur)),
-        "realized_basis_eur": to_output_float(round_money(event.realized_basis_eur)),
-        "realized_gain_loss_eur": to_output_float(round_money(event.realized_gain_loss_eur)),
-        "realized_base_cost_eur": to_output_float(round_money(event.realized_base_cost_eur)),
-        "realized_oekb_adjustment_eur": to_output_float(round_money(event.realized_oekb_adjustment_eur)),
-        "split_ratio": to_output_float(event.split_ratio) if event.split_ratio is not None else None,
-        "quantity_after": to_output_float(round_qty(state.quantity)),
-        "base_cost_total_eur_after": to_output_float(round_money(state.base_cost_total_eur)),
-        "basis_adjustment_total_eur_after": to_output_float(round_money(state.basis_adjustment_total_eur)),
-        "total_basis_eur_after": to_output_float(state.total_basis_eur),
-        "average_basis_eur_after": to_output_float(state.average_basis_eur),
-        "notes": event.notes,
-    }
-    return EventApplicationResult(event_record=event_record, sale_record=sale_record)
+
+DECIMAL_ENGINE = ReplayEngine()
+
+
+def check_application_order(events: Iterable[PositionEvent]) -> Iterator[PositionEvent]:
+    last_order_by_position: dict[str, tuple[date, int]] = {}
+    for event in events:
+        key = position_key(broker=event.broker, isin=event.isin)
+        order = (event.effective_date, event.sequence_key)
+        previous = last_order_by_position.get(key)
+        if previous is not None and order < previous:
+            raise ValueError(
+                f"Presorted events for {event.ticker} ({event.isin}) are out of order: "
+                f"{order[0]} #{order[1]} after {previous[0]} #{previous[1]}"
+            )
+        last_order_by_position[key] = order
+        yield event
 
 
 def replay_events(
     opening_states: Iterable[PositionState],
     events: Iterable[PositionEvent],
+    *,
+    presorted: bool = False,
+    max_workers: int | None = None,
+    holdings_index: HoldingsIndex | None = None,
+    journal: PositionEventJournal | None = None,
+    engine: ReplayEngine = DECIMAL_ENGINE,
 ) -> tuple[list[PositionState], list[dict[str, object]], list[dict[str, object]]]:
-    states = clone_states(opening_states)
+    """
+    Applies `events` on top of `opening_states`.
+
+    With `presorted=True` the events must already be in application order per position (effective date,
+    then sequence key), e.g. built from chronologically sorted trades. They are consumed lazily instead
+    of being collected and sorted, so a generator can be passed straight in.
+
+    With `max_workers` above 1, events are partitioned by position and the shards are replayed in a process
+    pool. Positions never interact, so the states are the same as a serial replay; event and sale rows come
+    back in the same order as a serial replay (input order when presorted, else `sort_position_events` order).
+
+    With `holdings_index`, the state after each event is recorded there under the event's effective date;
+    this needs a serial replay. With `journal`, the event rows are appended to it once the replay is done.
+
+    `engine` does the arithmetic; every engine gives the same result. The replay always runs under
+    `REPLAY_DECIMAL_CONTEXT`, whatever the caller's Decimal context.
+    """
+    if max_workers is not None and max_workers > 1:
+        if holdings_index is not None:
+            raise ValueError("holdings_index requires a serial replay")
+        replayed = _replay_sharded(
+            opening_states, events, presorted=presorted, max_workers=max_workers, keep_rows=True, engine=engine
+        )
+        if journal is not None:
+            journal.append(position_events_to_df(replayed[1]))
+        return replayed
     event_rows: list[dict[str, object]] = []
     sale_rows: list[dict[str, object]] = []
-    for event in sort_position_events(events):
-        result = apply_event(states, event)
-        event_rows.append(result.event_record)
-        if result.sale_record is not None:
-            sale_rows.append(result.sale_record)
-    final_states = sorted(states.values(), key=lambda item: (item.asset_class, item.ticker, item.isin))
+    with localcontext(REPLAY_DECIMAL_CONTEXT):
+        states = engine.clone_states(opening_states)
+        for event in check_application_order(events) if presorted else sort_position_events(events):
+            result = engine.apply_event(states, event)
+            if holdings_index is not None:
+                state = states[position_key(broker=event.broker, isin=event.isin)]
+                holdings_index.record(event.effective_date, engine.to_position_state(state))
+            event_rows.append(result.event_record)
+            if result.sale_record is not None:
+                sale_rows.append(result.sale_record)
+        final_states = engine.final_states(states)
+    if journal is not None:
+        journal.append(position_events_to_df(event_rows))
     return final_states, event_rows, sale_rows
+
+
+def replay_states(
+    opening_states: Iterable[PositionState],
+    events: Iterable[PositionEvent],
+    *,
+    max_workers: int | None = None,
+    engine: ReplayEngine = DECIMAL_ENGINE,
+) -> list[PositionState]:
+    """Final states after applying presorted `events` one at a time; no per-event output is retained."""
+    if max_workers is not None and max_workers > 1:
+        return _replay_sharded(
+            opening_states, events, presorted=True, max_workers=max_workers, keep_rows=False, engine=engine
+        )[0]
+    with localcontext(REPLAY_DECIMAL_CONTEXT):
+        states = engine.clone_states(opening_states)
+        for event in check_application_order(events):
+            engine.apply_event_to_state(states, event)
+        return engine.final_states(states)
+
+
+def replay_into(
+    opening_states: Iterable[PositionState],
+    events: Iterable[PositionEvent],
+    sink: PositionRecordSink,
+    *,
+    presorted: bool = False,
+    holdings_index: HoldingsIndex | None = None,
+    journal: PositionEventJournal | None = None,
+) -> list[PositionState]:
+    """`replay_events` writing its event and sale rows into `sink`; returns the final states."""
+    if journal is not None and not sink.capture_events:
+        raise ValueError("Journaling position events requires a sink that captures events")
+    with localcontext(REPLAY_DECIMAL_CONTEXT):
+        states = clone_states(opening_states)
+        for event in check_application_order(events) if presorted else sort_position_events(events):
+            state, realized = apply_event_to_state(states, event)
+            sink.add(event, state, realized)
+            if holdings_index is not None:
+                holdings_index.record(event.effective_date, state)
+    if journal is not None:
+        journal.append(sink.events_df())
+    return _sorted_states(states.values())
+
+
+def _sorted_states(states: Iterable[PositionState]) -> list[PositionState]:
+    return sorted(states, key=lambda item: (item.asset_class, item.ticker, item.isin))
+
+
+def _event_sort_key(event: PositionEvent) -> tuple:
+    return (event.broker, event.isin, event.effective_date, event.sequence_key, event.event_type, event.source_id)
+
+
+def _replay_shard(
+    shard: tuple[list[PositionState], list[PositionEvent], list[int]],
+    *,
+    presorted: bool,
+    keep_rows: bool,
+    engine: ReplayEngine,
+) -> tuple[list[PositionState], list[tuple[object, dict[str, object], dict[str, object] | None]]]:
+    opening_states, events, input_indexes = shard
+    # Rows are merged across shards by input position when presorted, matching the serial replay.
+    if presorted:
+        ordered = zip(input_indexes, check_application_order(events))
+    else:
+        ordered = ((_event_sort_key(event), event) for event in sort_position_events(events))
+    rows = []
+    with localcontext(REPLAY_DECIMAL_CONTEXT):
+        states = engine.clone_states(opening_states)
+        for row_order, event in ordered:
+            if not keep_rows:
+                engine.apply_event_to_state(states, event)
+                continue
+            result = engine.apply_event(states, event)
+            rows.append((row_order, result.event_record, result.sale_record))
+        return [engine.to_position_state(state) for state in states.values()], rows
+
+
+def _replay_sharded(
+    opening_states: Iterable[PositionState],
+    events: Iterable[PositionEvent],
+    *,
+    presorted: bool,
+    max_workers: int,
+    keep_rows: bool,
+    engine: ReplayEngine,
+) -> tuple[list[PositionState], list[dict[str, object]], list[dict[str, object]]]:
+    states_by_key = clone_states(opening_states)
+    events_by_key: dict[str, list[PositionEvent]] = {}
+    input_indexes_by_key: dict[str, list[int]] = {}
+    for input_index, event in enumerate(events):
+        key = position_key(broker=event.broker, isin=event.isin)
+        events_by_key.setdefault(key, []).append(event)
+        input_indexes_by_key.setdefault(key, []).append(input_index)
+
+    shard_keys = sorted(events_by_key)
+    shards = [
+        ([states_by_key[key]] if key in states_by_key else [], events_by_key[key], input_indexes_by_key[key])
+        for key in shard_keys
+    ]
+    # Polars is multi-threaded and not fork-safe, so workers are spawned fresh.
+    with ProcessPoolExecutor(
+        max_workers=min(max_workers, max(len(shards), 1)), mp_context=get_context("spawn")
+    ) as executor:
+        results = list(
+            executor.map(
+                partial(_replay_shard, presorted=presorted, keep_rows=keep_rows, engine=engine),
+                shards,
+                chunksize=max(1, len(shards) // (max_workers * 4)),
+            )
+        )
+
+    rows = []
+    for key, (shard_states, shard_rows) in zip(shard_keys, results):
+        states_by_key.pop(key, None)
+        for state in shard_states:
+            states_by_key[position_key(broker=state.broker, isin=state.isin)] = state
+        rows.extend(shard_rows)
+    rows.sort(key=lambda row: row[0])
+    event_rows = [event_record for _, event_record, _ in rows]
+    sale_rows = [sale_record for _, _, sale_record in rows if sale_record is not None]
+    return _sorted_states(states_by_key.values()), event_rows, sale_rows
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date
+from functools import cached_property
+from pathlib import Path
+from typing import Iterable
+
+import polars as pl
+
+from tax_automation.broker_history import TradeTable
+from tax_automation.moving_average import PositionState, state_from_record
+
+# Bump whenever replay semantics change, so checkpoints written by older code are ignored.
+CHECKPOINT_VERSION = 2
+DEFAULT_POSITION_CHECKPOINT_DIR = "data/cache/position_checkpoints"
+CHECKPOINT_SUFFIX = ".csv"
+
+_STATE_FIELDS = tuple(field.name for field in dataclasses.fields(PositionState))
+
+
+@dataclass(frozen=True)
+class PositionCheckpoint:
+    """Moving-average states after every trade dated before `as_of` was replayed."""
+
+    as_of: date
+    states: list[PositionState]
+
+
+@dataclass(frozen=True, eq=False)
+class ReplayPrefix:
+    """
+    What checkpointed states are replayed from: the opening states, the replay lower bound, and the trades
+    dated on or after it (in chronological `TradeTable` order) with the EUR rate each one is converted at.
+
+    `fx_rates` is aligned with the rows of `trades`. Each trade and its rate are serialized once; keys for
+    any number of checkpoint dates are then taken from one running digest over the rows in date order.
+    """
+
+    opening_states: tuple[PositionState, ...]
+    lower_bound: date | None
+    trades: TradeTable
+    fx_rates: pl.Series
+
+    def checkpoint_keys(self, as_of_dates: Iterable[date]) -> dict[date, str]:
+        """Key per date, hashing the opening states and every trade (with its rate) dated in `[lower_bound, as_of)`."""
+        running = hashlib.sha256()
+        running.update(f"v{CHECKPOINT_VERSION}|{self.lower_bound}\n".encode())
+        running.update(_states_to_df(self.opening_states).write_csv().encode())
+        trade_dates, trade_rows = self._trade_rows
+        keys: dict[date, str] = {}
+        position = 0
+        for as_of in sorted(set(as_of_dates)):
+            while position < len(trade_dates) and trade_dates[position] < as_of:
+                running.update(trade_rows[position])
+                position += 1
+            digest = running.copy()
+            digest.update(f"|{as_of}".encode())
+            keys[as_of] = digest.hexdigest()
+        return keys
+
+    @cached_property
+    def _trade_rows(self) -> tuple[list[date], list[bytes]]:
+        if len(self.fx_rates) != len(self.trades):
+            raise ValueError("Replay prefix needs one FX rate per trade")
+        df = self.trades.df.with_columns(self.fx_rates.alias("fx_to_eur"))
+        lines = df.select(
+            pl.concat_str([pl.col(column).cast(pl.String).fill_null("") for column in df.columns], separator="\x1f")
+        ).to_series()
+        return df["trade_date"].to_list(), [f"{line}\n".encode() for line in lines]
+
+
+@dataclass(frozen=True, eq=False)
+class PositionCheckpointStore:
+    """
+    `PositionState` snapshots keyed by what they were replayed from.
+
+    A checkpoint key hashes a `ReplayPrefix` up to the checkpoint date, so a checkpoint is only found again
+    while the opening state, all earlier trades and the FX rates they were converted at are unchanged: a
+    corrected or added statement row, or a revised rate, before `as_of` changes the key and the stale
+    checkpoint is simply never looked up. Files are written atomically; states are stored with exact decimals.
+    """
+
+    root: Path
+
+    def checkpoint_key(self, prefix: ReplayPrefix, as_of: date) -> str:
+        return prefix.checkpoint_keys([as_of])[as_of]
+
+    def path_for(self, as_of: date, key: str) -> Path:
+        return self.root / f"{as_of.isoformat()}_{key}{CHECKPOINT_SUFFIX}"
+
+    def save(self, prefix: ReplayPrefix, checkpoint: PositionCheckpoint) -> Path:
+        key = self.checkpoint_key(prefix, checkpoint.as_of)
+        path = self.path_for(checkpoint.as_of, key)
+        if path.exists():
+            return path
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-", suffix=CHECKPOINT_SUFFIX)
+        os.close(fd)
+        try:
+            _states_to_df(checkpoint.states).write_csv(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        logging.info("Saved position checkpoint as of %s to %s", checkpoint.as_of, path)
+        return path
+
+    def latest(self, prefix: ReplayPrefix, *, not_after: date) -> PositionCheckpoint | None:
+        """The most recent valid checkpoint dated on or before `not_after` (and after the lower bound), if any."""
+        if not self.root.is_dir():
+            return None
+        lower_bound = prefix.lower_bound
+        candidate_dates = set()
+        for path in self.root.glob(f"*{CHECKPOINT_SUFFIX}"):
+            as_of_text, _, _ = path.name.partition("_")
+            try:
+                as_of = date.fromisoformat(as_of_text)
+            except ValueError:
+                continue
+            if as_of <= not_after and (lower_bound is None or as_of > lower_bound):
+                candidate_dates.add(as_of)
+
+        keys = prefix.checkpoint_keys(candidate_dates)
+        for as_of in sorted(candidate_dates, reverse=True):
+            path = self.path_for(as_of, keys[as_of])
+            if path.exists():
+                logging.info("Loaded position checkpoint as of %s from %s", as_of, path)
+                return PositionCheckpoint(as_of=as_of, states=_read_states(path))
+        return None
+
+
+def _states_to_df(states: Iterable[PositionState]) -> pl.DataFrame:
+    rows = [{name: str(getattr(state, name)) for name in _STATE_FIELDS} for state in states]
+    rows.sort(key=lambda row: (row["broker"], row["isin"]))
+    return pl.DataFrame(rows, schema={name: pl.String for name in _STATE_FIELDS})
+
+
+def _read_states(path: Path) -> list[PositionState]:
+    df = pl.read_csv(path, schema={name: pl.String for name in _STATE_FIELDS})
+    return [state_from_record(row) for row in df.to_dicts()]
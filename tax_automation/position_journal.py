@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import polars as pl
+
+JOURNAL_SUFFIX = ".parquet"
+# Events are partitioned on these; every other column is stored as replayed.
+JOURNAL_ISIN_COLUMN = "isin"
+JOURNAL_DATE_COLUMN = "effective_date"
+JOURNAL_ORDER_COLUMNS = ["effective_date", "sequence_key", "event_type"]
+# An event is identified by these; appending it again with other values supersedes the earlier rows.
+JOURNAL_EVENT_KEY_COLUMNS = ["broker", "isin", "source_file", "source_id", "event_type", "effective_date"]
+# Added on read: the number of the part file a row was appended in, and whether a later part replaced it.
+JOURNAL_PART_COLUMN = "journal_part"
+JOURNAL_SUPERSEDED_COLUMN = "superseded"
+
+
+@dataclass(frozen=True, eq=False)
+class PositionEventJournal:
+    """
+    Append-only Parquet journal of moving-average position events, partitioned by ISIN and effective year.
+
+    Partitions live under `isin=<ISIN>/year=<YYYY>/` and hold one numbered part file per append that brought
+    new rows. Events the journal already holds unchanged are skipped, so re-running a period appends nothing.
+    When a rerun changes an event (a corrected trade or rate changes every later after-value), all of that run's
+    rows for the event are appended and supersede the earlier ones, which stay on disk for auditing. Each row
+    keeps the `source_file` and `source_id` of the statement row it was replayed from. Part files are written
+    atomically.
+    """
+
+    root: Path
+
+    def partition_dir(self, isin: str, year: int) -> Path:
+        return self.root / f"isin={isin}" / f"year={year}"
+
+    def append(self, events_df: pl.DataFrame) -> list[Path]:
+        """Add the events of `events_df` (a `position_events_to_df` frame) that the journal does not hold as is."""
+        if events_df.is_empty():
+            return []
+        for column in dict.fromkeys([JOURNAL_ISIN_COLUMN, JOURNAL_DATE_COLUMN, *JOURNAL_EVENT_KEY_COLUMNS]):
+            if column not in events_df.columns:
+                raise ValueError(f"Position journal rows require a {column} column")
+        written: list[Path] = []
+        year = pl.col(JOURNAL_DATE_COLUMN).str.slice(0, 4).cast(pl.Int32)
+        for (isin, partition_year), partition_df in events_df.group_by(
+            JOURNAL_ISIN_COLUMN, year.alias("year"), maintain_order=True
+        ):
+            new_rows = partition_df
+            partition_dir = self.partition_dir(str(isin), int(partition_year))
+            part_paths = _part_paths(partition_dir)
+            existing = _read_parts(part_paths)
+            if existing is not None:
+                current = _current_rows(existing).drop(JOURNAL_PART_COLUMN, JOURNAL_SUPERSEDED_COLUMN)
+                if current.schema != new_rows.schema:
+                    raise ValueError(f"Position journal schema changed for partition {partition_dir}")
+                changed = new_rows.join(current, on=new_rows.columns, how="anti", nulls_equal=True)
+                new_rows = new_rows.join(
+                    changed.select(JOURNAL_EVENT_KEY_COLUMNS).unique(),
+                    on=JOURNAL_EVENT_KEY_COLUMNS,
+                    how="semi",
+                    nulls_equal=True,
+                )
+            if new_rows.is_empty():
+                continue
+            written.append(_write_part(partition_dir, _next_part_number(part_paths), new_rows))
+        if written:
+            logging.info("Appended %s position journal part(s) under %s", len(written), self.root)
+        return written
+
+    def read_isin_history(
+        self, isin: str, years: Iterable[int] | None = None, *, include_superseded: bool = False
+    ) -> pl.DataFrame | None:
+        """
+        Every current journaled event of `isin` (optionally only `years`), reading no other ISIN's partitions.
+
+        With `include_superseded`, replaced rows are returned too, with `journal_part` and `superseded` columns.
+        """
+        isin_dir = self.root / f"isin={isin}"
+        if years is None:
+            partition_dirs = sorted(path for path in isin_dir.glob("year=*") if path.is_dir())
+        else:
+            partition_dirs = [self.partition_dir(isin, year) for year in sorted(set(years))]
+        partitions = [_read_parts(_part_paths(partition_dir)) for partition_dir in partition_dirs]
+        frames = [_with_superseded(partition) for partition in partitions if partition is not None]
+        if not frames:
+            return None
+        history = pl.concat(frames).sort(JOURNAL_ORDER_COLUMNS, maintain_order=True)
+        if include_superseded:
+            return history
+        return history.filter(~pl.col(JOURNAL_SUPERSEDED_COLUMN)).drop(JOURNAL_PART_COLUMN, JOURNAL_SUPERSEDED_COLUMN)
+
+
+def _part_paths(partition_dir: Path) -> list[Path]:
+    return sorted(partition_dir.glob(f"part-*{JOURNAL_SUFFIX}"))
+
+
+def _part_number(path: Path) -> int:
+    return int(path.name.split("-")[1])
+
+
+def _next_part_number(part_paths: list[Path]) -> int:
+    return max((_part_number(path) for path in part_paths), default=-1) + 1
+
+
+def _read_parts(paths: list[Path]) -> pl.DataFrame | None:
+    """The rows of one partition's part files, tagged with the part number they were appended in."""
+    if not paths:
+        return None
+    return pl.concat(
+        [
+            pl.read_parquet(path).with_columns(pl.lit(_part_number(path), dtype=pl.Int64).alias(JOURNAL_PART_COLUMN))
+            for path in paths
+        ]
+    )
+
+
+def _with_superseded(rows: pl.DataFrame) -> pl.DataFrame:
+    # Rows of one append never supersede each other; only a later part replaces an event.
+    latest_part = pl.col(JOURNAL_PART_COLUMN).max().over(JOURNAL_EVENT_KEY_COLUMNS)
+    return rows.with_columns((pl.col(JOURNAL_PART_COLUMN) < latest_part).alias(JOURNAL_SUPERSEDED_COLUMN))
+
+
+def _current_rows(rows: pl.DataFrame) -> pl.DataFrame:
+    return _with_superseded(rows).filter(~pl.col(JOURNAL_SUPERSEDED_COLUMN))
+
+
+def _write_part(partition_dir: Path, part_number: int, rows: pl.DataFrame) -> Path:
+    # Numbered in append order, so readers see superseded rows before their corrections.
+    digest = hashlib.sha256(rows.write_csv().encode()).hexdigest()[:16]
+    path = partition_dir / f"part-{part_number:06d}-{digest}{JOURNAL_SUFFIX}"
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=partition_dir, prefix=".tmp-", suffix=JOURNAL_SUFFIX)
+    os.close(fd)
+    try:
+        rows.write_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return path
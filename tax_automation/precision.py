@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Context, Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
 from typing import Any
 
 import polars as pl
@@ -17,6 +17,9 @@ PL_MONEY_DTYPE = pl.Decimal(scale=MONEY_SCALE)
 PL_FX_DTYPE = pl.Decimal(scale=FX_SCALE)
 PL_QTY_DTYPE = pl.Decimal(scale=QTY_SCALE)
 
+# Context of the moving-average replay arithmetic, pinned so results never depend on the caller's context.
+REPLAY_DECIMAL_CONTEXT = Context(prec=28, rounding=ROUND_HALF_EVEN)
+
 
 def to_decimal(value: Any) -> Decimal:
     if isinstance(value, Decimal):
@@ -58,6 +61,14 @@ def qty_lit(value: Any = 0) -> pl.Expr:
     return pl.lit(quantize_qty(value), dtype=PL_QTY_DTYPE)
 
 
+def round_half_up(expr: pl.Expr, scale: int) -> pl.Expr:
+    """Vectorized ROUND_HALF_UP of a Decimal expression; Polars' own `round` rounds half to even."""
+    magnitude = (expr.abs() * pl.lit(Decimal(10) ** scale) + pl.lit(Decimal("0.5"))).floor() * pl.lit(
+        Decimal(1).scaleb(-scale)
+    )
+    return pl.when(expr < 0).then(-magnitude).otherwise(magnitude).cast(pl.Decimal(scale=scale))
+
+
 def cast_decimal_columns_to_float(df: pl.DataFrame) -> pl.DataFrame:
     casts = [
         pl.col(name).cast(pl.Float64).alias(name)
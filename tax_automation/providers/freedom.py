@@ -19,12 +19,22 @@ from tax_automation.finanzonline import (
     ORDINARY_INCOME_BUCKET_CATEGORY,
     empty_finanzonline_bucket_df,
 )
+from tax_automation.fx_requirements import FxRequirements
 from tax_automation.precision import cast_decimal_columns_to_float
-from tax_automation.utils import build_separate_trade_profit_loss_rows, calculate_kest, convert_to_euro, join_exchange_rates, read_json
+from tax_automation.utils import (
+    FxJoiner,
+    FxRatesSource,
+    build_separate_trade_profit_loss_rows,
+    calculate_kest,
+    convert_to_euro,
+    read_json,
+)
 
 EMPTY_VALUE = "-"
 EX_DATE_COL = "ex_date"
 TRADE_OPERATION_COL = "operation"
+# Currency conversions are booked as trades of instruments like "EUR/USD"; they are not taxable trades.
+FX_PAIR_PATTERN = r"^[A-Z]{3}/[A-Z]{3}$"
 ABS_EPSILON = 1e-9
 DIVIDEND_TYPE_MAPPING_ALLOWED = {"dividends", "etf_dividends"}
 DIVIDEND_SUMMARY_TYPE_LABELS = {
@@ -336,7 +346,7 @@ def _prepare_dividends_df(
 
 def _summarize_dividends(
     dividends_df: pl.DataFrame,
-    exchange_rates_df: pl.DataFrame,
+    exchange_rates_df: FxRatesSource,
     incorrect_withholding_tax_output_file: str | None,
     dividend_type_mapping: dict[str, str] | None,
 ) -> pl.DataFrame | None:
@@ -368,7 +378,7 @@ def _summarize_dividends(
 
 def _build_dividend_tax_df(
     dividends_df: pl.DataFrame,
-    exchange_rates_df: pl.DataFrame,
+    exchange_rates_df: FxRatesSource,
     incorrect_withholding_tax_output_file: str | None,
     dividend_type_mapping: dict[str, str] | None,
 ) -> pl.DataFrame | None:
@@ -396,18 +406,14 @@ def _build_dividend_tax_df(
         .sort(EX_DATE_COL)
     )
 
-    joined_df = join_exchange_rates(
-        df=gross_recovered_df,
-        rates_df=exchange_rates_df,
-        df_date_col=EX_DATE_COL,
-    )
+    joined_df = FxJoiner.coerce(exchange_rates_df).join(gross_recovered_df, EX_DATE_COL)
     joined_df = convert_to_euro(joined_df, col_to_convert=[Col.amount, Col.withholding_tax])
     return calculate_kest(joined_df, amount_col=Col.amount_euro, tax_withheld_col=Col.withholding_tax_euro)
 
 
 def build_finanzonline_dividend_buckets_freedom(
     json_file_path: str,
-    exchange_rates_df: pl.DataFrame,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
     exclude_corporate_action_ids_file: str | None = None,
@@ -533,7 +539,26 @@ def _mark_award_profit_fallback_eligible(statement: dict, trades_df: pl.DataFram
     )
 
 
-def _load_trades_df(statement: dict, exchange_rates_df: pl.DataFrame, start_date: date, end_date: date) -> pl.DataFrame:
+def _detailed_trades(statement: dict) -> list:
+    trades_section = statement.get("trades")
+    return (trades_section.get("detailed") or []) if isinstance(trades_section, dict) else []
+
+
+def _select_period_trades(trades_df: pl.DataFrame, start_date: date, end_date: date, *columns: pl.Expr) -> pl.DataFrame:
+    """Trade date, ticker, currency and `columns` of trades in the period, without FX conversion pairs."""
+    return (
+        trades_df.select(
+            pl.col("short_date").str.to_date("%Y-%m-%d").alias(Col.trade_date),
+            pl.col("instr_nm").cast(pl.String).alias(Col.ticker),
+            pl.col("curr_c").cast(pl.String).alias(Col.currency),
+            *columns,
+        )
+        .filter(pl.col(Col.trade_date).is_between(start_date, end_date))
+        .filter(~pl.col(Col.ticker).str.to_uppercase().str.contains(FX_PAIR_PATTERN))
+    )
+
+
+def _load_trades_df(statement: dict, exchange_rates_df: FxRatesSource, start_date: date, end_date: date) -> pl.DataFrame:
     """
     1. Read Freedom trades and return an empty typed dataframe when no trades are present.
     2. Validate trade columns and normalize dates/currencies/profit values.
@@ -541,11 +566,7 @@ def _load_trades_df(statement: dict, exchange_rates_df: pl.DataFrame, start_date
     4. Join FX rates by trade date and convert realized trade profit to EUR.
     5. Return normalized per-trade rows ready for tax aggregation.
     """
-    trades_section = statement.get("trades")
-    trades_raw = []
-    if isinstance(trades_section, dict):
-        trades_raw = trades_section.get("detailed") or []
-
+    trades_raw = _detailed_trades(statement)
     if not trades_raw:
         return pl.DataFrame(schema={**TRADES_SCHEMA, Col.profit_euro: pl.Float64})
 
@@ -563,18 +584,14 @@ def _load_trades_df(statement: dict, exchange_rates_df: pl.DataFrame, start_date
     fifo_profit_expr = pl.col("fifo_profit").cast(pl.Float64, strict=False) if has_fifo_profit else pl.lit(None)
     profit_expr = pl.col("profit").cast(pl.Float64, strict=False) if has_profit else pl.lit(None)
 
-    trades_df = (
-        trades_df.select(
-            pl.col("short_date").str.to_date("%Y-%m-%d").alias(Col.trade_date),
-            pl.col("instr_nm").cast(pl.String).alias(Col.ticker),
-            pl.col("curr_c").cast(pl.String).alias(Col.currency),
-            pl.col(TRADE_OPERATION_COL).cast(pl.String).str.to_lowercase().alias(TRADE_OPERATION_COL),
-            pl.col("q").cast(pl.Float64, strict=False).fill_null(0.0).abs().alias("_trade_quantity"),
-            fifo_profit_expr.alias("_fifo_profit_raw"),
-            profit_expr.alias("_profit_raw"),
-        )
-        .filter(pl.col(Col.trade_date).is_between(start_date, end_date))
-        .filter(~pl.col(Col.ticker).str.to_uppercase().str.contains(r"^[A-Z]{3}/[A-Z]{3}$"))
+    trades_df = _select_period_trades(
+        trades_df,
+        start_date,
+        end_date,
+        pl.col(TRADE_OPERATION_COL).cast(pl.String).str.to_lowercase().alias(TRADE_OPERATION_COL),
+        pl.col("q").cast(pl.Float64, strict=False).fill_null(0.0).abs().alias("_trade_quantity"),
+        fifo_profit_expr.alias("_fifo_profit_raw"),
+        profit_expr.alias("_profit_raw"),
     )
 
     if trades_df.is_empty():
@@ -605,7 +622,7 @@ def _load_trades_df(statement: dict, exchange_rates_df: pl.DataFrame, start_date
     if trades_df.is_empty():
         return pl.DataFrame(schema={**TRADES_SCHEMA, Col.profit_euro: pl.Float64})
 
-    joined_df = join_exchange_rates(df=trades_df, rates_df=exchange_rates_df, df_date_col=Col.trade_date)
+    joined_df = FxJoiner.coerce(exchange_rates_df).join(trades_df, Col.trade_date)
     return convert_to_euro(joined_df, col_to_convert=Col.profit)
 
 
@@ -650,9 +667,26 @@ def _summarize_trades(trades_df: pl.DataFrame, separate_trade_profit_loss: bool)
     return pl.concat(summary_frames, how="vertical_relaxed") if summary_frames else None
 
 
+def scan_fx_requirements_freedom(
+    json_file_path: str, start_date: date, end_date: date, include_trades: bool = True
+) -> FxRequirements:
+    """Currencies and dates `process_freedom_statement` converts: corporate action ex-dates and, optionally, trade dates."""
+    statement = read_json(json_file_path)
+    requirements = [
+        FxRequirements.from_df(_load_corporate_actions_df(statement, start_date, end_date), Col.currency, EX_DATE_COL)
+    ]
+    trades_raw = _detailed_trades(statement)
+    if include_trades and trades_raw:
+        trades_df = pl.DataFrame(trades_raw)
+        _assert_required_columns(trades_df, {"short_date", "instr_nm", "curr_c"}, section_name="Freedom trades.detailed")
+        trades_df = _select_period_trades(trades_df, start_date, end_date)
+        requirements.append(FxRequirements.from_df(trades_df, Col.currency, Col.trade_date))
+    return FxRequirements.merge(*requirements)
+
+
 def process_freedom_statement(
     json_file_path: str,
-    exchange_rates_df: pl.DataFrame,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
     exclude_corporate_action_ids_file: str | None = None,
@@ -671,6 +705,7 @@ def process_freedom_statement(
     """
     print("\n\n======================== Processing Freedom Finance Statement ========================\n")
 
+    exchange_rates_df = FxJoiner.coerce(exchange_rates_df)
     statement = read_json(json_file_path)
     corporate_actions_df = _load_corporate_actions_df(
         statement=statement,
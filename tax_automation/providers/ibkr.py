@@ -1,11 +1,18 @@
 import logging
 from dataclasses import dataclass
-from datetime import date, datetime
-from typing import Literal, Sequence
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Literal
 
 import polars as pl
 
-from tax_automation.broker_history import build_fx_table_from_rates_df, get_fx_rate, load_ibkr_stock_like_trades, round_money, round_qty
+from tax_automation.broker_history import (
+    TradeTable,
+    build_fx_table_from_rates_df,
+    load_ibkr_trade_table,
+    round_money,
+    round_qty,
+)
 from tax_automation.const import EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET, FLOAT_PRECISION, CurrencyCode, TransactionTypeIBKR
 from tax_automation.const import Column as Col
 from tax_automation.finanzonline import (
@@ -21,29 +28,38 @@ from tax_automation.finanzonline import (
     REIT_DISTRIBUTION_BUCKET_CATEGORY,
     empty_finanzonline_bucket_df,
 )
+from tax_automation.fixed_point_replay import FIXED_POINT_ENGINE, iter_trade_table_events
+from tax_automation.fx_requirements import FxRequirements
+from tax_automation.ibkr_statements import IbkrStatementSet, IbkrStatementSource
 from tax_automation.moving_average import (
+    POSITION_EVENT_SORT_COLUMNS,
     PositionEvent,
+    PositionRecordSink,
+    PositionState,
     build_basis_reset_event,
     build_buy_event,
     build_sell_event,
     load_position_states,
     position_events_to_df,
     position_states_to_df,
-    replay_events,
+    replay_into,
+    replay_states,
 )
-from tax_automation.precision import cast_decimal_columns_to_float
+from tax_automation.position_checkpoints import PositionCheckpoint, PositionCheckpointStore, ReplayPrefix
+from tax_automation.position_journal import PositionEventJournal
+from tax_automation.precision import PL_FX_DTYPE, cast_decimal_columns_to_float
 from tax_automation.utils import (
+    FxJoiner,
+    FxRatesSource,
     build_separate_trade_profit_loss_rows,
     calculate_kest,
     convert_to_euro,
-    extract_elements,
     has_rows,
-    join_exchange_rates,
-    read_xml_to_df,
 )
 
 IBKR_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES = {"COMMON", "ADR", "REIT"}
+RAW_TRADE_SALE_NOTE = "Austrian moving-average sale result from raw IBKR trade history."
 
 
 SummarySectionName = Literal["dividends", "bonds", "etf_dividends", "reit_dividends", "trades"]
@@ -133,17 +149,13 @@ def agg_final_transactions(df: pl.DataFrame) -> pl.DataFrame:
 
 
 def _build_cash_transactions_tax_df(
-    xml_file_path: str | Sequence[str],
-    exchange_rates_df: pl.DataFrame,
+    xml_file_path: IbkrStatementSource,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
     excluded_cash_transaction_subcategories: set[str] | None = None,
 ) -> pl.DataFrame | None:
-    cash_transactions_df = read_xml_to_df(
-        file_path=xml_file_path,
-        xml_extract_func=lambda root: extract_elements(root.find(".//CashTransactions"), "CashTransaction"),
-        dedupe=True,
-    )
+    cash_transactions_df = IbkrStatementSet.coerce(xml_file_path).cash_transactions
     if cash_transactions_df.is_empty():
         return None
 
@@ -193,11 +205,7 @@ def _build_cash_transactions_tax_df(
         )
     )
 
-    joined_df = join_exchange_rates(
-        df=cash_transactions_df,
-        rates_df=exchange_rates_df,
-        df_date_col="settle_date",
-    )
+    joined_df = FxJoiner.coerce(exchange_rates_df).join(cash_transactions_df, "settle_date")
     joined_df = convert_to_euro(joined_df, col_to_convert="amount")
 
     pivoted_df = apply_pivot(joined_df)
@@ -209,8 +217,8 @@ def _build_cash_transactions_tax_df(
 
 
 def build_finanzonline_dividend_buckets_ibkr(
-    xml_file_path: str | Sequence[str],
-    exchange_rates_df: pl.DataFrame,
+    xml_file_path: IbkrStatementSource,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
     excluded_cash_transaction_subcategories: set[str] | None = None,
@@ -251,39 +259,28 @@ def build_finanzonline_dividend_buckets_ibkr(
     ).cast(BUCKET_SCHEMA)
 
 
-def _build_position_events_from_raw_trades(
-    raw_trades,
+def _trade_fx_rates(trades: TradeTable, exchange_rates_df: FxRatesSource, *, strict: bool = True) -> pl.Series:
+    """EUR rate of each trade's currency on its trade date, aligned with the rows of `trades`."""
+    if trades.is_empty():
+        return pl.Series("fx_rate", [], dtype=PL_FX_DTYPE)
+    relevant_currencies = trades.currencies() - {CurrencyCode.euro.value}
+    fx_table = build_fx_table_from_rates_df(FxJoiner.coerce(exchange_rates_df).rates_df, currencies=relevant_currencies)
+    return fx_table.lookup_many(trades.df["currency"], trades.df["trade_date"], strict=strict)["fx_rate"]
+
+
+def _iter_position_events_from_raw_trades(
+    raw_trades: TradeTable,
     *,
-    exchange_rates_df: pl.DataFrame,
+    exchange_rates_df: FxRatesSource,
     sequence_offset: int = 0,
-) -> list[PositionEvent]:
-    if not raw_trades:
-        return []
-    relevant_currencies = {trade.currency for trade in raw_trades if trade.currency != CurrencyCode.euro.value}
-    fx_table = build_fx_table_from_rates_df(exchange_rates_df, currencies=relevant_currencies)
-    events: list[PositionEvent] = []
-    for index, trade in enumerate(raw_trades, start=sequence_offset):
-        fx_to_eur = get_fx_rate(fx_table, trade.currency, trade.trade_date)
+) -> Iterator[PositionEvent]:
+    """Yields one event per trade in the table's chronological order, ready for a presorted replay."""
+    if raw_trades.is_empty():
+        return
+    fx_rates = _trade_fx_rates(raw_trades, exchange_rates_df).to_list()
+    for index, (trade, fx_to_eur) in enumerate(zip(raw_trades.iter_trades(), fx_rates), start=sequence_offset):
         if trade.operation == "buy":
-            events.append(
-                build_buy_event(
-                    broker="ibkr",
-                    ticker=trade.ticker,
-                    isin=trade.isin,
-                    currency=trade.currency,
-                    asset_class=trade.asset_class,
-                    trade_date=trade.trade_date,
-                    quantity=trade.quantity,
-                    price_ccy=trade.price_ccy,
-                    fx_to_eur=fx_to_eur,
-                    source_id=trade.trade_id,
-                    source_file=trade.source_statement_file,
-                    sequence_key=index,
-                )
-            )
-            continue
-        events.append(
-            build_sell_event(
+            yield build_buy_event(
                 broker="ibkr",
                 ticker=trade.ticker,
                 isin=trade.isin,
@@ -295,20 +292,24 @@ def _build_position_events_from_raw_trades(
                 fx_to_eur=fx_to_eur,
                 source_id=trade.trade_id,
                 source_file=trade.source_statement_file,
-                notes="Austrian moving-average sale result from raw IBKR trade history.",
                 sequence_key=index,
             )
+            continue
+        yield build_sell_event(
+            broker="ibkr",
+            ticker=trade.ticker,
+            isin=trade.isin,
+            currency=trade.currency,
+            asset_class=trade.asset_class,
+            trade_date=trade.trade_date,
+            quantity=trade.quantity,
+            price_ccy=trade.price_ccy,
+            fx_to_eur=fx_to_eur,
+            source_id=trade.trade_id,
+            source_file=trade.source_statement_file,
+            notes=RAW_TRADE_SALE_NOTE,
+            sequence_key=index,
         )
-    return events
-
-
-def _extract_ibkr_trade_rows(root) -> list[dict[str, str | None]]:
-    rows: list[dict[str, str | None]] = []
-    for parent_tag in (".//TradeConfirms", ".//Trades"):
-        for parent in root.findall(parent_tag):
-            rows.extend(extract_elements(parent, "TradeConfirm"))
-            rows.extend(extract_elements(parent, "Trade"))
-    return rows
 
 
 def _select_stock_event_columns(events_df: pl.DataFrame) -> pl.DataFrame:
@@ -366,15 +367,30 @@ def _select_stock_sale_columns(sales_df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
+def _load_opening_states(austrian_opening_state_path: str | None) -> tuple[list[PositionState], date | None]:
+    """Stock-like opening states and the earliest snapshot date among them."""
+    if not austrian_opening_state_path:
+        return [], None
+    opening_states = [
+        state
+        for state in load_position_states(austrian_opening_state_path)
+        if state.asset_class in AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES
+    ]
+    snapshot_dates = {state.snapshot_date for state in opening_states if state.snapshot_date}
+    return opening_states, date.fromisoformat(sorted(snapshot_dates)[0]) if snapshot_dates else None
+
+
 def _build_stock_authoritative_outputs(
-    exchange_rates_df: pl.DataFrame,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
     *,
-    ibkr_trade_history_path: str,
+    ibkr_trade_history_path: IbkrStatementSource,
     austrian_opening_state_path: str | None,
     authoritative_start_date: date | None,
     excluded_trade_subcategories: set[str] | None,
+    position_checkpoint_dir: str | Path | None = None,
+    position_journal_dir: str | Path | None = None,
 ) -> tuple[pl.DataFrame | None, pl.DataFrame, pl.DataFrame]:
     if authoritative_start_date is not None and not austrian_opening_state_path:
         raise ValueError(
@@ -382,23 +398,12 @@ def _build_stock_authoritative_outputs(
             "move-in authoritative start without opening state is not supported"
         )
 
-    opening_states = []
-    snapshot_date: date | None = None
-    if austrian_opening_state_path:
-        loaded_states = [
-            state
-            for state in load_position_states(austrian_opening_state_path)
-            if state.asset_class in AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES
-        ]
-        opening_states = loaded_states
-        snapshot_dates = {state.snapshot_date for state in loaded_states if state.snapshot_date}
-        if snapshot_dates:
-            snapshot_date = date.fromisoformat(sorted(snapshot_dates)[0])
-    raw_trades = load_ibkr_stock_like_trades(
+    opening_states, snapshot_date = _load_opening_states(austrian_opening_state_path)
+    raw_trades = load_ibkr_trade_table(
         ibkr_trade_history_path,
         allowed_asset_classes=AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES,
     )
-    if not raw_trades:
+    if raw_trades.is_empty():
         return None, position_states_to_df(opening_states), _select_stock_event_columns(position_events_to_df([]))
 
     processing_start_date = start_date
@@ -408,19 +413,38 @@ def _build_stock_authoritative_outputs(
         processing_start_date = max(processing_start_date, snapshot_date)
 
     opening_lower_bound = snapshot_date or authoritative_start_date
-    opening_trades = [
-        trade
-        for trade in raw_trades
-        if (opening_lower_bound is None or opening_lower_bound <= trade.trade_date) and trade.trade_date < start_date
-    ]
-    current_period_trades = [trade for trade in raw_trades if processing_start_date <= trade.trade_date <= end_date]
-    if excluded_trade_subcategories:
-        opening_trades = [trade for trade in opening_trades if trade.asset_class not in excluded_trade_subcategories]
-        current_period_trades = [
-            trade for trade in current_period_trades if trade.asset_class not in excluded_trade_subcategories
-        ]
-    opening_events = _build_position_events_from_raw_trades(opening_trades, exchange_rates_df=exchange_rates_df)
-    opening_states, _, _ = replay_events(opening_states, opening_events)
+    raw_trades = raw_trades.without_asset_classes(excluded_trade_subcategories)
+    checkpoints = None
+    replay_prefix = None
+    if position_checkpoint_dir is not None and (opening_lower_bound is None or opening_lower_bound < start_date):
+        checkpoints = PositionCheckpointStore(Path(position_checkpoint_dir))
+        # Checkpoints go no later than the day after the period, so later trades (and their rates) can't matter.
+        prefix_trades = raw_trades.in_date_range(opening_lower_bound, end_date)
+        replay_prefix = ReplayPrefix(
+            tuple(opening_states),
+            opening_lower_bound,
+            prefix_trades,
+            _trade_fx_rates(prefix_trades, exchange_rates_df, strict=False),
+        )
+    replay_start_date = opening_lower_bound
+    checkpoint = checkpoints.latest(replay_prefix, not_after=start_date) if checkpoints is not None else None
+    if checkpoint is not None:
+        replay_start_date, opening_states = checkpoint.as_of, checkpoint.states
+    opening_trades = raw_trades.in_date_range(replay_start_date, start_date, include_end=False)
+    current_period_trades = raw_trades.in_date_range(processing_start_date, end_date)
+    # Only the final states of the prefix are kept, so it is replayed on integer units read from the trade table.
+    opening_states = replay_states(
+        opening_states,
+        iter_trade_table_events(
+            opening_trades,
+            _trade_fx_rates(opening_trades, exchange_rates_df),
+            broker="ibkr",
+            sell_notes=RAW_TRADE_SALE_NOTE,
+        ),
+        engine=FIXED_POINT_ENGINE,
+    )
+    if checkpoints is not None:
+        checkpoints.save(replay_prefix, PositionCheckpoint(start_date, opening_states))
 
     run_start_events: list[PositionEvent] = []
     if snapshot_date is not None and start_date <= snapshot_date <= end_date:
@@ -443,17 +467,29 @@ def _build_stock_authoritative_outputs(
                 )
             )
 
-    current_events = _build_position_events_from_raw_trades(
+    current_events = _iter_position_events_from_raw_trades(
         current_period_trades,
         exchange_rates_df=exchange_rates_df,
         sequence_offset=len(run_start_events),
     )
-    final_states, event_rows, sale_rows = replay_events(opening_states, current_events)
-    events_df = position_events_to_df(event_rows)
-    sales_df = _select_stock_sale_columns(pl.DataFrame(sale_rows).sort(["sale_date", "ticker"])) if sale_rows else None
+    journal = PositionEventJournal(Path(position_journal_dir)) if position_journal_dir is not None else None
+    sink = PositionRecordSink()
+    final_states = replay_into(opening_states, current_events, sink, presorted=True, journal=journal)
+    if checkpoints is not None and processing_start_date == start_date:
+        # The next period starts from these states, so its run replays none of this period's trades.
+        checkpoints.save(replay_prefix, PositionCheckpoint(end_date + timedelta(days=1), final_states))
+    events_df = sink.events_df()
+    sales_df = sink.sales_df()
+    # Sales arrive in trade order; isin keeps same-day sales of one ticker in the per-position replay order.
+    sales_df = (
+        _select_stock_sale_columns(sales_df.sort(["sale_date", "ticker", "isin"], maintain_order=True))
+        if not sales_df.is_empty()
+        else None
+    )
     if run_start_events:
-        _, opening_event_rows, _ = replay_events([], run_start_events)
-        events_df = position_events_to_df(opening_event_rows + event_rows)
+        run_start_sink = PositionRecordSink()
+        replay_into([], run_start_events, run_start_sink, journal=journal)
+        events_df = pl.concat([run_start_sink.events_df(), events_df]).sort(POSITION_EVENT_SORT_COLUMNS)
     return sales_df, position_states_to_df(final_states), _select_stock_event_columns(events_df)
 
 
@@ -502,16 +538,22 @@ def _build_trade_summary_df(
 
 
 def process_trades_ibkr(
-    exchange_rates_df: pl.DataFrame,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
     separate_trade_profit_loss: bool = True,
     excluded_trade_subcategories: set[str] | None = None,
     austrian_opening_state_path: str | None = None,
-    ibkr_trade_history_path: str | None = None,
+    ibkr_trade_history_path: IbkrStatementSource | None = None,
     authoritative_start_date: date | None = None,
+    position_checkpoint_dir: str | Path | None = None,
+    position_journal_dir: str | Path | None = None,
 ) -> tuple[pl.DataFrame | None, pl.DataFrame | None, pl.DataFrame | None, pl.DataFrame | None]:
     """
+    With `position_checkpoint_dir`, moving-average states at the period start and after the period end are
+    checkpointed there, and the opening replay resumes from the latest checkpoint that is still valid.
+    With `position_journal_dir`, the period's position events are appended to the Parquet event journal there.
+
     Returns:
     - trade tax detail dataframe
     - trade summary dataframe
@@ -530,6 +572,8 @@ def process_trades_ibkr(
         austrian_opening_state_path=austrian_opening_state_path,
         authoritative_start_date=authoritative_start_date,
         excluded_trade_subcategories=excluded_trade_subcategories,
+        position_checkpoint_dir=position_checkpoint_dir,
+        position_journal_dir=position_journal_dir,
     )
     if trades_detail_df is None or trades_detail_df.is_empty():
         logging.warning("No authoritative stock-like sales matched the selected date range.")
@@ -542,8 +586,8 @@ def process_trades_ibkr(
 
 
 def process_cash_transactions_ibkr(
-    xml_file_path: str | Sequence[str],
-    exchange_rates_df: pl.DataFrame,
+    xml_file_path: IbkrStatementSource,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
     extract_etf: bool = False,
@@ -595,12 +639,52 @@ def process_cash_transactions_ibkr(
     return country_agg_df, etf_agg_df, reit_agg_df
 
 
+_BILL_MATURITY_FILTER = (pl.col("asset_category") == "BILL") & (pl.col("action_type") == "TM")
+_OTHER_BOND_ACTION_FILTER = pl.col("asset_category") == "BOND"
+
+
+def _select_bond_corporate_actions_df(corporate_actions_df: pl.DataFrame, start_date: date, end_date: date) -> pl.DataFrame:
+    return corporate_actions_df.select(
+        [
+            pl.col("assetCategory").alias("asset_category"),
+            pl.col("type").alias("action_type"),
+            pl.col("reportDate").str.strptime(pl.Date, "%Y-%m-%d").alias("report_date"),
+            "isin",
+            pl.col("issuerCountryCode").alias("issuer_country_code"),
+            "currency",
+            pl.col("proceeds").cast(pl.Float64),
+            pl.col("fifoPnlRealized").cast(pl.Float64).alias("realized_pnl"),
+        ]
+    ).filter(pl.col("report_date").is_between(start_date, end_date))
+
+
+def _load_bill_buy_trades_df(ibkr_trade_history_path: IbkrStatementSource, isins: list[str]) -> pl.DataFrame:
+    bill_trade_rows_df = IbkrStatementSet.coerce(ibkr_trade_history_path).trade_rows()
+    if bill_trade_rows_df.is_empty():
+        return bill_trade_rows_df
+    return (
+        bill_trade_rows_df.filter((pl.col("assetCategory") == "BILL") & (pl.col("buySell") == "BUY"))
+        .select(
+            pl.col("tradeDate").str.strptime(pl.Date, "%Y-%m-%d").alias("trade_date"),
+            "isin",
+            "currency",
+            pl.col("amount").cast(pl.Float64).abs().alias("basis_ccy_ex_fees"),
+            pl.col("commission").cast(pl.Float64, strict=False).abs().fill_null(0.0).alias("ignored_buy_commission_ccy"),
+            pl.col("accruedInt").cast(pl.Float64, strict=False).abs().fill_null(0.0).alias("accrued_interest_ccy"),
+        )
+        .with_columns(
+            (pl.col("basis_ccy_ex_fees") + pl.col("accrued_interest_ccy")).round(FLOAT_PRECISION).alias("basis_ccy_ex_fees")
+        )
+        .filter(pl.col("isin").is_in(isins))
+    )
+
+
 def process_bonds_ibkr(
-    xml_file_path: str | Sequence[str],
-    exchange_rates_df: pl.DataFrame,
+    xml_file_path: IbkrStatementSource,
+    exchange_rates_df: FxRatesSource,
     start_date: date,
     end_date: date,
-    ibkr_trade_history_path: str | Sequence[str] | None = None,
+    ibkr_trade_history_path: IbkrStatementSource | None = None,
 ) -> tuple[pl.DataFrame | None, pl.DataFrame | None]:
     """
     1. Load corporate actions from XML and keep bill maturities plus any non-bill bond actions.
@@ -614,36 +698,20 @@ def process_bonds_ibkr(
     5. Produce detailed per-event output and aggregate country-level summary totals.
     """
     logging.info("\n\n======================== Processing Corporate Actions ========================\n")
+    fx_joiner = FxJoiner.coerce(exchange_rates_df)
 
     # Convert the extracted data into Polars DataFrames
-    corporate_actions_df = read_xml_to_df(
-        file_path=xml_file_path,
-        xml_extract_func=lambda root: extract_elements(root.find(".//CorporateActions"), "CorporateAction"),
-        dedupe=True,
-    )
+    corporate_actions_df = IbkrStatementSet.coerce(xml_file_path).corporate_actions
     if corporate_actions_df.is_empty():
         logging.warning("No Corporate Actions found in the XML file.")
         return None, None
 
-    corporate_actions_df = corporate_actions_df.select(
-        [
-            pl.col("assetCategory").alias("asset_category"),
-            pl.col("type").alias("action_type"),
-            pl.col("reportDate").str.strptime(pl.Date, "%Y-%m-%d").alias("report_date"),
-            "isin",
-            pl.col("issuerCountryCode").alias("issuer_country_code"),
-            "currency",
-            pl.col("proceeds").cast(pl.Float64),
-            pl.col("fifoPnlRealized").cast(pl.Float64).alias("realized_pnl"),
-        ]
-    ).filter(pl.col("report_date").is_between(start_date, end_date))
+    corporate_actions_df = _select_bond_corporate_actions_df(corporate_actions_df, start_date, end_date)
 
     logging.debug("\nCorporate Actions DataFrame: %s\n", corporate_actions_df)
 
-    bill_maturities_df = corporate_actions_df.filter(
-        (pl.col("asset_category") == "BILL") & (pl.col("action_type") == "TM")
-    )
-    other_bond_actions_df = corporate_actions_df.filter(pl.col("asset_category") == "BOND")
+    bill_maturities_df = corporate_actions_df.filter(_BILL_MATURITY_FILTER)
+    other_bond_actions_df = corporate_actions_df.filter(_OTHER_BOND_ACTION_FILTER)
 
     tax_frames: list[pl.DataFrame] = []
 
@@ -651,32 +719,14 @@ def process_bonds_ibkr(
         if not ibkr_trade_history_path:
             raise ValueError("Bill maturity processing requires ibkr_trade_history_path.")
 
-        bill_trade_rows_df = read_xml_to_df(
-            file_path=ibkr_trade_history_path,
-            xml_extract_func=_extract_ibkr_trade_rows,
-            dedupe=True,
-        )
-        bill_buy_trades_df = bill_trade_rows_df.filter(
-            (pl.col("assetCategory") == "BILL") & (pl.col("buySell") == "BUY")
-        ).select(
-            pl.col("tradeDate").str.strptime(pl.Date, "%Y-%m-%d").alias("trade_date"),
-            "isin",
-            "currency",
-            pl.col("amount").cast(pl.Float64).abs().alias("basis_ccy_ex_fees"),
-            pl.col("commission").cast(pl.Float64, strict=False).abs().fill_null(0.0).alias("ignored_buy_commission_ccy"),
-            pl.col("accruedInt").cast(pl.Float64, strict=False).abs().fill_null(0.0).alias("accrued_interest_ccy"),
-        ).with_columns(
-            (pl.col("basis_ccy_ex_fees") + pl.col("accrued_interest_ccy")).round(FLOAT_PRECISION).alias("basis_ccy_ex_fees")
-        )
-
         relevant_isins = bill_maturities_df["isin"].unique().to_list()
-        bill_buy_trades_df = bill_buy_trades_df.filter(pl.col("isin").is_in(relevant_isins))
+        bill_buy_trades_df = _load_bill_buy_trades_df(ibkr_trade_history_path, relevant_isins)
         if bill_buy_trades_df.is_empty():
             raise ValueError("No raw BILL buy trades were found for the matched bill maturity events.")
 
         buy_basis_df = (
             convert_to_euro(
-                join_exchange_rates(df=bill_buy_trades_df, rates_df=exchange_rates_df, df_date_col="trade_date"),
+                fx_joiner.join(bill_buy_trades_df, "trade_date"),
                 "basis_ccy_ex_fees",
             )
             .group_by("isin", "currency")
@@ -689,7 +739,7 @@ def process_bonds_ibkr(
 
         bill_tax_df = (
             convert_to_euro(
-                join_exchange_rates(df=bill_maturities_df, rates_df=exchange_rates_df, df_date_col="report_date"),
+                fx_joiner.join(bill_maturities_df, "report_date"),
                 "proceeds",
             )
             .join(buy_basis_df, on=["isin", "currency"], how="left")
@@ -718,11 +768,7 @@ def process_bonds_ibkr(
         tax_frames.append(bill_tax_df)
 
     if not other_bond_actions_df.is_empty():
-        joined_df = join_exchange_rates(
-            df=other_bond_actions_df,
-            rates_df=exchange_rates_df,
-            df_date_col="report_date",
-        )
+        joined_df = fx_joiner.join(other_bond_actions_df, "report_date")
         joined_df = convert_to_euro(joined_df, "realized_pnl")
         other_bond_tax_df = calculate_kest(joined_df, amount_col="realized_pnl_euro").select(
             "report_date",
@@ -761,6 +807,53 @@ def process_bonds_ibkr(
     return cast_decimal_columns_to_float(tax_df), cast_decimal_columns_to_float(country_agg_df)
 
 
+def scan_fx_requirements_ibkr(
+    xml_file_path: IbkrStatementSource,
+    start_date: date,
+    end_date: date,
+    *,
+    ibkr_trade_history_path: IbkrStatementSource | None = None,
+    austrian_opening_state_path: str | None = None,
+    authoritative_start_date: date | None = None,
+) -> FxRequirements:
+    """
+    Currencies and dates the IBKR processing converts, read from the already parsed statements:
+
+    - cash transactions settled and bond/bill corporate actions reported in the reporting period
+    - buys of the bills maturing in the period, however early they were bought
+    - stock-like trades replayed from the opening state snapshot (or the first trade) to `end_date`
+    """
+    statements = IbkrStatementSet.coerce(xml_file_path)
+    requirements: list[FxRequirements] = []
+    if not statements.cash_transactions.is_empty():
+        cash_transactions_df = statements.cash_transactions.select(
+            "currency", pl.col("settleDate").str.strptime(pl.Date, "%Y-%m-%d").alias("settle_date")
+        ).filter(pl.col("settle_date").is_between(start_date, end_date))
+        requirements.append(FxRequirements.from_df(cash_transactions_df, "currency", "settle_date"))
+
+    bill_maturities_df = None
+    if not statements.corporate_actions.is_empty():
+        corporate_actions_df = _select_bond_corporate_actions_df(statements.corporate_actions, start_date, end_date)
+        corporate_actions_df = corporate_actions_df.filter(_BILL_MATURITY_FILTER | _OTHER_BOND_ACTION_FILTER)
+        requirements.append(FxRequirements.from_df(corporate_actions_df, "currency", "report_date"))
+        bill_maturities_df = corporate_actions_df.filter(_BILL_MATURITY_FILTER)
+
+    if ibkr_trade_history_path:
+        if bill_maturities_df is not None and not bill_maturities_df.is_empty():
+            bill_buy_trades_df = _load_bill_buy_trades_df(
+                ibkr_trade_history_path, bill_maturities_df["isin"].unique().to_list()
+            )
+            requirements.append(FxRequirements.from_df(bill_buy_trades_df, "currency", "trade_date"))
+
+        _, snapshot_date = _load_opening_states(austrian_opening_state_path)
+        raw_trades = load_ibkr_trade_table(
+            ibkr_trade_history_path,
+            allowed_asset_classes=AUTHORITATIVE_STOCK_LIKE_SUBCATEGORIES,
+        ).in_date_range(snapshot_date or authoritative_start_date, end_date)
+        requirements.append(FxRequirements.from_df(raw_trades.df, "currency", "trade_date"))
+    return FxRequirements.merge(*requirements)
+
+
 def calculate_summary_ibkr(
     sections: list[IbkrSummarySection],
 ) -> pl.DataFrame:
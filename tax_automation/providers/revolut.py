@@ -5,8 +5,9 @@ from typing import Final
 import polars as pl
 
 from tax_automation.const import FLOAT_PRECISION, Column, CurrencyCode, RevolutColumn, RevolutType
+from tax_automation.fx_requirements import FxRequirements
 from tax_automation.precision import cast_decimal_columns_to_float
-from tax_automation.utils import calculate_kest, convert_to_euro, join_exchange_rates
+from tax_automation.utils import FxJoiner, FxRatesSource, calculate_kest, convert_to_euro
 
 _IGNORED_PREFIXES: Final[tuple[str, ...]] = (
     "BUY",
@@ -118,8 +119,23 @@ def _raise_if_unknown_descriptions(processed_statement_df: pl.DataFrame) -> None
         )
 
 
+def scan_fx_requirements_revolut(csv_file_path: str, start_date: date, end_date: date) -> FxRequirements:
+    """The statement currency and the dates in the reporting period that `process_revolut_savings_statement` converts."""
+    statement_df = pl.read_csv(csv_file_path)
+    _, currency = _resolve_value_column_and_currency(statement_df)
+    dates_df = statement_df.select(
+        _date_expr().alias(Column.date),
+        _type_expr().alias(RevolutColumn.type),
+        pl.lit(currency.value).alias(Column.currency),
+    ).filter(
+        pl.col(Column.date).is_between(start_date, end_date),
+        pl.col(RevolutColumn.type).is_in([RevolutType.fee.value, RevolutType.interest.value]),
+    )
+    return FxRequirements.from_df(dates_df, Column.currency, Column.date)
+
+
 def process_revolut_savings_statement(
-    csv_file_path: str, exchange_rates_df: pl.DataFrame, start_date: date, end_date: date
+    csv_file_path: str, exchange_rates_df: FxRatesSource, start_date: date, end_date: date
 ) -> pl.DataFrame:
     """
     1. Resolve the statement currency and correct value column for the Revolut CSV format.
@@ -159,11 +175,7 @@ def process_revolut_savings_statement(
     )
     logging.debug("\nprofit_by_date_df:  %s\n", profit_by_date_df)
 
-    joined_df = join_exchange_rates(
-        df=profit_by_date_df,
-        rates_df=exchange_rates_df,
-        df_date_col=Column.date,
-    )
+    joined_df = FxJoiner.coerce(exchange_rates_df).join(profit_by_date_df, Column.date)
     profit_euro_df = convert_to_euro(joined_df, Column.profit)
     logging.debug("\nprofit_euro_df: %s\n", profit_euro_df)
 
@@ -4,18 +4,14 @@ from datetime import date
 import polars as pl
 
 from tax_automation.const import FLOAT_PRECISION, Column
+from tax_automation.fx_requirements import FxRequirements
 from tax_automation.precision import PL_MONEY_DTYPE, cast_decimal_columns_to_float, decimal_lit
-from tax_automation.utils import calculate_kest, convert_to_euro, join_exchange_rates, read_csv_to_df
+from tax_automation.utils import FxJoiner, FxRatesSource, calculate_kest, convert_to_euro, read_csv_to_df
 
 
-def process_wise_statement(
-    csv_file_path: str, exchange_rates_df: pl.DataFrame, start_date: date, end_date: date
-) -> pl.DataFrame:
-    print("\n\n======================== Processing Wise Statement ========================\n")
-
-    # Convert the extracted data into Polars DataFrames
+def _load_cashback_df(csv_file_path: str, start_date: date, end_date: date) -> pl.DataFrame:
     statement_df = read_csv_to_df(csv_file_path)
-    statement_df = (
+    return (
         statement_df.filter(pl.col("TransferWise ID").str.starts_with("BALANCE_CASHBACK"))
         .select(
             pl.col("Date").str.to_date("%d-%m-%Y").alias(Column.date),
@@ -24,13 +20,23 @@ def process_wise_statement(
         )
         .filter(pl.col(Column.date).is_between(start_date, end_date))
     )
+
+
+def scan_fx_requirements_wise(csv_file_path: str, start_date: date, end_date: date) -> FxRequirements:
+    """Currencies and dates of the cashback rows that `process_wise_statement` converts."""
+    return FxRequirements.from_df(_load_cashback_df(csv_file_path, start_date, end_date), Column.currency, Column.date)
+
+
+def process_wise_statement(
+    csv_file_path: str, exchange_rates_df: FxRatesSource, start_date: date, end_date: date
+) -> pl.DataFrame:
+    print("\n\n======================== Processing Wise Statement ========================\n")
+
+    # Convert the extracted data into Polars DataFrames
+    statement_df = _load_cashback_df(csv_file_path, start_date, end_date)
     logging.debug(statement_df)
 
-    joined_df = join_exchange_rates(
-        df=statement_df,
-        rates_df=exchange_rates_df,
-        df_date_col=Column.date,
-    )
+    joined_df = FxJoiner.coerce(exchange_rates_df).join(statement_df, Column.date)
 
     converted_euro_df = convert_to_euro(joined_df, Column.amount)
     logging.debug(converted_euro_df)
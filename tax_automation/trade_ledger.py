@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Collection, Sequence, Union
+
+import polars as pl
+
+from tax_automation.ibkr_statements import (
+    IBKR_STATEMENT_COLUMNS,
+    IBKR_TRADE_ROW_TAGS,
+    PARSER_VERSION,
+    ROW_DIGEST_COL,
+    ROW_TAG_COL,
+    SOURCE_FILE_COL,
+    IbkrStatementSet,
+    file_digest,
+)
+from tax_automation.utils import resolve_input_file_paths
+
+LEDGER_KEY_COL = "ledger_key"
+LEDGER_CONTENT_COL = "content_hash"
+LEDGER_MANIFEST_FILE = "manifest.json"
+LEDGER_VERSION = 2
+UNKNOWN_YEAR_PARTITION = "unknown"
+
+
+@dataclass(frozen=True)
+class LedgerIngestResult:
+    ingested_files: tuple[str, ...]
+    skipped_files: tuple[str, ...]
+    added_rows: int
+    duplicate_rows: int
+    corrected_rows: int = 0
+
+
+@dataclass(frozen=True, eq=False)
+class TradeLedger:
+    """
+    Append-only store of normalized IBKR trade rows, written as Parquet parts partitioned by trade year.
+
+    Rows carry the projected `trades` section attributes of `IbkrStatementSet` and are unique on
+    `ledger_key`: row tag, account and trade id, or the full-row digest for rows without an id
+    (closed lots). `content_hash` covers the projected attributes, so a statement that re-issues a
+    trade with changed values is recognized as a correction. The manifest records every ingested file
+    by content hash and the parts that hold its rows; parts not listed in the manifest are never read.
+    A ledger has a single writer.
+    """
+
+    root: Path
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / LEDGER_MANIFEST_FILE
+
+    def read_manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {
+                "ledger_version": LEDGER_VERSION,
+                "parser_version": PARSER_VERSION,
+                "files": {},
+                "parts": [],
+                "next_part": 0,
+            }
+        with open(self.manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("ledger_version") != LEDGER_VERSION or manifest.get("parser_version") != PARSER_VERSION:
+            raise ValueError(
+                f"Trade ledger at {self.root} was built with ledger/parser version "
+                f"{manifest.get('ledger_version')}/{manifest.get('parser_version')}, expected "
+                f"{LEDGER_VERSION}/{PARSER_VERSION}. Rebuild it by ingesting the statements into an empty directory."
+            )
+        return manifest
+
+    def ingest(
+        self,
+        file_path: Union[str, Path, Sequence[str]],
+        *,
+        cache_dir: str | Path | None = None,
+        max_workers: int | None = None,
+    ) -> LedgerIngestResult:
+        """
+        Adds trade rows from statement files whose content has not been ingested before.
+
+        Rows whose `ledger_key` and content are already in the ledger (or repeated within this batch) are
+        skipped, so overlapping statement exports only contribute their new trades. A row whose key is known
+        but whose content differs replaces the stored row: the parts holding it are rewritten without it.
+        Within one batch, the row from the last file (in resolved path order) wins.
+        """
+        if isinstance(file_path, Path):
+            file_path = str(file_path)
+        file_paths = resolve_input_file_paths(file_path, suffix=".xml")
+        if not file_paths:
+            raise FileNotFoundError(f"No files matched the pattern: {file_path}")
+
+        manifest = self.read_manifest()
+        digests = {path: file_digest(path) for path in file_paths}
+        new_paths = [path for path in file_paths if digests[path] not in manifest["files"]]
+        skipped_paths = tuple(path for path in file_paths if digests[path] in manifest["files"])
+        if not new_paths:
+            logging.info("Trade ledger at %s is up to date; skipped %d file(s)", self.root, len(skipped_paths))
+            return LedgerIngestResult((), skipped_paths, 0, 0)
+
+        trades_df = IbkrStatementSet.load(new_paths, cache_dir=cache_dir, max_workers=max_workers).trades
+        trades_df = _with_ledger_columns(trades_df) if not trades_df.is_empty() else _empty_ledger_frame()
+        batch_height = trades_df.height
+        trades_df = trades_df.unique(subset=[LEDGER_KEY_COL, LEDGER_CONTENT_COL], keep="first", maintain_order=True)
+        trades_df = trades_df.unique(subset=[LEDGER_KEY_COL], keep="last", maintain_order=True)
+        stored_keys = self.read_keys(manifest)
+        trades_df = trades_df.join(stored_keys, on=[LEDGER_KEY_COL, LEDGER_CONTENT_COL], how="anti")
+        corrected_keys = trades_df.join(stored_keys, on=LEDGER_KEY_COL, how="semi")[LEDGER_KEY_COL]
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not corrected_keys.is_empty():
+            self._drop_rows(manifest, corrected_keys)
+        rows_added_by_file = trades_df.group_by(SOURCE_FILE_COL).len()
+        rows_added = dict(zip(rows_added_by_file[SOURCE_FILE_COL], rows_added_by_file["len"]))
+        for year_df in trades_df.partition_by("year", maintain_order=True):
+            year = year_df["year"][0]
+            part_path = _allocate_part_path(manifest, year)
+            _write_atomic_parquet(year_df.drop("year"), self.root / part_path)
+            manifest["parts"].append({"path": part_path.as_posix(), "year": year, "rows": year_df.height})
+        for path in new_paths:
+            manifest["files"][digests[path]] = {"path": path, "rows_added": rows_added.get(path, 0)}
+        _write_atomic_json(manifest, self.manifest_path)
+
+        result = LedgerIngestResult(
+            ingested_files=tuple(new_paths),
+            skipped_files=skipped_paths,
+            added_rows=trades_df.height - corrected_keys.len(),
+            duplicate_rows=batch_height - trades_df.height,
+            corrected_rows=corrected_keys.len(),
+        )
+        logging.info(
+            "Ingested %d file(s) into trade ledger at %s: %d new row(s), %d corrected, %d duplicate(s), "
+            "%d file(s) already ingested",
+            len(result.ingested_files),
+            self.root,
+            result.added_rows,
+            result.corrected_rows,
+            result.duplicate_rows,
+            len(result.skipped_files),
+        )
+        return result
+
+    def read_keys(self, manifest: dict | None = None) -> pl.DataFrame:
+        manifest = manifest if manifest is not None else self.read_manifest()
+        columns = [LEDGER_KEY_COL, LEDGER_CONTENT_COL]
+        frames = [pl.read_parquet(self.root / part["path"], columns=columns) for part in manifest["parts"]]
+        return pl.concat(frames) if frames else pl.DataFrame(schema={column: pl.String for column in columns})
+
+    def _drop_rows(self, manifest: dict, ledger_keys: pl.Series) -> None:
+        """Rewrites the parts holding `ledger_keys` without those rows, as new parts listed in `manifest`."""
+        parts = []
+        for part in manifest["parts"]:
+            part_df = pl.read_parquet(self.root / part["path"])
+            kept_df = part_df.filter(~pl.col(LEDGER_KEY_COL).is_in(ledger_keys.implode()))
+            if kept_df.height == part_df.height:
+                parts.append(part)
+                continue
+            logging.info(
+                "Replacing %d corrected row(s) of trade ledger part %s", part_df.height - kept_df.height, part["path"]
+            )
+            if kept_df.is_empty():
+                continue
+            # The superseded part stays on disk until the manifest stops listing it, so a failed ingest changes nothing.
+            part_path = _allocate_part_path(manifest, part["year"])
+            _write_atomic_parquet(kept_df, self.root / part_path)
+            parts.append({"path": part_path.as_posix(), "year": part["year"], "rows": kept_df.height})
+        manifest["parts"] = parts
+
+    def read_trades(self, years: Collection[int] | None = None) -> pl.DataFrame:
+        """Ledger rows in ingestion order, optionally limited to the given trade years."""
+        manifest = self.read_manifest()
+        wanted_years = {str(year) for year in years} if years is not None else None
+        frames = [
+            pl.read_parquet(self.root / part["path"])
+            for part in manifest["parts"]
+            if wanted_years is None or part["year"] in wanted_years
+        ]
+        return pl.concat(frames, how="diagonal") if frames else pl.DataFrame()
+
+    def to_statement_set(self, years: Collection[int] | None = None) -> IbkrStatementSet:
+        """Trade history read from the ledger, usable wherever an IBKR trade-history source is accepted."""
+        manifest = self.read_manifest()
+        trades_df = self.read_trades(years)
+        if not trades_df.is_empty():
+            trades_df = trades_df.drop(LEDGER_KEY_COL, LEDGER_CONTENT_COL)
+        return IbkrStatementSet(
+            file_paths=tuple(entry["path"] for entry in manifest["files"].values()),
+            cash_transactions=pl.DataFrame(),
+            corporate_actions=pl.DataFrame(),
+            trades=trades_df,
+            dividend_accruals=pl.DataFrame(),
+        )
+
+
+def _with_ledger_columns(trades_df: pl.DataFrame) -> pl.DataFrame:
+    trade_id = pl.coalesce(_id_column("tradeID"), _id_column("transactionID"), _id_column("ibOrderID"))
+    identity_key = pl.concat_str([pl.col(ROW_TAG_COL), pl.col("accountId").fill_null(""), trade_id], separator="|")
+    row_key = pl.concat_str([pl.lit("row"), pl.col(ROW_TAG_COL), pl.col(ROW_DIGEST_COL)], separator="|")
+    content = pl.concat_str(
+        [pl.col(ROW_TAG_COL)] + [pl.col(col).fill_null("") for col in IBKR_STATEMENT_COLUMNS["trades"]],
+        separator="\x1f",
+    )
+    trade_date = pl.coalesce(pl.col("dateTime"), pl.col("tradeDate"))
+    return trades_df.with_columns(
+        pl.when(pl.col(ROW_TAG_COL).is_in(list(IBKR_TRADE_ROW_TAGS)) & trade_id.is_not_null())
+        .then(identity_key)
+        .otherwise(row_key)
+        .alias(LEDGER_KEY_COL),
+        # A stable digest rather than Expr.hash, whose values may change between Polars releases.
+        content.map_elements(_content_hash, return_dtype=pl.String).alias(LEDGER_CONTENT_COL),
+        trade_date.str.slice(0, 4).fill_null(UNKNOWN_YEAR_PARTITION).alias("year"),
+    )
+
+
+def _id_column(name: str) -> pl.Expr:
+    # IBKR writes missing ids as empty attributes; those rows must fall back to the row-digest key.
+    value = pl.col(name).str.strip_chars()
+    return pl.when(value == "").then(None).otherwise(value)
+
+
+def _allocate_part_path(manifest: dict, year: str) -> Path:
+    # Part numbers are never reused, so a new part can't overwrite one the on-disk manifest still lists.
+    number = manifest["next_part"]
+    manifest["next_part"] = number + 1
+    return Path(f"year={year}") / f"part-{number:06d}.parquet"
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def _empty_ledger_frame() -> pl.DataFrame:
+    return pl.DataFrame(
+        schema={
+            SOURCE_FILE_COL: pl.String,
+            LEDGER_KEY_COL: pl.String,
+            LEDGER_CONTENT_COL: pl.String,
+            "year": pl.String,
+        }
+    )
+
+
+def _write_atomic_parquet(df: pl.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".parquet")
+    os.close(fd)
+    try:
+        df.write_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _write_atomic_json(payload: dict, path: Path) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
@@ -1,9 +1,13 @@
 import glob
 import json
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from decimal import Decimal
+from functools import partial
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Callable, Sequence, TypeGuard, Union
+from typing import Callable, Collection, Iterator, Mapping, Sequence, TypeGuard, Union
 
 import lxml.etree as etree
 import polars as pl
@@ -24,7 +28,9 @@ def has_rows(df: pl.DataFrame | None) -> TypeGuard[pl.DataFrame]:
 
 
 # Helper function to extract elements into a list of dictionaries
-def extract_elements(parent, tag):
+def extract_elements(parent, tag, columns: Sequence[str] | None = None):
+    if columns is not None:
+        return [{key: element.get(key) for key in columns} for element in parent.findall(tag)]
     return [{key: element.get(key) for key in element.keys()} for element in parent.findall(tag)]
 
 
@@ -59,17 +65,179 @@ def resolve_input_file_paths(file_path: Union[str, Sequence[str]], *, suffix: st
     return resolved_paths
 
 
+def iter_xml_section_elements(
+    path: str,
+    section_tags: Collection[str],
+    row_tags: Collection[str],
+) -> Iterator[etree._Element]:
+    """
+    Streams row elements from selected sections of one XML file without building the whole DOM.
+
+    Only elements tagged with one of `row_tags` whose direct parent is tagged with one of `section_tags`
+    are yielded, in document order. Each element is cleared as soon as the consumer moves on, so read
+    its attributes before advancing; peak memory stays flat regardless of the file size.
+    """
+    section_tags = set(section_tags)
+    row_tags = set(row_tags)
+    for _, element in etree.iterparse(path, events=("end",)):
+        if element.tag in row_tags:
+            parent = element.getparent()
+            if parent is not None and parent.tag in section_tags:
+                yield element
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def iter_xml_section_rows(
+    path: str,
+    section_tags: Collection[str],
+    row_tags: Collection[str],
+    columns: Sequence[str] | None = None,
+) -> Iterator[tuple[str, dict[str, str | None]]]:
+    """
+    Streams `(row_tag, attributes)` pairs from selected sections of one XML file.
+
+    With `columns`, each row holds exactly those attributes (None when absent) and the rest are never copied.
+    """
+    for element in iter_xml_section_elements(path, section_tags, row_tags):
+        if columns is None:
+            yield element.tag, dict(element.attrib)
+        else:
+            yield element.tag, {key: element.get(key) for key in columns}
+
+
+def _resolve_projection(
+    columns: Sequence[str] | None,
+    schema: Mapping[str, pl.DataType] | None,
+) -> tuple[str, ...] | None:
+    if columns is None:
+        return tuple(schema) if schema else None
+    unknown_columns = sorted(set(schema or {}) - set(columns))
+    if unknown_columns:
+        raise ValueError(f"Schema columns are not part of the projection: {unknown_columns}")
+    return tuple(columns)
+
+
+def _cast_raw_column(name: str, dtype: pl.DataType) -> pl.Expr:
+    if dtype == pl.String:
+        return pl.col(name)
+    value = pl.col(name).str.strip_chars()
+    value = pl.when(value == "").then(None).otherwise(value)
+    if dtype == pl.Date:
+        return value.str.to_date().alias(name)
+    if dtype == pl.Datetime:
+        return value.str.to_datetime().cast(dtype).alias(name)
+    return value.cast(dtype).alias(name)
+
+
+def columns_to_df(
+    values_by_column: Mapping[str, list[str | None]],
+    schema: Mapping[str, pl.DataType] | None = None,
+) -> pl.DataFrame:
+    """
+    Builds a frame from raw attribute column builders, casting the columns named in `schema`.
+
+    Columns without a schema entry stay String; empty attribute values become nulls before a typed cast.
+    """
+    df = pl.DataFrame(dict(values_by_column), schema={name: pl.String for name in values_by_column})
+    if not schema:
+        return df
+    return df.with_columns([_cast_raw_column(name, dtype) for name, dtype in schema.items()])
+
+
+def _read_xml_sections_file(
+    path: str,
+    section_tags: Collection[str],
+    row_tags: Collection[str],
+    columns: Sequence[str] | None = None,
+    schema: Mapping[str, pl.DataType] | None = None,
+) -> pl.DataFrame:
+    try:
+        if columns is None:
+            rows = [row for _, row in iter_xml_section_rows(path, section_tags, row_tags)]
+        else:
+            values_by_column: dict[str, list[str | None]] = {column: [] for column in columns}
+            for element in iter_xml_section_elements(path, section_tags, row_tags):
+                for column, values in values_by_column.items():
+                    values.append(element.get(column))
+    except Exception as e:
+        raise ValueError(f"Failed to read XML file at {path}: {e}")
+    if columns is None:
+        return pl.DataFrame(rows, infer_schema_length=None) if rows else pl.DataFrame()
+    return columns_to_df(values_by_column, schema)
+
+
+def read_xml_sections_to_df(
+    file_path: Union[str, Sequence[str]],
+    section_tags: Collection[str],
+    row_tags: Collection[str],
+    *,
+    dedupe: bool = False,
+    max_workers: int | None = None,
+    columns: Sequence[str] | None = None,
+    schema: Mapping[str, pl.DataType] | None = None,
+) -> pl.DataFrame:
+    """
+    Streams rows of the requested XML sections into a Polars DataFrame.
+
+    Args:
+        file_path: Path to an XML file, a wildcard pattern, a directory, or a list of those.
+        section_tags: Parent element tags to read rows from, e.g. `CashTransactions`.
+        row_tags: Row element tags to keep, e.g. `CashTransaction`.
+        max_workers: Parse files in a process pool of this size; frames are combined in path order.
+        columns: Attributes to read; all others are skipped. Defaults to the `schema` keys when only a schema is given.
+        schema: Dtypes for projected columns; unlisted columns stay String.
+
+    Returns:
+        pl.DataFrame: One column per projected attribute, or one String column per attribute seen
+        across all matched rows when no projection is given.
+    """
+    file_paths = resolve_input_file_paths(file_path, suffix=".xml")
+
+    if not file_paths:
+        raise FileNotFoundError(f"No files matched the pattern: {file_path}")
+
+    columns = _resolve_projection(columns, schema)
+    read_file = partial(
+        _read_xml_sections_file,
+        section_tags=set(section_tags),
+        row_tags=set(row_tags),
+        columns=columns,
+        schema=dict(schema) if schema else None,
+    )
+    if max_workers is not None and max_workers > 1 and len(file_paths) > 1:
+        # Polars is multi-threaded and not fork-safe, so workers are spawned fresh.
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(file_paths)), mp_context=get_context("spawn")
+        ) as executor:
+            frames = list(executor.map(read_file, file_paths))
+    else:
+        frames = [read_file(path) for path in file_paths]
+
+    frames = [frame for frame in frames if not frame.is_empty()]
+    if not frames:
+        return pl.DataFrame()
+
+    df = pl.concat(frames, how="diagonal")
+    return df.unique(maintain_order=True) if dedupe else df
+
+
 def read_xml_to_df(
     file_path: Union[str, Sequence[str]],
     xml_extract_func: Callable[[etree._Element], list[dict]],
     *,
     dedupe: bool = False,
+    columns: Sequence[str] | None = None,
+    schema: Mapping[str, pl.DataType] | None = None,
 ) -> pl.DataFrame:
     """
     Reads XML files into a Polars DataFrame. Supports reading multiple files matching a wildcard pattern.
 
     Args:
         file_path: Path to an XML file, a wildcard pattern, a directory, or a list of those.
+        columns: Keys to keep from the extracted rows, loaded into column builders instead of inferring a schema.
+        schema: Dtypes for projected columns; unlisted columns stay String.
 
     Returns:
         pl.DataFrame: Combined DataFrame containing data from all matched XML files.
@@ -79,6 +247,8 @@ def read_xml_to_df(
     if not file_paths:
         raise FileNotFoundError(f"No files matched the pattern: {file_path}")
 
+    columns = _resolve_projection(columns, schema)
+
     # Read and combine all XML files into a single DataFrame
     dfs = []
     for path in file_paths:
@@ -86,7 +256,10 @@ def read_xml_to_df(
             tree = etree.parse(path)
             root = tree.getroot()
             data = xml_extract_func(root)
-            df = pl.DataFrame(data)
+            if columns is None:
+                df = pl.DataFrame(data)
+            else:
+                df = columns_to_df({column: [row.get(column) for row in data] for column in columns}, schema)
 
             dfs.append(df)
         except Exception as e:
@@ -127,74 +300,98 @@ def read_csv_to_df(file_path: Union[str, Sequence[str]]) -> pl.DataFrame:
     return pl.concat(dfs, how="vertical")
 
 
-def join_exchange_rates(df: pl.DataFrame, rates_df: pl.DataFrame, df_date_col: str) -> pl.DataFrame:
-    if Column.currency not in df.columns:
-        raise ValueError("df is missing a 'currency' column.")
-
-    rates_df_required_cols: set[str] = {Column.currency.value, Column.rate_date.value, Column.exchange_rate.value}
-    rates_df_missing_cols = rates_df_required_cols - set(rates_df.columns)
-    if rates_df_missing_cols != set():
-        raise ValueError(f"rates_df is missing the following required columns: {rates_df_missing_cols}")
+FxRatesSource = Union["FxJoiner", pl.DataFrame]
 
-    # Ensure the all required currencies are present in rates_df
-    df_currencies = set(df[Column.currency].unique().to_list())
-    rates_df_currencies = set(rates_df[Column.currency].unique().to_list())
-    rates_df_currencies.add(CurrencyCode.euro)  # We are converting to Euro thus we can assume its there
+FX_MATCH_COL = "fx_match"
+FX_MATCH_INEXACT = "inexact"
+FX_MATCH_MISSING = "missing"
 
-    rates_df_missing_currencies = df_currencies.difference(rates_df_currencies)
-    if rates_df_missing_currencies:
-        raise ValueError(f"rates_df is missing the following currencies: {rates_df_missing_currencies}")
 
-    # order here is important for join_asof
-    rates_df = rates_df.sort([Column.currency, Column.rate_date])
-    df = df.sort([Column.currency, df_date_col])
+@dataclass(frozen=True, eq=False)
+class FxJoiner:
+    """
+    Exchange rates sorted once per run for as-of joins onto provider frames.
 
-    joined_df = df.join_asof(
-        rates_df,
-        left_on=df_date_col,
-        right_on=Column.rate_date,
-        by=Column.currency,
-        strategy="backward",  # Fallback to the previous available date
-    )
+    Rows take the latest rate on or before their date, at most `tolerance_days` old; EUR rows need no rate.
+    """
 
-    # For non-EUR rows, null means we could not find any usable rate at or before transaction date.
-    null_rate_df = joined_df.filter((pl.col(Column.currency) != CurrencyCode.euro) & pl.col(Column.rate_date).is_null())
-    if not null_rate_df.is_empty():
-        logging.error(f"\nFailed to match exchange rate for some non-EUR rows:\n{null_rate_df}")
-        raise ValueError("Some dates did not match. See the logs above.")
+    rates_df: pl.DataFrame
+    currencies: frozenset[str]
+    tolerance_days: int = EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
+
+    @classmethod
+    def from_rates_df(
+        cls, rates_df: pl.DataFrame, *, tolerance_days: int = EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET
+    ) -> "FxJoiner":
+        rates_df_required_cols: set[str] = {Column.currency.value, Column.rate_date.value, Column.exchange_rate.value}
+        rates_df_missing_cols = rates_df_required_cols - set(rates_df.columns)
+        if rates_df_missing_cols != set():
+            raise ValueError(f"rates_df is missing the following required columns: {rates_df_missing_cols}")
+        return cls(
+            # order here is important for join_asof
+            rates_df=rates_df.sort([Column.currency, Column.rate_date]),
+            currencies=frozenset(rates_df[Column.currency].unique().to_list()) | {CurrencyCode.euro.value},
+            tolerance_days=tolerance_days,
+        )
 
-    # Non-exact matches are allowed only within an acceptable offset.
-    unmatched_dates_df = joined_df.filter(
-        (pl.col(Column.currency) != CurrencyCode.euro) & (pl.col(Column.rate_date) != pl.col(df_date_col))
-    )
-    if unmatched_dates_df.shape[0] > 0:
-        logging.warning(f"\nSome dates did not match exactly, double check:\n{unmatched_dates_df}")
+    @classmethod
+    def coerce(cls, source: FxRatesSource) -> "FxJoiner":
+        return source if isinstance(source, FxJoiner) else cls.from_rates_df(source)
 
-        mismatches_in_acceptable_range_df = unmatched_dates_df.filter(
-            pl.col(Column.rate_date).is_between(
-                pl.col(df_date_col).dt.offset_by(f"-{EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET}d"),
-                pl.col(df_date_col).dt.offset_by(f"{EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET}d"),
-            )
-        )
+    def join(self, df: pl.DataFrame, df_date_col: str) -> pl.DataFrame:
+        """As-of joins the rates onto `df` (sorted by currency and date) and fails if a non-EUR row has no usable rate."""
+        joined_df = self.join_unchecked(df, df_date_col)
+        diagnostics_df = self.match_diagnostics(joined_df, df_date_col)
+        if diagnostics_df.is_empty():
+            return joined_df
 
-        if mismatches_in_acceptable_range_df.shape[0] != unmatched_dates_df.shape[0]:
-            unacceptable_date_mismatch = unmatched_dates_df.join(
-                mismatches_in_acceptable_range_df,
-                on=unmatched_dates_df.columns,
-                how="anti",
-            )
+        missing_df = diagnostics_df.filter(pl.col(FX_MATCH_COL) == FX_MATCH_MISSING)
+        if not missing_df.is_empty():
             logging.error(
-                "A few matched rates are outside acceptable range of +-{} days:\n{}".format(
-                    EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET, unacceptable_date_mismatch
-                ),
+                f"\nFailed to match an exchange rate at most {self.tolerance_days} days old "
+                f"for some non-EUR rows:\n{missing_df}"
             )
             raise ValueError("Some dates did not match. See the logs above.")
 
         logging.warning(
-            f"\nSome dates did not match exactly, but all are within +- {EXCHANGE_RATE_DATES_ACCEPTABLE_OFFSET} day.",
+            f"\nSome dates did not match exactly, but all are within {self.tolerance_days} days, "
+            f"double check:\n{diagnostics_df}"
+        )
+        return joined_df
+
+    def join_unchecked(self, df: pl.DataFrame, df_date_col: str) -> pl.DataFrame:
+        if Column.currency not in df.columns:
+            raise ValueError("df is missing a 'currency' column.")
+
+        missing_currencies = set(df[Column.currency].unique().to_list()) - self.currencies
+        if missing_currencies:
+            raise ValueError(f"rates_df is missing the following currencies: {missing_currencies}")
+
+        return df.sort([Column.currency, df_date_col]).join_asof(
+            self.rates_df,
+            left_on=df_date_col,
+            right_on=Column.rate_date,
+            by=Column.currency,
+            strategy="backward",  # Fallback to the previous available date
+            tolerance=f"{self.tolerance_days}d",
+            check_sortedness=False,  # both sides are sorted by currency, then date
         )
 
-    return joined_df
+    def match_diagnostics(self, joined_df: pl.DataFrame, df_date_col: str) -> pl.DataFrame:
+        """Non-EUR rows of a joined frame without an exact-date rate, labelled `inexact` or `missing` in `fx_match`."""
+        rate_date = pl.col(Column.rate_date)
+        return joined_df.filter(
+            (pl.col(Column.currency) != CurrencyCode.euro) & (rate_date.is_null() | (rate_date != pl.col(df_date_col)))
+        ).with_columns(
+            pl.when(rate_date.is_null())
+            .then(pl.lit(FX_MATCH_MISSING))
+            .otherwise(pl.lit(FX_MATCH_INEXACT))
+            .alias(FX_MATCH_COL)
+        )
+
+
+def join_exchange_rates(df: pl.DataFrame, rates_df: FxRatesSource, df_date_col: str) -> pl.DataFrame:
+    return FxJoiner.coerce(rates_df).join(df, df_date_col)
 
 
 def convert_to_euro(df: pl.DataFrame, col_to_convert: Union[str, Sequence[str]]) -> pl.DataFrame:
@@ -1,7 +1,18 @@
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
 import polars as pl
 import pytest
 
-from tax_automation.currencies import ExchangeRates
+from tax_automation.currencies import ExchangeRates, load_ecb_csv
+from tax_automation.ecb_client import EcbFetchClient
+from tax_automation.fx_calendar import FxCalendar
+from tax_automation.fx_repository import FxRepository
+from tax_automation.fx_requirements import FxRequirements
 
 
 @pytest.mark.parametrize(
@@ -41,3 +52,245 @@ def test_exchange_rates_validation_fail_fast(rows, start_date, end_date, currenc
             overwrite=False,
             raw_file_path=str(rates_path),
         )
+
+
+@pytest.fixture
+def ecb_stub():
+    """
+    Local stand-in for the ECB EXR endpoint: serves a fixed rate for every weekday in the requested period.
+
+    Every response carries an ETag, a matching `If-None-Match` is answered with 304, and `fail_next`
+    makes the next requests fail with 503.
+    """
+    stub = SimpleNamespace(base_url="", requests=[], statuses=[], fail_next=0)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            currencies = tuple(parsed.path.rsplit("/", 1)[-1].split(".")[1].split("+"))
+            query = parse_qs(parsed.query)
+            start = date.fromisoformat(query["startPeriod"][0])
+            end = date.fromisoformat(query["endPeriod"][0])
+            etag = f'"{"+".join(currencies)}-{start}-{end}"'
+            with lock:
+                stub.requests.append((currencies, start, end))
+                failing = stub.fail_next > 0
+                stub.fail_next -= failing
+            lines = ["KEY,FREQ,CURRENCY,CURRENCY_DENOM,TIME_PERIOD,OBS_VALUE"]
+            day = start
+            while day <= end:
+                if day.weekday() < 5:
+                    lines += [f"EXR.D.{ccy}.EUR.SP00.A,D,{ccy},EUR,{day.isoformat()},1.1" for ccy in currencies]
+                day += timedelta(days=1)
+            if failing:
+                status = 503
+            elif len(lines) == 1:
+                status = 404
+            elif self.headers.get("If-None-Match") == etag:
+                status = 304
+            else:
+                status = 200
+            with lock:
+                stub.statuses.append(status)
+            self.send_response(status)
+            if status != 200:
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = "\n".join(lines).encode()
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.base_url = f"http://127.0.0.1:{server.server_port}/service/data/EXR"
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+def test_fx_repository_fetches_only_missing_dates(ecb_stub, tmp_path):
+    requests_seen = ecb_stub.requests
+    repository = FxRepository(tmp_path / "ecb", base_url=ecb_stub.base_url)
+    today = date(2025, 1, 1)
+
+    rates_df = repository.get_rates(date(2024, 1, 10), date(2024, 6, 30), today=today)
+
+    assert requests_seen == [(("USD", "GBP"), date(2024, 1, 3), date(2024, 7, 7))]
+    assert rates_df.columns == ["rate_date", "currency", "currency_denom", "exchange_rate"]
+    assert set(rates_df["currency"].to_list()) == {"USD", "GBP"}
+    assert rates_df["exchange_rate"][0] == Decimal("1.1")
+
+    requests_seen.clear()
+    repository.get_rates(date(2024, 2, 1), date(2024, 5, 1), today=today)
+    assert requests_seen == []
+
+    extended_df = repository.get_rates(date(2024, 1, 10), date(2024, 7, 7), currencies=("USD",), today=today)
+    assert requests_seen == [(("USD",), date(2024, 7, 8), date(2024, 7, 14))]
+    assert extended_df["rate_date"].max() == date(2024, 7, 12)
+    assert repository.read_coverage()["USD"] == [(date(2024, 1, 3), date(2024, 7, 14))]
+    assert repository.read_coverage()["GBP"] == [(date(2024, 1, 3), date(2024, 7, 7))]
+
+
+def test_fx_repository_does_not_record_unpublished_dates(ecb_stub, tmp_path):
+    requests_seen = ecb_stub.requests
+    repository = FxRepository(tmp_path / "ecb", base_url=ecb_stub.base_url)
+
+    repository.get_rates(date(2024, 12, 20), date(2024, 12, 31), currencies=("USD",), today=date(2025, 1, 2))
+    repository.get_rates(date(2024, 12, 20), date(2024, 12, 31), currencies=("USD",), today=date(2025, 1, 6))
+
+    assert requests_seen == [
+        (("USD",), date(2024, 12, 13), date(2025, 1, 1)),
+        (("USD",), date(2025, 1, 2), date(2025, 1, 5)),
+    ]
+
+
+def test_fx_calendar_forward_fills_and_rejects_stale_rates():
+    rates_df = pl.DataFrame(
+        {
+            "rate_date": [date(2024, 1, 5), date(2024, 1, 8), date(2024, 1, 5)],
+            "currency": ["USD", "USD", "GBP"],
+            "currency_denom": ["EUR", "EUR", "EUR"],
+            "exchange_rate": [Decimal("1.1"), Decimal("1.2"), Decimal("0.86")],
+        }
+    )
+    calendar = FxCalendar.from_rates_df(rates_df, currencies=("USD", "EUR"))
+
+    assert calendar.lookup("USD", date(2024, 1, 7)) == (Decimal("1.1"), date(2024, 1, 5))
+    assert calendar.lookup("USD", date(2024, 1, 8)) == (Decimal("1.2"), date(2024, 1, 8))
+    assert calendar.lookup("USD", date(2024, 1, 15)) == (Decimal("1.2"), date(2024, 1, 8))
+    assert calendar.rate("EUR", date(2024, 1, 1)) == Decimal("1")
+    with pytest.raises(ValueError, match="too old"):
+        calendar.rate("USD", date(2024, 1, 16))
+    with pytest.raises(ValueError, match="on or before"):
+        calendar.rate("USD", date(2024, 1, 4))
+    with pytest.raises(ValueError, match="Missing FX series for currency GBP"):
+        calendar.rate("GBP", date(2024, 1, 5))
+    with pytest.raises(ValueError, match="Missing FX series for currency CHF"):
+        FxCalendar.from_rates_df(rates_df, currencies=("CHF",))
+
+
+def test_fx_calendar_bulk_lookup_matches_single_lookups():
+    rates_df = pl.DataFrame(
+        {
+            "rate_date": [date(2024, 1, 5), date(2024, 1, 8)],
+            "currency": ["USD", "USD"],
+            "currency_denom": ["EUR", "EUR"],
+            "exchange_rate": [Decimal("1.1"), Decimal("1.2")],
+        }
+    )
+    calendar = FxCalendar.from_rates_df(rates_df)
+    currencies = ["USD", "EUR", "USD", "USD", "GBP"]
+    event_dates = [date(2024, 1, 7), date(2024, 1, 7), date(2024, 1, 9), date(2024, 1, 16), date(2024, 1, 7)]
+
+    fx_df = calendar.lookup_many(
+        currencies, event_dates, [Decimal("11"), Decimal("5"), Decimal("1.25"), Decimal("1"), Decimal("1")], strict=False
+    )
+
+    assert fx_df["fx_rate"].to_list()[:3] == [calendar.rate(c, d) for c, d in zip(currencies[:3], event_dates[:3])]
+    assert fx_df["fx_date"].to_list() == [date(2024, 1, 5), date(2024, 1, 7), date(2024, 1, 8), date(2024, 1, 8), None]
+    assert fx_df["fx_stale"].to_list() == [False, False, False, True, None]
+    assert fx_df["amount_eur"].to_list()[:3] == [Decimal("10"), Decimal("5"), Decimal("1.041667")]
+    with pytest.raises(ValueError, match="too old"):
+        calendar.lookup_many(currencies[:4], event_dates[:4])
+
+
+def test_load_ecb_csv_reuses_parquet_sidecar_until_csv_changes(tmp_path):
+    rates_path = tmp_path / "rates.csv"
+    rows = [{"TIME_PERIOD": "2025-01-02", "CURRENCY": "USD", "CURRENCY_DENOM": "EUR", "OBS_VALUE": "1.0345675"}]
+    pl.DataFrame(rows).write_csv(rates_path)
+
+    rates_df = load_ecb_csv(rates_path)
+
+    assert rates_df["exchange_rate"].to_list() == [Decimal("1.034568")]
+    assert (tmp_path / "rates.parquet").exists()
+    assert load_ecb_csv(rates_path).equals(rates_df)
+
+    pl.DataFrame(rows + [{**rows[0], "TIME_PERIOD": "2025-01-03", "OBS_VALUE": "1.1"}]).write_csv(rates_path)
+    assert load_ecb_csv(rates_path)["rate_date"].to_list() == [date(2025, 1, 2), date(2025, 1, 3)]
+
+
+def test_fx_repository_publishes_immutable_snapshots(ecb_stub, tmp_path):
+    repository = FxRepository(tmp_path / "ecb", base_url=ecb_stub.base_url)
+    today = date(2025, 1, 1)
+
+    repository.get_rates(date(2024, 1, 10), date(2024, 1, 31), currencies=("USD",), today=today)
+    first = repository.read_snapshot()
+    first_df = repository.read_observations(first)
+    repository.get_rates(date(2024, 1, 10), date(2024, 2, 29), currencies=("USD",), today=today)
+    second = repository.read_snapshot()
+    repository.get_rates(date(2024, 1, 10), date(2024, 3, 31), currencies=("USD",), today=today)
+    third = repository.read_snapshot()
+
+    assert [first.version, second.version, third.version] == [1, 2, 3]
+    assert first.observations_file.endswith(".arrow")
+    assert repository.read_observations(third)["rate_date"].max() == date(2024, 4, 5)
+    assert repository.read_observations(second)["rate_date"].min() == first_df["rate_date"].min()
+    assert not (tmp_path / "ecb" / first.observations_file).exists()
+    assert sorted(path.name for path in (tmp_path / "ecb").glob("*.arrow")) == sorted(
+        [second.observations_file, third.observations_file]
+    )
+
+
+def test_ecb_client_fetches_chunks_concurrently(ecb_stub):
+    with EcbFetchClient(ecb_stub.base_url, chunk_days=31, currencies_per_request=1, max_workers=4) as client:
+        rates_df = client.fetch(("USD", "GBP"), date(2024, 1, 1), date(2024, 3, 15))
+
+    assert sorted(ecb_stub.requests) == sorted(
+        [
+            ((currency,), start, end)
+            for currency in ("USD", "GBP")
+            for start, end in [
+                (date(2024, 1, 1), date(2024, 1, 31)),
+                (date(2024, 2, 1), date(2024, 3, 2)),
+                (date(2024, 3, 3), date(2024, 3, 15)),
+            ]
+        ]
+    )
+    assert rates_df.columns == ["rate_date", "currency", "currency_denom", "exchange_rate"]
+    assert rates_df.group_by("currency").len().sort("currency")["len"].to_list() == [55, 55]
+    assert rates_df.filter(pl.col("currency") == "USD")["rate_date"].is_sorted()
+
+
+def test_ecb_client_retries_and_revalidates_cached_chunks(ecb_stub, tmp_path):
+    ecb_stub.fail_next = 2
+    with EcbFetchClient(ecb_stub.base_url, backoff_seconds=0, cache_dir=tmp_path / "http") as client:
+        first_df = client.fetch(("USD",), date(2024, 1, 1), date(2024, 1, 31))
+        second_df = client.fetch(("USD",), date(2024, 1, 1), date(2024, 1, 31))
+
+    assert ecb_stub.statuses == [503, 503, 200, 304]
+    assert second_df.equals(first_df)
+    assert first_df.height == 23
+
+    ecb_stub.fail_next = 10
+    with EcbFetchClient(ecb_stub.base_url, retries=1, backoff_seconds=0) as client:
+        with pytest.raises(ValueError, match="HTTP Status Code: 503"):
+            client.fetch(("USD",), date(2024, 2, 1), date(2024, 2, 29))
+
+
+def test_fx_repository_fetches_required_rates_per_currency(ecb_stub, tmp_path):
+    repository = FxRepository(tmp_path / "ecb", base_url=ecb_stub.base_url)
+    requirements = FxRequirements.merge(
+        FxRequirements({"USD": (date(2024, 3, 11), date(2024, 3, 20)), "GBP": (date(2024, 6, 10), date(2024, 6, 12))}),
+        FxRequirements({"USD": (date(2024, 3, 15), date(2024, 4, 10))}),
+    )
+
+    rates_df = repository.get_required_rates(requirements, today=date(2025, 1, 1))
+
+    assert requirements.currencies == ("GBP", "USD")
+    assert requirements.span() == (date(2024, 3, 11), date(2024, 6, 12))
+    assert sorted(ecb_stub.requests) == [
+        (("GBP",), date(2024, 6, 3), date(2024, 6, 19)),
+        (("USD",), date(2024, 3, 4), date(2024, 4, 17)),
+    ]
+    bounds_df = rates_df.group_by("currency").agg(
+        pl.col("rate_date").min().alias("first_date"), pl.col("rate_date").max().alias("last_date")
+    )
+    assert bounds_df.sort("currency").rows() == [("GBP", date(2024, 6, 3), date(2024, 6, 19)), ("USD", date(2024, 3, 4), date(2024, 4, 17))]
@@ -1,11 +1,20 @@
-from datetime import date
+from datetime import date, datetime
+from decimal import Decimal
 from pathlib import Path
 
 import polars as pl
 import pytest
 from polars.testing.asserts import assert_frame_equal
 
+from tax_automation import ibkr_statements
+from tax_automation.broker_history import (
+    IbkrTradeIndex,
+    ibkr_trade_index,
+    load_ibkr_stock_like_trades,
+    load_ibkr_trade_table,
+)
 from tax_automation.const import Column
+from tax_automation.ibkr_statements import IbkrStatementSet
 from tax_automation.providers.ibkr import (
     IbkrSummarySection,
     apply_pivot,
@@ -16,6 +25,7 @@ from tax_automation.providers.ibkr import (
     process_cash_transactions_ibkr,
     process_trades_ibkr,
 )
+from tax_automation.trade_ledger import TradeLedger
 
 REPORTING_START_DATE = date(2024, 1, 1)
 REPORTING_END_DATE = date(2024, 12, 31)
@@ -262,6 +272,444 @@ def test_process_cash_transactions_ibkr(
     assert_frame_equal(res_df, expected)
 
 
+def test_ibkr_statement_set_is_shared_by_cash_and_bucket_consumers(
+    monkeypatch,
+    rates_df,
+    dividends_country_summary_no_etf_df,
+):
+    statements = IbkrStatementSet.load("tests/test_data/ibkr/For_tax_automation*")
+    assert not statements.cash_transactions.is_empty()
+    assert not statements.corporate_actions.is_empty()
+
+    def _fail_load(*args, **kwargs):
+        raise AssertionError("statement files must not be parsed again")
+
+    monkeypatch.setattr(IbkrStatementSet, "load", classmethod(_fail_load))
+
+    res_df, _, _ = process_cash_transactions_ibkr(
+        statements,
+        rates_df,
+        start_date=REPORTING_START_DATE,
+        end_date=REPORTING_END_DATE,
+        excluded_cash_transaction_subcategories={"ETF"},
+    )
+    buckets_df = build_finanzonline_dividend_buckets_ibkr(
+        statements,
+        rates_df,
+        start_date=REPORTING_START_DATE,
+        end_date=REPORTING_END_DATE,
+        excluded_cash_transaction_subcategories={"ETF"},
+    )
+
+    assert_frame_equal(res_df, dividends_country_summary_no_etf_df)
+    assert not buckets_df.is_empty()
+
+
+def test_ibkr_statement_set_keeps_first_source_of_overlapping_rows(tmp_path: Path):
+    row = _trade_confirm_row(
+        ticker="AAPL",
+        isin="US0378331005",
+        sub_category="COMMON",
+        trade_date="2024-02-01",
+        date_time="2024-02-01 10:00:00",
+        operation="BUY",
+        quantity="1",
+        price="100",
+        trade_id="t1",
+    )
+    _write_trade_history_xml(tmp_path / "a.xml", [row])
+    _write_trade_history_xml(tmp_path / "b.xml", [row])
+
+    statements = IbkrStatementSet.load(str(tmp_path))
+
+    assert statements.trade_rows().height == 1
+    assert statements.trades["source_statement_file"].to_list() == [str(tmp_path / "a.xml")]
+    assert statements.cash_transactions.is_empty()
+
+
+def test_ibkr_statement_set_keeps_rows_that_differ_only_in_unprojected_attributes(tmp_path: Path):
+    lots = [
+        _closed_lot_row(
+            ticker="AAPL",
+            isin="US0378331005",
+            sub_category="COMMON",
+            sale_date="2024-06-03",
+            sale_datetime="2024-06-03 10:00:00",
+            buy_datetime=buy_datetime,
+            quantity="1",
+            cost=cost,
+            pnl="10",
+            sale_trade_id="sell-1",
+        )
+        for buy_datetime, cost in (("2024-01-02 10:00:00", "100"), ("2024-02-02 10:00:00", "90"))
+    ]
+    _write_trade_history_xml(tmp_path / "a.xml", lots)
+    _write_trade_history_xml(tmp_path / "b.xml", lots)
+
+    statements = IbkrStatementSet.load(str(tmp_path))
+
+    assert statements.trade_rows(["Lot"]).height == 2
+    assert statements.trades["source_statement_file"].to_list() == [str(tmp_path / "a.xml")] * 2
+
+
+def test_ibkr_statement_set_reads_only_projected_attributes(tmp_path: Path):
+    row = _trade_confirm_row(
+        ticker="AAPL",
+        isin="US0378331005",
+        sub_category="COMMON",
+        trade_date="2024-02-01",
+        date_time="2024-02-01 10:00:00",
+        operation="BUY",
+        quantity="1",
+        price="100",
+        trade_id="t1",
+        extra_attrs={"fxRateToBase": "0.9", "listingExchange": "NASDAQ"},
+    )
+    _write_trade_history_xml(tmp_path / "a.xml", [row])
+
+    trades = IbkrStatementSet.load(str(tmp_path)).trades
+
+    assert "fxRateToBase" not in trades.columns
+    assert "listingExchange" not in trades.columns
+    assert trades.select("symbol", "tradePrice", "netCash").row(0) == ("AAPL", "100", None)
+
+
+def test_ibkr_statement_set_reads_parse_cache_on_rerun(tmp_path: Path, monkeypatch, caplog):
+    cache_dir = tmp_path / "cache"
+    first = IbkrStatementSet.load("tests/test_data/ibkr/For_tax_automation*", cache_dir=cache_dir)
+
+    def _fail_parse(path):
+        raise AssertionError(f"{path} should have been served from the parse cache")
+
+    monkeypatch.setattr(ibkr_statements, "_parse_statement_file", _fail_parse)
+    with caplog.at_level("INFO"):
+        second = IbkrStatementSet.load("tests/test_data/ibkr/For_tax_automation*", cache_dir=cache_dir)
+
+    assert "IBKR parse cache hit" in caplog.text
+    assert_frame_equal(second.cash_transactions, first.cash_transactions)
+    assert_frame_equal(second.corporate_actions, first.corporate_actions)
+    assert_frame_equal(second.trades, first.trades)
+    assert_frame_equal(second.dividend_accruals, first.dividend_accruals)
+
+
+def test_ibkr_statement_set_parse_cache_is_keyed_by_file_content(tmp_path: Path, caplog):
+    trade_path = tmp_path / "trades.xml"
+    cache_dir = tmp_path / "cache"
+    row_kwargs = dict(
+        ticker="AAPL",
+        isin="US0378331005",
+        sub_category="COMMON",
+        trade_date="2024-02-01",
+        date_time="2024-02-01 10:00:00",
+        operation="BUY",
+        price="100",
+        trade_id="t1",
+    )
+    _write_trade_history_xml(trade_path, [_trade_confirm_row(quantity="1", **row_kwargs)])
+    IbkrStatementSet.load(str(trade_path), cache_dir=cache_dir)
+
+    _write_trade_history_xml(trade_path, [_trade_confirm_row(quantity="2", **row_kwargs)])
+    with caplog.at_level("INFO"):
+        statements = IbkrStatementSet.load(str(trade_path), cache_dir=cache_dir)
+
+    assert "IBKR parse cache miss" in caplog.text
+    assert statements.trades["quantity"].to_list() == ["2"]
+
+
+def test_ibkr_statement_set_warns_when_parse_cache_cannot_be_written(tmp_path: Path, monkeypatch, caplog):
+    cache_dir = tmp_path / "cache"
+
+    def _disk_full(self, file, *args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(pl.DataFrame, "write_parquet", _disk_full)
+    with caplog.at_level("WARNING"):
+        statements = IbkrStatementSet.load("tests/test_data/ibkr/For_tax_automation*", cache_dir=cache_dir)
+
+    assert "Could not write IBKR parse cache" in caplog.text
+    assert "No space left on device" in caplog.text
+    assert not statements.cash_transactions.is_empty()
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_ibkr_statement_set_parallel_parse_matches_serial(tmp_path: Path):
+    serial = IbkrStatementSet.load("tests/test_data/ibkr/For_tax_automation*")
+    parallel = IbkrStatementSet.load("tests/test_data/ibkr/For_tax_automation*", max_workers=2)
+
+    assert parallel.file_paths == serial.file_paths
+    assert_frame_equal(parallel.cash_transactions, serial.cash_transactions)
+    assert_frame_equal(parallel.corporate_actions, serial.corporate_actions)
+    assert_frame_equal(parallel.trades, serial.trades)
+    assert_frame_equal(parallel.dividend_accruals, serial.dividend_accruals)
+
+    rows = [
+        _trade_confirm_row(
+            ticker="AAPL",
+            isin="US0378331005",
+            sub_category="COMMON",
+            trade_date=f"202{index}-02-01",
+            date_time=f"202{index}-02-01 10:00:00",
+            operation="BUY",
+            quantity="1",
+            price="100",
+            trade_id=f"t{index}",
+        )
+        for index in range(4)
+    ]
+    for index in range(3):
+        # Consecutive yearly exports overlap by one trade.
+        _write_trade_history_xml(tmp_path / f"trades_{index}.xml", rows[index : index + 2])
+
+    serial_trades = load_ibkr_stock_like_trades(str(tmp_path), allowed_asset_classes={"COMMON"})
+    parallel_trades = load_ibkr_stock_like_trades(str(tmp_path), allowed_asset_classes={"COMMON"}, max_workers=3)
+
+    assert [trade.trade_id for trade in serial_trades] == ["t0", "t1", "t2", "t3"]
+    assert parallel_trades == serial_trades
+
+
+def test_load_ibkr_trade_table_matches_decimal_row_semantics(tmp_path: Path):
+    trade_history_path = tmp_path / "trades.xml"
+    _write_trade_history_xml(
+        trade_history_path,
+        [
+            _trade_confirm_row(
+                ticker="AAPL",
+                isin="US0378331005",
+                sub_category="COMMON",
+                trade_date="2024-02-01",
+                date_time="2024-02-01 10:00:00",
+                operation="BUY",
+                quantity="0.123456785",
+                price="10.0000005",
+                trade_id="t1",
+                extra_attrs={"netCash": "-1.2345695"},
+            ),
+            '<TradeConfirm accountId="U1" symbol="MSFT" isin="" securityID="US5949181045" subCategory="COMMON" '
+            'assetCategory="STK" currency="USD" tradeDate="2024-03-01" buySell="SELL" quantity="-3" '
+            'tradePrice="20.0000025" commission="-1.0000005" />',
+            _trade_confirm_row(
+                ticker="VTI",
+                isin="US9229087690",
+                sub_category="ETF",
+                trade_date="2024-02-02",
+                date_time="2024-02-02 10:00:00",
+                operation="BUY",
+                quantity="1",
+                price="200",
+                trade_id="t3",
+            ),
+        ],
+    )
+
+    table = load_ibkr_trade_table(str(trade_history_path), allowed_asset_classes={"COMMON"})
+    buy, sell = table.to_raw_trades()
+
+    assert len(table) == 2
+    assert (buy.quantity, buy.price_ccy, buy.net_cash_ccy, buy.fee_ccy) == (
+        Decimal("0.12345679"),
+        Decimal("10.000001"),
+        Decimal("1.234570"),
+        Decimal("0.000002"),
+    )
+    assert sell.isin == "US5949181045"
+    assert sell.trade_datetime == datetime(2024, 3, 1)
+    assert sell.trade_id == "MSFT:2024-03-01T00:00:00:SELL"
+    assert (sell.operation, sell.quantity, sell.price_ccy, sell.net_cash_ccy, sell.fee_ccy) == (
+        "sell",
+        Decimal("3.00000000"),
+        Decimal("20.000003"),
+        None,
+        Decimal("1.000001"),
+    )
+    assert table.in_date_range(date(2024, 3, 1)).to_raw_trades() == [sell]
+    assert table.in_date_range(end_date=date(2024, 3, 1), include_end=False).to_raw_trades() == [buy]
+    assert table.with_isins({"US0378331005"}).to_raw_trades() == [buy]
+    assert table.without_asset_classes({"COMMON"}).is_empty()
+
+
+def _ledger_trade_row(trade_id: str, trade_date: str, operation: str = "BUY") -> str:
+    return _trade_confirm_row(
+        ticker="AAPL",
+        isin="US0378331005",
+        sub_category="COMMON",
+        trade_date=trade_date,
+        date_time=f"{trade_date} 10:00:00",
+        operation=operation,
+        quantity="1",
+        price="100",
+        trade_id=trade_id,
+    )
+
+
+def test_trade_ledger_ingests_only_new_files_and_trades(tmp_path: Path):
+    statements_dir = tmp_path / "trades"
+    statements_dir.mkdir()
+    _write_trade_history_xml(
+        statements_dir / "2023.xml", [_ledger_trade_row("t1", "2023-12-01"), _ledger_trade_row("t2", "2024-01-05")]
+    )
+    ledger = TradeLedger(tmp_path / "ledger")
+
+    first = ledger.ingest(str(statements_dir))
+    assert (first.added_rows, first.duplicate_rows) == (2, 0)
+    assert (tmp_path / "ledger" / "year=2023").is_dir()
+    assert (tmp_path / "ledger" / "year=2024").is_dir()
+
+    _write_trade_history_xml(
+        statements_dir / "2024.xml",
+        [_ledger_trade_row("t2", "2024-01-05"), _ledger_trade_row("t3", "2024-03-01", operation="SELL")],
+    )
+    second = ledger.ingest(str(statements_dir))
+
+    assert second.ingested_files == (str(statements_dir / "2024.xml"),)
+    assert second.skipped_files == (str(statements_dir / "2023.xml"),)
+    assert (second.added_rows, second.duplicate_rows) == (1, 1)
+    assert ledger.read_trades()["transactionID"].to_list() == ["t1", "t2", "t3"]
+    assert ledger.read_trades(years=[2023])["transactionID"].to_list() == ["t1"]
+    assert ledger.ingest(str(statements_dir)).ingested_files == ()
+
+
+def test_trade_ledger_replaces_trade_corrected_by_a_later_statement(tmp_path: Path):
+    statements_dir = tmp_path / "trades"
+    statements_dir.mkdir()
+    _write_trade_history_xml(
+        statements_dir / "a.xml", [_ledger_trade_row("t1", "2023-12-01"), _ledger_trade_row("t2", "2024-01-05")]
+    )
+    ledger = TradeLedger(tmp_path / "ledger")
+    ledger.ingest(str(statements_dir))
+
+    corrected_row = _ledger_trade_row("t1", "2023-12-01").replace('tradePrice="100"', 'tradePrice="101"')
+    _write_trade_history_xml(statements_dir / "b.xml", [corrected_row, _ledger_trade_row("t3", "2024-02-01")])
+    result = ledger.ingest(str(statements_dir))
+
+    assert (result.added_rows, result.corrected_rows, result.duplicate_rows) == (1, 1, 0)
+    trades = ledger.read_trades().sort("transactionID")
+    assert trades.select("transactionID", "tradePrice").rows() == [("t1", "101"), ("t2", "100"), ("t3", "100")]
+    assert trades["source_statement_file"].to_list() == [
+        str(statements_dir / name) for name in ("b.xml", "a.xml", "b.xml")
+    ]
+    assert ledger.read_trades(years=[2023])["tradePrice"].to_list() == ["101"]
+
+
+def test_trade_ledger_statement_set_matches_raw_xml_trade_table(tmp_path: Path):
+    statements_dir = tmp_path / "trades"
+    statements_dir.mkdir()
+    _write_trade_history_xml(statements_dir / "a.xml", [_ledger_trade_row("t1", "2024-01-05")])
+    _write_trade_history_xml(
+        statements_dir / "b.xml",
+        [_ledger_trade_row("t1", "2024-01-05"), _ledger_trade_row("t2", "2024-02-01", operation="SELL")],
+    )
+    ledger = TradeLedger(tmp_path / "ledger")
+    ledger.ingest(str(statements_dir))
+
+    from_xml = load_ibkr_trade_table(str(statements_dir), allowed_asset_classes={"COMMON"})
+    from_ledger = load_ibkr_trade_table(ledger.to_statement_set(), allowed_asset_classes={"COMMON"})
+
+    assert_frame_equal(from_ledger.df, from_xml.df)
+
+
+def test_trade_ledger_keeps_trades_with_empty_id_attributes(tmp_path: Path):
+    statements_dir = tmp_path / "trades"
+    statements_dir.mkdir()
+    rows = [
+        _trade_confirm_row(
+            ticker="AAPL",
+            isin="US0378331005",
+            sub_category="COMMON",
+            trade_date=trade_date,
+            date_time=f"{trade_date} 10:00:00",
+            operation="BUY",
+            quantity=quantity,
+            price="100",
+            trade_id="",
+            extra_attrs={"tradeID": "", "ibOrderID": " "},
+        )
+        for trade_date, quantity in (("2024-01-05", "1"), ("2024-02-01", "2"))
+    ]
+    _write_trade_history_xml(statements_dir / "a.xml", rows)
+    ledger = TradeLedger(tmp_path / "ledger")
+
+    result = ledger.ingest(str(statements_dir))
+
+    assert (result.added_rows, result.duplicate_rows) == (2, 0)
+    from_xml = load_ibkr_trade_table(str(statements_dir), allowed_asset_classes={"COMMON"})
+    from_ledger = load_ibkr_trade_table(ledger.to_statement_set(), allowed_asset_classes={"COMMON"})
+    assert len(from_xml) == 2
+    assert_frame_equal(from_ledger.df, from_xml.df)
+
+
+def test_ibkr_trade_index_is_built_once_per_statement_set(tmp_path: Path, monkeypatch):
+    _write_trade_history_xml(
+        tmp_path / "trades.xml",
+        [
+            _ledger_trade_row("t1", "2024-01-05"),
+            _trade_confirm_row(
+                ticker="VWCE",
+                isin="IE00BK5BQT80",
+                sub_category="ETF",
+                trade_date="2024-02-01",
+                date_time="2024-02-01 10:00:00",
+                operation="BUY",
+                quantity="3",
+                price="110",
+                trade_id="e1",
+                currency="EUR",
+            ),
+        ],
+    )
+    statements = IbkrStatementSet.load(str(tmp_path))
+    build_calls = []
+    original_build = IbkrTradeIndex.build.__func__
+
+    def _counting_build(cls, statement_set):
+        build_calls.append(statement_set)
+        return original_build(cls, statement_set)
+
+    monkeypatch.setattr(IbkrTradeIndex, "build", classmethod(_counting_build))
+
+    stock_trades = load_ibkr_trade_table(statements, allowed_asset_classes={"COMMON"})
+    etf_trades = ibkr_trade_index(statements).select(asset_classes={"ETF"}, exclude_asset_categories={"CASH"})
+
+    assert len(build_calls) == 1
+    assert stock_trades.df["trade_id"].to_list() == ["t1"]
+    assert etf_trades.df["trade_id"].to_list() == ["e1"]
+
+
+def test_ibkr_trade_index_select_matches_table_filters(tmp_path: Path):
+    rows = [
+        _ledger_trade_row("t1", "2023-12-01"),
+        _ledger_trade_row("t2", "2024-01-05"),
+        _ledger_trade_row("t3", "2024-03-01", operation="SELL"),
+        _trade_confirm_row(
+            ticker="O",
+            isin="US7561091049",
+            sub_category="REIT",
+            trade_date="2024-01-05",
+            date_time="2024-01-05 09:00:00",
+            operation="BUY",
+            quantity="2",
+            price="50",
+            trade_id="r1",
+        ),
+    ]
+    _write_trade_history_xml(tmp_path / "trades.xml", rows)
+    trade_index = ibkr_trade_index(str(tmp_path))
+    full_table = load_ibkr_trade_table(str(tmp_path), allowed_asset_classes={"COMMON", "REIT"})
+
+    sliced = trade_index.select(
+        asset_classes={"COMMON", "REIT"},
+        isins={"US0378331005"},
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 3, 1),
+        include_end=False,
+    )
+
+    expected = full_table.with_isins({"US0378331005"}).in_date_range(
+        date(2024, 1, 1), date(2024, 3, 1), include_end=False
+    )
+    assert_frame_equal(sliced.df, expected.df)
+    assert sliced.df["trade_id"].to_list() == ["t2"]
+
+
 def test_process_bonds_ibkr(tmp_path: Path, rates_df, bonds_tax_df, bonds_country_summary_df):
     trade_history_path = tmp_path / "bill_history.xml"
     _write_trade_history_xml(
@@ -1584,6 +2032,105 @@ def test_process_trades_ibkr_authoritative_keeps_moving_average_after_partial_sa
     assert stock_position_events_df.filter(pl.col("event_type") == "sell")["average_basis_eur_after"].to_list() == [102.5]
 
 
+def test_process_trades_ibkr_resumes_from_valid_position_checkpoint(tmp_path: Path, caplog):
+    opening_path = tmp_path / "opening.csv"
+    _write_opening_lots_csv(
+        opening_path,
+        [
+            {
+                "snapshot_date": "2024-05-01",
+                "asset_class": "COMMON",
+                "ticker": "AAPL",
+                "isin": "US0378331005",
+                "quantity": 3.0,
+                "currency": "USD",
+                "base_cost_total_eur": 300.0,
+            }
+        ],
+    )
+    trade_history_path = tmp_path / "history.xml"
+    trades = [
+        ("2024-08-01", "BUY", "1", "105", "buy-1"),
+        ("2025-02-03", "BUY", "1", "110", "buy-2"),
+        ("2025-06-03", "SELL", "-2", "130", "sell-1"),
+        ("2026-03-02", "SELL", "-1", "140", "sell-2"),
+    ]
+
+    def write_history(buy_2_price: str) -> None:
+        _write_trade_history_xml(
+            trade_history_path,
+            [
+                _trade_confirm_row(
+                    ticker="AAPL",
+                    isin="US0378331005",
+                    sub_category="COMMON",
+                    trade_date=trade_date,
+                    date_time=f"{trade_date} 12:00:00",
+                    operation=operation,
+                    quantity=quantity,
+                    price=buy_2_price if trade_id == "buy-2" else price,
+                    trade_id=trade_id,
+                )
+                for trade_date, operation, quantity, price, trade_id in trades
+            ],
+        )
+
+    rates_df = pl.DataFrame(
+        {
+            Column.rate_date: [date.fromisoformat(trade[0]) for trade in trades],
+            Column.currency: ["USD"] * len(trades),
+            Column.exchange_rate: [1.0] * len(trades),
+        }
+    )
+    checkpoint_dir = tmp_path / "checkpoints"
+
+    def run(year: int, checkpoints: Path | None, rates: pl.DataFrame = rates_df):
+        return process_trades_ibkr(
+            exchange_rates_df=rates,
+            start_date=date(year, 1, 1),
+            end_date=date(year, 12, 31),
+            austrian_opening_state_path=str(opening_path),
+            ibkr_trade_history_path=str(trade_history_path),
+            position_checkpoint_dir=checkpoints,
+        )
+
+    write_history("110")
+    run(2025, checkpoint_dir)
+    assert sorted(path.name[:10] for path in checkpoint_dir.glob("*.csv")) == ["2025-01-01", "2026-01-01"]
+
+    with caplog.at_level("INFO"):
+        resumed = run(2026, checkpoint_dir)
+    assert "Loaded position checkpoint as of 2026-01-01" in caplog.text
+    for resumed_df, fresh_df in zip(resumed, run(2026, None)):
+        assert_frame_equal(resumed_df, fresh_df)
+
+    # Correcting a trade before the checkpoint invalidates it; the earlier checkpoint still applies.
+    write_history("120")
+    caplog.clear()
+    with caplog.at_level("INFO"):
+        corrected = run(2026, checkpoint_dir)
+    assert "Loaded position checkpoint as of 2025-01-01" in caplog.text
+    for corrected_df, fresh_df in zip(corrected, run(2026, None)):
+        assert_frame_equal(corrected_df, fresh_df)
+    assert resumed[2]["average_basis_eur"].to_list() == [103.0]
+    assert corrected[2]["average_basis_eur"].to_list() == [105.0]
+
+    # So does a revised FX rate for a trade before the checkpoint.
+    revised_rates_df = rates_df.with_columns(
+        pl.when(pl.col(Column.rate_date) == date(2025, 2, 3))
+        .then(2.0)
+        .otherwise(pl.col(Column.exchange_rate))
+        .alias(Column.exchange_rate)
+    )
+    caplog.clear()
+    with caplog.at_level("INFO"):
+        revised = run(2026, checkpoint_dir, revised_rates_df)
+    assert "Loaded position checkpoint as of 2025-01-01" in caplog.text
+    for revised_df, fresh_df in zip(revised, run(2026, None, revised_rates_df)):
+        assert_frame_equal(revised_df, fresh_df)
+    assert revised[2]["average_basis_eur"].to_list() != corrected[2]["average_basis_eur"].to_list()
+
+
 def test_process_trades_ibkr_authoritative_ignores_closed_lot_xml_and_uses_raw_trade_history(tmp_path: Path):
     opening_path = tmp_path / "opening.csv"
     _write_opening_lots_csv(
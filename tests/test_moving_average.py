@@ -0,0 +1,432 @@
+import math
+import random
+from dataclasses import replace
+from datetime import date, timedelta
+from decimal import ROUND_DOWN, Context, Decimal, localcontext
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from tax_automation import moving_average
+from tax_automation.fixed_point_replay import FIXED_POINT_ENGINE, FixedPointEvent, build_fixed_point_trade_event
+from tax_automation.moving_average import (
+    EVENT_TYPE_BUY,
+    EVENT_TYPE_MANUAL_CORRECTION,
+    EVENT_TYPE_SELL,
+    EVENT_TYPE_SPLIT,
+    EventApplicationResult,
+    HoldingsIndex,
+    POSITION_SALE_SCHEMA,
+    PositionEvent,
+    PositionRecordSink,
+    PositionState,
+    apply_event,
+    build_basis_adjustment_event,
+    build_basis_reset_event,
+    build_buy_event,
+    build_sell_event,
+    position_events_to_df,
+    replay_events,
+    replay_into,
+    replay_states,
+    sort_position_events,
+)
+from tax_automation.position_journal import PositionEventJournal
+from tax_automation.precision import quantize_qty
+
+
+def _trade_events() -> list:
+    events = []
+    trades = [
+        ("AAA", "US0000000001", date(2024, 1, 2), "buy", "10", "100"),
+        ("BBB", "US0000000002", date(2024, 1, 3), "buy", "5", "50"),
+        ("AAA", "US0000000001", date(2024, 1, 4), "sell", "4", "110"),
+        ("AAA", "US0000000001", date(2024, 1, 4), "buy", "2", "105"),
+        ("BBB", "US0000000002", date(2024, 2, 1), "sell", "5", "40"),
+    ]
+    for index, (ticker, isin, trade_date, operation, quantity, price) in enumerate(trades):
+        build_event = build_buy_event if operation == "buy" else build_sell_event
+        events.append(
+            build_event(
+                broker="ibkr",
+                ticker=ticker,
+                isin=isin,
+                currency="USD",
+                asset_class="COMMON",
+                trade_date=trade_date,
+                quantity=Decimal(quantity),
+                price_ccy=Decimal(price),
+                fx_to_eur=Decimal("1.1"),
+                source_id=f"t{index}",
+                source_file="trades.xml",
+                sequence_key=index,
+            )
+        )
+    return events
+
+
+def test_presorted_replay_matches_sorted_replay():
+    events = _trade_events()
+
+    sorted_states, sorted_event_rows, sorted_sale_rows = replay_events([], events)
+    streamed_states, streamed_event_rows, streamed_sale_rows = replay_events([], iter(events), presorted=True)
+
+    assert streamed_states == sorted_states
+    assert replay_states([], iter(events)) == sorted_states
+    assert sorted(streamed_event_rows, key=lambda row: (row["isin"], row["sequence_key"])) == sorted_event_rows
+    assert sorted(streamed_sale_rows, key=lambda row: row["sale_trade_id"]) == sorted(
+        sorted_sale_rows, key=lambda row: row["sale_trade_id"]
+    )
+
+
+def test_presorted_replay_rejects_out_of_order_events():
+    events = _trade_events()
+
+    with pytest.raises(ValueError, match="out of order"):
+        replay_states([], [events[3], events[0]])
+
+
+def test_sell_reports_realized_amounts_without_rebuilding_the_event():
+    buy, _, sell = _trade_events()[:3]
+    states: dict[str, PositionState] = {}
+    apply_event(states, buy)
+
+    result: EventApplicationResult = apply_event(states, sell)
+
+    assert not hasattr(sell, "__dict__") and not hasattr(states[sell.isin], "__dict__")
+    assert result.realized is not None
+    assert result.realized.base_cost_eur == Decimal("363.636364")
+    assert result.realized.gain_loss_eur == Decimal("36.363636")
+    assert result.event_record["base_cost_delta_eur"] == -363.636364
+    assert result.event_record["realized_gain_loss_eur"] == result.sale_record["taxable_gain_loss_eur"] == 36.363636
+    assert sell.realized_basis_eur == Decimal("0")
+
+
+def test_sharded_replay_matches_serial_replay():
+    events = _trade_events()
+
+    serial_states, serial_event_rows, serial_sale_rows = replay_events([], events)
+    sharded_states, sharded_event_rows, sharded_sale_rows = replay_events([], iter(events), max_workers=2)
+
+    assert sharded_states == serial_states
+    assert sharded_event_rows == serial_event_rows
+    assert sharded_sale_rows == serial_sale_rows
+    assert replay_states([], iter(events), max_workers=2) == serial_states
+
+    # Presorted rows keep the input order, which interleaves the two positions.
+    presorted_serial = replay_events([], iter(events), presorted=True)
+    presorted_sharded = replay_events([], iter(events), presorted=True, max_workers=2)
+    assert [row["source_id"] for row in presorted_sharded[1]] == [event.source_id for event in events]
+    assert presorted_sharded == presorted_serial
+
+
+def _random_events(seed: int) -> tuple[list[PositionState], list[PositionEvent]]:
+    rng = random.Random(seed)
+    isins = [f"US000000000{index}" for index in range(3)]
+    quantities = {isin: Decimal("0") for isin in isins}
+    opening_states = [
+        PositionState(
+            broker="ibkr",
+            ticker="T0",
+            isin=isins[0],
+            currency="USD",
+            quantity=Decimal("7.5"),
+            base_cost_total_eur=Decimal("812.345678"),
+            basis_adjustment_total_eur=Decimal("-0.000003"),
+        )
+    ]
+    quantities[isins[0]] = Decimal("7.5")
+    # Positions just emptied by a sale; a basis reset needs zero basis as well as zero quantity.
+    closed = set(isins[1:])
+    events = []
+    event_date = date(2020, 1, 1)
+    for index in range(400):
+        event_date += timedelta(days=rng.randint(0, 3))
+        isin = rng.choice(isins)
+        common = {
+            "broker": "ibkr",
+            "ticker": f"T{isins.index(isin)}",
+            "isin": isin,
+            "currency": "USD",
+            "asset_class": "COMMON",
+        }
+        quantity = Decimal(rng.randint(1, 10**9)).scaleb(-8)
+        price = Decimal(rng.randint(1, 10**8)).scaleb(-4)
+        fx = Decimal(rng.randint(9000, 13000)).scaleb(-4)
+        kind = rng.random()
+        if isin in closed and kind < 0.1:
+            event = build_basis_reset_event(
+                **common,
+                event_date=event_date,
+                quantity=quantity,
+                base_cost_total_eur=Decimal(rng.randint(0, 10**9)).scaleb(-6),
+                sequence_key=index,
+            )
+            quantities[isin] = quantity
+        elif quantities[isin] > 0 and kind < 0.45:
+            sold = quantities[isin] if rng.random() < 0.2 else min(quantity / 100, quantities[isin])
+            event = build_sell_event(
+                **common,
+                trade_date=event_date,
+                quantity=sold,
+                price_ccy=price,
+                fx_to_eur=fx,
+                source_id=f"s{index}",
+                source_file="trades.xml",
+                sequence_key=index,
+            )
+            quantities[isin] -= event.quantity
+            if quantities[isin] == 0:
+                closed.add(isin)
+                events.append(event)
+                continue
+        elif kind < 0.55:
+            event = build_basis_adjustment_event(
+                **common,
+                eligibility_date=event_date,
+                effective_date=event_date,
+                basis_adjustment_eur=Decimal(rng.randint(-10**7, 10**7)).scaleb(-6),
+                quantity=quantities[isin],
+                source_id=f"a{index}",
+                source_file="oekb.csv",
+                sequence_key=index,
+            )
+        elif kind < 0.6:
+            split_ratio = rng.choice([Decimal("2"), Decimal("1.5"), Decimal("0.1"), Decimal("0.3")])
+            event = PositionEvent(
+                event_type=EVENT_TYPE_SPLIT,
+                **common,
+                event_date=event_date,
+                effective_date=event_date,
+                split_ratio=split_ratio,
+                sequence_key=index,
+            )
+            quantities[isin] = quantize_qty(quantities[isin] * split_ratio)
+        elif kind < 0.65:
+            quantity_delta = Decimal(rng.randint(0, 10**6)).scaleb(-8)
+            event = PositionEvent(
+                event_type=EVENT_TYPE_MANUAL_CORRECTION,
+                **common,
+                event_date=event_date,
+                effective_date=event_date,
+                quantity_delta=quantity_delta,
+                base_cost_delta_eur=Decimal(rng.randint(-10**6, 10**6)).scaleb(-6),
+                sequence_key=index,
+            )
+            quantities[isin] += quantity_delta
+        else:
+            event = build_buy_event(
+                **common,
+                trade_date=event_date,
+                quantity=quantity,
+                price_ccy=price,
+                fx_to_eur=fx,
+                source_id=f"b{index}",
+                source_file="trades.xml",
+                sequence_key=index,
+            )
+            quantities[isin] += event.quantity
+        closed.discard(isin)
+        events.append(event)
+    return opening_states, events
+
+
+def _with_zero_signs(rows: list[dict[str, object]]) -> list[dict[str, object]]:
+    """Rows with every float paired with its sign, as -0.0 == 0.0."""
+    return [
+        {key: (value, math.copysign(1, value)) if isinstance(value, float) else value for key, value in row.items()}
+        for row in rows
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fixed_point_replay_matches_decimal_replay(seed):
+    opening_states, events = _random_events(seed)
+
+    decimal_states, decimal_event_rows, decimal_sale_rows = replay_events(opening_states, events)
+    fixed_states, fixed_event_rows, fixed_sale_rows = replay_events(opening_states, events, engine=FIXED_POINT_ENGINE)
+
+    assert fixed_states == decimal_states
+    assert [str(state.quantity) for state in fixed_states] == [str(state.quantity) for state in decimal_states]
+    assert _with_zero_signs(fixed_event_rows) == _with_zero_signs(decimal_event_rows)
+    assert _with_zero_signs(fixed_sale_rows) == _with_zero_signs(decimal_sale_rows)
+    sorted_events = sort_position_events(events)
+    fixed_point_events = [FixedPointEvent.from_event(event) for event in sorted_events]
+    assert replay_states(opening_states, iter(fixed_point_events), engine=FIXED_POINT_ENGINE) == replay_states(
+        opening_states, iter(sorted_events)
+    )
+
+
+def test_fixed_point_sale_split_matches_decimal_next_to_rounding_ties():
+    rng = random.Random(7)
+    for _ in range(300):
+        quantity = rng.randint(1, 10**9)
+        multiple = rng.randint(1, 10**6)
+        # Exact half-unit shares, and shares a hair below one with a non-terminating sale ratio.
+        quantity_before = 2 * quantity * multiple + rng.choice([0, 1])
+        amount = multiple * (2 * rng.randint(0, 10**6) + 1) * rng.choice([1, -1])
+        opening_states = [
+            PositionState(
+                broker="ibkr",
+                ticker="T",
+                isin="US0000000001",
+                currency="USD",
+                quantity=Decimal(quantity_before).scaleb(-8),
+                base_cost_total_eur=Decimal(amount).scaleb(-6),
+                basis_adjustment_total_eur=Decimal(-amount).scaleb(-6),
+            )
+        ]
+        sale = build_sell_event(
+            broker="ibkr",
+            ticker="T",
+            isin="US0000000001",
+            currency="USD",
+            asset_class="COMMON",
+            trade_date=date(2024, 1, 2),
+            quantity=Decimal(quantity).scaleb(-8),
+            price_ccy=Decimal("1"),
+            fx_to_eur=Decimal("1"),
+            source_id="1",
+            source_file="trades.xml",
+        )
+
+        decimal_replay = replay_events(opening_states, [sale])
+        fixed_point_replay = replay_events(opening_states, [sale], engine=FIXED_POINT_ENGINE)
+
+        assert fixed_point_replay[0] == decimal_replay[0]
+        assert _with_zero_signs(fixed_point_replay[2]) == _with_zero_signs(decimal_replay[2])
+
+
+def test_replay_pins_its_decimal_context():
+    opening_states, events = _random_events(0)
+    expected = replay_events(opening_states, events)
+
+    with localcontext(Context(prec=6, rounding=ROUND_DOWN)):
+        decimal_replay = replay_events(opening_states, events)
+        fixed_point_replay = replay_events(opening_states, events, engine=FIXED_POINT_ENGINE)
+
+    assert decimal_replay == expected
+    assert fixed_point_replay == expected
+
+
+@pytest.mark.parametrize("event_type", [EVENT_TYPE_BUY, EVENT_TYPE_SELL])
+def test_fixed_point_trade_events_match_decimal_trade_events(event_type):
+    rng = random.Random(event_type)
+    build_event = build_buy_event if event_type == EVENT_TYPE_BUY else build_sell_event
+    for _ in range(500):
+        quantity = rng.choice([1, rng.randint(1, 10**8), rng.randint(1, 10**12)])
+        price = rng.choice([0, -1, rng.randint(-10**3, 10**3), rng.randint(1, 10**12)])
+        fx = rng.choice([7, rng.randint(1, 10**7), rng.randint(100, 10**12)])
+        trade = dict(
+            broker="ibkr",
+            ticker="T",
+            isin="US0000000001",
+            currency="USD",
+            asset_class="COMMON",
+            trade_date=date(2024, 1, 2),
+            source_id="1",
+            source_file="trades.xml",
+            sequence_key=3,
+        )
+
+        decimal_event = build_event(
+            quantity=Decimal(quantity).scaleb(-8),
+            price_ccy=Decimal(price).scaleb(-6),
+            fx_to_eur=Decimal(fx).scaleb(-6),
+            **trade,
+        )
+        fixed_point_event = build_fixed_point_trade_event(
+            event_type=event_type, quantity=quantity, price_ccy=price, fx_to_eur=fx, **trade
+        )
+
+        assert fixed_point_event == FixedPointEvent.from_event(decimal_event)
+
+
+def test_record_sink_matches_row_dicts(monkeypatch):
+    monkeypatch.setattr(moving_average, "RECORD_BATCH_ROWS", 7)
+    opening_states, events = _random_events(0)
+    _, event_rows, sale_rows = replay_events(opening_states, events)
+
+    sink = PositionRecordSink()
+    states = replay_into(opening_states, events, sink)
+    sales_only_sink = PositionRecordSink(capture_events=False)
+    replay_into(opening_states, events, sales_only_sink)
+
+    assert states == replay_states(opening_states, sort_position_events(events))
+    assert_frame_equal(sink.events_df(), position_events_to_df(event_rows))
+    assert_frame_equal(sink.sales_df(), pl.DataFrame(sale_rows, schema=POSITION_SALE_SCHEMA))
+    assert sales_only_sink.events_df().is_empty()
+    assert_frame_equal(sales_only_sink.sales_df(), sink.sales_df())
+
+
+def test_holdings_index_answers_point_in_time_queries():
+    holdings = HoldingsIndex()
+    final_states, _, _ = replay_events([], _trade_events(), holdings_index=holdings)
+
+    assert holdings.holdings_as_of("US0000000001", date(2024, 1, 1)).quantity == 0
+    assert holdings.holdings_as_of("US0000000001", date(2024, 1, 3)).quantity == Decimal("10")
+    assert holdings.holdings_as_of("US0000000001", date(2024, 1, 4)).quantity == Decimal("8")
+    assert holdings.holdings_as_of("US0000000002", date(2024, 1, 31)).total_basis_eur > 0
+    assert holdings.holdings_as_of("US0000000002", date(2024, 2, 1)).quantity == 0
+    assert holdings.holdings_as_of("US0000000003", date(2024, 2, 1)).quantity == 0
+    for state in final_states:
+        assert holdings.holdings_as_of(state.isin, date.max).quantity == state.quantity
+
+    seeded = HoldingsIndex.from_states(final_states, date(2024, 12, 31))
+    assert seeded.holdings_as_of("US0000000001", date(2024, 12, 31)).quantity == Decimal("8")
+    assert seeded.holdings_as_of("US0000000001", date(2024, 12, 30)).quantity == 0
+    with pytest.raises(ValueError, match="out of order"):
+        holdings.record(date(2024, 1, 1), final_states[0])
+
+
+def test_journal_partitions_events_by_isin_and_year(tmp_path, monkeypatch):
+    journal = PositionEventJournal(tmp_path / "journal")
+    later_buy_fields = dict(
+        broker="ibkr",
+        ticker="AAA",
+        isin="US0000000001",
+        currency="USD",
+        asset_class="COMMON",
+        trade_date=date(2025, 3, 3),
+        price_ccy=Decimal("120"),
+        fx_to_eur=Decimal("1.1"),
+        source_id="t9",
+        source_file="trades_2025.xml",
+        sequence_key=9,
+    )
+    later_buy = build_buy_event(quantity=Decimal("1"), **later_buy_fields)
+    events = [*_trade_events(), later_buy]
+    _, event_rows, _ = replay_events([], events, journal=journal)
+    replay_events([], events, journal=journal)
+
+    parts = sorted(path.relative_to(journal.root).parent.as_posix() for path in journal.root.rglob("part-*.parquet"))
+    assert parts == ["isin=US0000000001/year=2024", "isin=US0000000001/year=2025", "isin=US0000000002/year=2024"]
+    expected = position_events_to_df(event_rows).filter(pl.col("isin") == "US0000000001")
+    history = journal.read_isin_history("US0000000001")
+    assert_frame_equal(history.select(expected.columns), expected)
+    assert history["source_file"].to_list() == ["trades.xml"] * 3 + ["trades_2025.xml"]
+
+    read_paths = []
+    read_parquet = pl.read_parquet
+    monkeypatch.setattr(pl, "read_parquet", lambda path: read_paths.append(path) or read_parquet(path))
+    assert journal.read_isin_history("US0000000001", years=[2025])["source_id"].to_list() == ["t9"]
+    assert [path.parent.relative_to(journal.root).as_posix() for path in read_paths] == ["isin=US0000000001/year=2025"]
+    monkeypatch.undo()
+
+    corrected = build_buy_event(quantity=Decimal("2"), **later_buy_fields)
+    replay_events([], [*_trade_events(), corrected], journal=journal)
+    assert journal.read_isin_history("US0000000001", years=[2025])["quantity"].to_list() == [2.0]
+    audit = journal.read_isin_history("US0000000001", years=[2025], include_superseded=True)
+    assert audit.select("quantity", "journal_part", "superseded").rows() == [(1.0, 0, True), (2.0, 1, False)]
+
+    # A corrected first trade changes the after-values of every later event of the ISIN.
+    repriced_events = _trade_events()
+    repriced_events[0] = replace(repriced_events[0], base_cost_delta_eur=Decimal("900"))
+    _, repriced_rows, _ = replay_events([], [*repriced_events, corrected], journal=journal)
+    expected = position_events_to_df(repriced_rows).filter(pl.col("isin") == "US0000000001")
+    history = journal.read_isin_history("US0000000001")
+    assert_frame_equal(history.select(expected.columns), expected)
+    superseded = journal.read_isin_history("US0000000001", include_superseded=True)["superseded"]
+    assert (superseded.len(), superseded.sum()) == (9, 5)
+    assert journal.read_isin_history("US0000000003") is None
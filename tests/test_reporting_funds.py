@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import re
+import shutil
 from decimal import Decimal
 from datetime import date
 from pathlib import Path
@@ -14,7 +16,9 @@ from scripts.reporting_funds.ibkr_source import (
     load_ibkr_etf_trades,
 )
 from scripts.reporting_funds.oekb_csv import load_oekb_report, load_required_oekb_reports
+from scripts.reporting_funds import workflow
 from scripts.reporting_funds.workflow import basis_adjustments_to_df, load_opening_state_snapshot, run_workflow
+from tax_automation.moving_average import apply_event, clone_states, position_key
 
 
 def _write_rates_csv(path: Path, rows: list[tuple[str, str, float]]) -> None:
@@ -1588,6 +1592,247 @@ def test_reporting_funds_sale_after_ex_date_realizes_oekb_basis_adjustment(tmp_p
     assert state_df["total_basis_eur"].to_list() == [0.0]
 
 
+def test_reporting_funds_income_uses_shares_held_on_broker_ex_date(tmp_path: Path) -> None:
+    rates_path = tmp_path / "rates.csv"
+    _write_rates_csv(
+        rates_path,
+        [
+            ("2025-01-01", "USD", 1.0),
+            ("2025-12-11", "USD", 1.0),
+            ("2025-12-18", "USD", 1.0),
+            ("2025-12-24", "USD", 1.0),
+        ],
+    )
+    trade_history_path = tmp_path / "trade_history.xml"
+    _write_trade_xml(
+        trade_history_path,
+        [
+            _trade_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                trade_date="2025-01-01",
+                date_time="2025-01-01 10:00:00",
+                operation="BUY",
+                quantity="10",
+                price="100",
+                transaction_id="buy-1",
+            ),
+            _trade_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                trade_date="2025-12-18",
+                date_time="2025-12-18 10:00:00",
+                operation="SELL",
+                quantity="-4",
+                price="101",
+                transaction_id="sell-1",
+            ),
+        ],
+    )
+    tax_xml_path = tmp_path / "tax.xml"
+    _write_tax_xml(
+        tax_xml_path,
+        cash_rows=[
+            _cash_dividend_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                settle_date="2025-12-24",
+                ex_date="2025-12-11",
+                amount="0.735",
+                action_id="idtl-1",
+                report_date="2025-12-30",
+            )
+        ],
+        accrual_rows=[
+            _accrual_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                report_date="2025-12-11",
+                effective_date="2025-12-10",
+                ex_date="2025-12-11",
+                pay_date="2025-12-24",
+                quantity="10",
+                code="Po",
+                action_id="idtl-1",
+                gross_rate="0.0735",
+                gross_amount="0.735",
+            ),
+            _accrual_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                report_date="2025-12-30",
+                effective_date="2025-12-24",
+                ex_date="2025-12-11",
+                pay_date="2025-12-24",
+                quantity="10",
+                code="Re",
+                action_id="idtl-1",
+                gross_rate="0.0735",
+                gross_amount="-0.735",
+            ),
+        ],
+    )
+    oekb_root = tmp_path / "oekb"
+    # No Ex-Tag: the report is processed on its Ausschüttungstag, after the sale, but income is owed on the
+    # shares held on the broker's ex-date.
+    _write_oekb_file(
+        oekb_root / "2025" / "idtl_distribution.csv",
+        isin="IE00BSKRJZ44",
+        meldedatum="22.12.2025",
+        jahresmeldung="NEIN",
+        ausschuettungsmeldung="JA",
+        ausschuettungstag="24.12.2025",
+        value_10287="0,0100",
+    )
+
+    output_paths = run_workflow(
+        person="eugene",
+        tax_year=2025,
+        ibkr_tax_xml_path=tax_xml_path,
+        ibkr_trade_history_path=trade_history_path,
+        raw_exchange_rates_path=rates_path,
+        oekb_root_dir=oekb_root,
+        state_dir=tmp_path / "state",
+        output_dir=tmp_path / "output",
+        strict_unresolved_payouts=False,
+    )
+
+    income_df = pl.read_csv(output_paths["income_events"]).filter(
+        pl.col("event_type") == "oekb_deemed_distribution_10287"
+    )
+    basis_df = pl.read_csv(output_paths["basis_adjustments"])
+
+    assert income_df["eligibility_date"].to_list() == ["2025-12-11"]
+    assert income_df["quantity"].to_list() == [10.0]
+    assert basis_df["shares_held_on_eligibility_date"].to_list() == [6.0]
+
+
+def test_reporting_funds_income_counts_shares_sold_before_the_report_is_processed(tmp_path: Path) -> None:
+    rates_path = tmp_path / "rates.csv"
+    _write_rates_csv(
+        rates_path,
+        [
+            ("2025-01-01", "USD", 1.0),
+            ("2025-12-11", "USD", 1.0),
+            ("2025-12-18", "USD", 1.0),
+            ("2025-12-22", "USD", 1.0),
+            ("2025-12-24", "USD", 1.0),
+        ],
+    )
+    trade_history_path = tmp_path / "trade_history.xml"
+    _write_trade_xml(
+        trade_history_path,
+        [
+            _trade_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                trade_date="2025-01-01",
+                date_time="2025-01-01 10:00:00",
+                operation="BUY",
+                quantity="10",
+                price="100",
+                transaction_id="buy-1",
+            ),
+            _trade_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                trade_date="2025-12-18",
+                date_time="2025-12-18 10:00:00",
+                operation="SELL",
+                quantity="-10",
+                price="101",
+                transaction_id="sell-1",
+            ),
+            _trade_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                trade_date="2025-12-22",
+                date_time="2025-12-22 10:00:00",
+                operation="BUY",
+                quantity="3",
+                price="102",
+                transaction_id="buy-2",
+            ),
+        ],
+    )
+    tax_xml_path = tmp_path / "tax.xml"
+    _write_tax_xml(
+        tax_xml_path,
+        cash_rows=[
+            _cash_dividend_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                settle_date="2025-12-24",
+                ex_date="2025-12-11",
+                amount="0.735",
+                action_id="idtl-1",
+                report_date="2025-12-30",
+            )
+        ],
+        accrual_rows=[
+            _accrual_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                report_date="2025-12-11",
+                effective_date="2025-12-10",
+                ex_date="2025-12-11",
+                pay_date="2025-12-24",
+                quantity="10",
+                code="Po",
+                action_id="idtl-1",
+                gross_rate="0.0735",
+                gross_amount="0.735",
+            ),
+            _accrual_row(
+                ticker="IDTL",
+                isin="IE00BSKRJZ44",
+                report_date="2025-12-30",
+                effective_date="2025-12-24",
+                ex_date="2025-12-11",
+                pay_date="2025-12-24",
+                quantity="10",
+                code="Re",
+                action_id="idtl-1",
+                gross_rate="0.0735",
+                gross_amount="-0.735",
+            ),
+        ],
+    )
+    oekb_root = tmp_path / "oekb"
+    # The whole position is sold after the broker's ex-date and partly rebought before the report is processed on
+    # its Ausschüttungstag; income is still owed on every share held on the ex-date.
+    _write_oekb_file(
+        oekb_root / "2025" / "idtl_distribution.csv",
+        isin="IE00BSKRJZ44",
+        meldedatum="22.12.2025",
+        jahresmeldung="NEIN",
+        ausschuettungsmeldung="JA",
+        ausschuettungstag="24.12.2025",
+        value_10287="0,0100",
+    )
+
+    output_paths = run_workflow(
+        person="eugene",
+        tax_year=2025,
+        ibkr_tax_xml_path=tax_xml_path,
+        ibkr_trade_history_path=trade_history_path,
+        raw_exchange_rates_path=rates_path,
+        oekb_root_dir=oekb_root,
+        state_dir=tmp_path / "state",
+        output_dir=tmp_path / "output",
+        strict_unresolved_payouts=False,
+    )
+
+    income_df = pl.read_csv(output_paths["income_events"]).filter(
+        pl.col("event_type") == "oekb_deemed_distribution_10287"
+    )
+    basis_df = pl.read_csv(output_paths["basis_adjustments"])
+
+    assert income_df["eligibility_date"].to_list() == ["2025-12-11"]
+    assert income_df["quantity"].to_list() == [10.0]
+    assert basis_df["shares_held_on_eligibility_date"].to_list() == [3.0]
+
+
 def test_reporting_funds_workflow_fails_when_same_year_payout_remains_unresolved(tmp_path: Path) -> None:
     rates_path = tmp_path / "rates.csv"
     _write_rates_csv(
@@ -2973,3 +3218,76 @@ def test_reporting_funds_workflow_clears_stale_resolved_status_when_rerun_has_on
     assert payout_df["notes"].to_list() == ["cash_row_missing"]
     assert evidence_review_df["status"].to_list() == ["accrual_pre_payout_only"]
     assert evidence_review_df["notes"].to_list() == ["cash_row_missing"]
+
+
+def _clone_and_sort_apply_position_event(positions, event, *, event_rows=None, sale_rows=None) -> None:
+    # The workflow's former per-event path: clone every state, apply one event, re-sort all states.
+    state_map = clone_states(positions.values())
+    result = apply_event(state_map, event)
+    positions.clear()
+    for state in sorted(state_map.values(), key=lambda item: (item.asset_class, item.ticker, item.isin)):
+        positions[position_key(broker=state.broker, isin=state.isin)] = state
+    if event_rows is not None:
+        event_rows.append(result.event_record)
+    if sale_rows is not None and result.sale_record is not None:
+        sale_rows.append(result.sale_record)
+
+
+_WORKFLOW_SCENARIOS = [
+    scenario
+    for name, scenario in list(globals().items())
+    if name.startswith("test_reporting_funds")
+    and "run_workflow" in scenario.__code__.co_names
+    and scenario.__code__.co_varnames[: scenario.__code__.co_argcount] == ("tmp_path",)
+]
+
+
+@pytest.mark.parametrize("scenario", _WORKFLOW_SCENARIOS, ids=lambda scenario: scenario.__name__)
+def test_in_place_state_map_writes_same_artifacts_as_clone_and_sort(scenario, tmp_path: Path, monkeypatch) -> None:
+    scenario_root = tmp_path / "scenario"
+    reference_root = tmp_path / "reference"
+    compared_runs = []
+
+    def reference_path(path: str | Path) -> Path:
+        return reference_root / Path(path).relative_to(scenario_root)
+
+    def run_both(**kwargs):
+        reference_kwargs = dict(kwargs)
+        for name in ("state_dir", "output_dir"):
+            if kwargs.get(name) is not None:
+                reference_kwargs[name] = reference_path(kwargs[name])
+        state_dir = Path(kwargs["state_dir"])
+        if state_dir.is_dir():
+            # Carry files the scenario wrote between runs; the reference run keeps its own workflow outputs.
+            shutil.copytree(
+                state_dir, reference_kwargs["state_dir"], dirs_exist_ok=True, copy_function=_copy_if_missing
+            )
+        try:
+            outputs = workflow.run_workflow(**kwargs)
+        except Exception as exc:
+            expected_message = re.escape(str(exc).replace(str(scenario_root), str(reference_root)))
+            with monkeypatch.context() as patched:
+                patched.setattr(workflow, "_apply_position_event", _clone_and_sort_apply_position_event)
+                with pytest.raises(type(exc), match=expected_message):
+                    workflow.run_workflow(**reference_kwargs)
+            compared_runs.append(kwargs["tax_year"])
+            raise
+        with monkeypatch.context() as patched:
+            patched.setattr(workflow, "_apply_position_event", _clone_and_sort_apply_position_event)
+            reference_outputs = workflow.run_workflow(**reference_kwargs)
+        assert outputs.keys() == reference_outputs.keys()
+        for label, path in outputs.items():
+            expected = reference_outputs[label].read_text().replace(str(reference_root), str(scenario_root))
+            assert path.read_text() == expected, label
+        compared_runs.append(kwargs["tax_year"])
+        return outputs
+
+    monkeypatch.setitem(globals(), "run_workflow", run_both)
+    scenario_root.mkdir()
+    scenario(scenario_root)
+    assert compared_runs
+
+
+def _copy_if_missing(source: str, destination: str) -> None:
+    if not Path(destination).exists():
+        shutil.copy2(source, destination)
@@ -6,7 +6,7 @@ from polars.testing.asserts import assert_frame_equal
 
 from tax_automation.const import Column, CurrencyCode
 from tax_automation.currencies import ExchangeRates
-from tax_automation.providers.revolut import process_revolut_savings_statement
+from tax_automation.providers.revolut import process_revolut_savings_statement, scan_fx_requirements_revolut
 
 REPORTING_PERIOD_START_DATE = date(2024, 12, 1)
 REPORTING_PERIOD_START_END = date(2024, 12, 31)
@@ -135,3 +135,15 @@ def test_process_revolut_savings_statement_unknown_description_fails_fast(tmp_pa
             start_date=REPORTING_PERIOD_START_DATE_2025,
             end_date=REPORTING_PERIOD_START_END_2025,
         )
+
+
+def test_scan_fx_requirements_revolut():
+    usd_requirements = scan_fx_requirements_revolut(
+        "tests/test_data/revolut/revolut_savings_usd.csv", REPORTING_PERIOD_START_DATE, REPORTING_PERIOD_START_END
+    )
+    euro_requirements = scan_fx_requirements_revolut(
+        "tests/test_data/revolut/revolut_savings_euro.csv", REPORTING_PERIOD_START_DATE, REPORTING_PERIOD_START_END
+    )
+
+    assert usd_requirements.bounds == {"USD": (date(2024, 12, 14), date(2024, 12, 31))}
+    assert euro_requirements.bounds == {}
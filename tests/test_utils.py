@@ -1,4 +1,5 @@
 from datetime import date
+from decimal import Decimal
 
 import polars as pl
 import pytest
@@ -6,7 +7,17 @@ from polars.testing.asserts import assert_frame_equal
 
 from tax_automation.const import Column
 from tax_automation.precision import cast_decimal_columns_to_float
-from tax_automation.utils import calculate_kest, convert_to_euro, extract_elements, join_exchange_rates, read_xml_to_df
+from tax_automation.utils import (
+    FX_MATCH_COL,
+    FxJoiner,
+    calculate_kest,
+    convert_to_euro,
+    extract_elements,
+    iter_xml_section_rows,
+    join_exchange_rates,
+    read_xml_sections_to_df,
+    read_xml_to_df,
+)
 
 dates = [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 6), date(2024, 1, 10), date(2024, 1, 10)]
 dividend_currencies = ["USD", "USD", "USD", "GBP", "EUR"]
@@ -183,6 +194,109 @@ def test_read_xml_to_df_accepts_directory_and_dedupes(tmp_path):
     assert_frame_equal(df, expected_df)
 
 
+def test_read_xml_to_df_projects_typed_columns(tmp_path):
+    (tmp_path / "one.xml").write_text(XML_CONTENT_1)
+
+    df = read_xml_to_df(
+        str(tmp_path),
+        lambda root: extract_elements(root, "record", columns=["id", "value", "missing"]),
+        schema={"value": pl.Int64, "missing": pl.Float64},
+        columns=["id", "value", "missing"],
+    )
+
+    expected_df = pl.DataFrame(
+        {"id": ["1"], "value": [10], "missing": [None]},
+        schema={"id": pl.String, "value": pl.Int64, "missing": pl.Float64},
+    )
+    assert_frame_equal(df, expected_df)
+
+
+def test_read_xml_to_df_rejects_schema_outside_projection(tmp_path):
+    (tmp_path / "one.xml").write_text(XML_CONTENT_1)
+
+    with pytest.raises(ValueError, match="not part of the projection"):
+        read_xml_to_df(
+            str(tmp_path),
+            lambda root: extract_elements(root, "record"),
+            columns=["id"],
+            schema={"value": pl.Int64},
+        )
+
+
+FLEX_XML_CONTENT = """\
+<FlexQueryResponse>
+    <FlexStatements>
+        <FlexStatement>
+            <CashTransactions>
+                <CashTransaction transactionID="1" amount="10"/>
+                <CashTransaction transactionID="2" amount="20"/>
+            </CashTransactions>
+            <OpenPositions>
+                <CashTransaction transactionID="3" amount="30"/>
+            </OpenPositions>
+            <Trades>
+                <Trade tradeID="7" quantity="5"/>
+                <Lot tradeID="7" quantity="5"/>
+            </Trades>
+        </FlexStatement>
+    </FlexStatements>
+</FlexQueryResponse>
+"""
+
+
+def test_iter_xml_section_rows_reads_only_requested_sections(tmp_path):
+    path = tmp_path / "flex.xml"
+    path.write_text(FLEX_XML_CONTENT)
+
+    rows = list(iter_xml_section_rows(str(path), {"CashTransactions", "Trades"}, {"CashTransaction", "Trade"}))
+
+    assert rows == [
+        ("CashTransaction", {"transactionID": "1", "amount": "10"}),
+        ("CashTransaction", {"transactionID": "2", "amount": "20"}),
+        ("Trade", {"tradeID": "7", "quantity": "5"}),
+    ]
+
+
+def test_read_xml_sections_to_df_dedupes_across_files(tmp_path):
+    (tmp_path / "one.xml").write_text(FLEX_XML_CONTENT)
+    (tmp_path / "two.xml").write_text(FLEX_XML_CONTENT)
+
+    df = read_xml_sections_to_df(str(tmp_path), {"CashTransactions"}, {"CashTransaction"}, dedupe=True)
+
+    expected_df = pl.DataFrame([{"transactionID": "1", "amount": "10"}, {"transactionID": "2", "amount": "20"}])
+    assert_frame_equal(df, expected_df)
+
+
+def test_read_xml_sections_to_df_parallel_matches_serial(tmp_path):
+    (tmp_path / "one.xml").write_text(FLEX_XML_CONTENT)
+    (tmp_path / "two.xml").write_text(FLEX_XML_CONTENT.replace('transactionID="2"', 'transactionID="4"'))
+
+    serial_df = read_xml_sections_to_df(str(tmp_path), {"CashTransactions"}, {"CashTransaction"}, dedupe=True)
+    parallel_df = read_xml_sections_to_df(
+        str(tmp_path), {"CashTransactions"}, {"CashTransaction"}, dedupe=True, max_workers=2
+    )
+
+    assert serial_df.height == 3
+    assert_frame_equal(parallel_df, serial_df)
+
+
+def test_read_xml_sections_to_df_projects_schema_columns(tmp_path):
+    (tmp_path / "one.xml").write_text(FLEX_XML_CONTENT)
+    (tmp_path / "two.xml").write_text("<FlexQueryResponse/>")
+
+    df = read_xml_sections_to_df(
+        str(tmp_path), {"CashTransactions"}, {"CashTransaction"}, schema={"amount": pl.Decimal(scale=6)}
+    )
+
+    assert df.schema == {"amount": pl.Decimal(scale=6)}
+    assert df["amount"].to_list() == [Decimal("10"), Decimal("20")]
+
+
+def test_read_xml_sections_to_df_missing_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_xml_sections_to_df(str(tmp_path / "missing*.xml"), {"CashTransactions"}, {"CashTransaction"})
+
+
 @pytest.mark.parametrize(
     "dividend_date",
     [
@@ -246,6 +360,34 @@ def test_join_exchange_rates(dividends_euro_df, exhange_rates_df):
     assert_frame_equal(expected_df, res_df)
 
 
+def test_fx_joiner_reports_match_diagnostics(dividends_euro_df, exhange_rates_df):
+    fx_joiner = FxJoiner.from_rates_df(exhange_rates_df.reverse())
+    stale_df = dividends_euro_df.vstack(
+        pl.DataFrame(
+            {
+                Column.date: [date(2024, 2, 22)],
+                Column.currency: ["USD"],
+                Column.profit_euro: [100.0],
+                Column.withholding_tax_euro: [18.0],
+            }
+        )
+    )
+
+    assert_frame_equal(
+        fx_joiner.join(dividends_euro_df, Column.date),
+        join_exchange_rates(dividends_euro_df, exhange_rates_df, df_date_col=Column.date),
+    )
+    joined_df = fx_joiner.join_unchecked(stale_df, Column.date)
+    diagnostics_df = fx_joiner.match_diagnostics(joined_df, Column.date)
+    assert diagnostics_df.select(Column.date, FX_MATCH_COL).rows() == [
+        (date(2024, 1, 2), "inexact"),
+        (date(2024, 1, 6), "inexact"),
+        (date(2024, 2, 22), "missing"),
+    ]
+    with pytest.raises(ValueError, match="Some dates did not match"):
+        fx_joiner.join(stale_df, Column.date)
+
+
 @pytest.mark.parametrize(
     "col_to_convert,converted_cols",
     [